@@ -1,6 +1,40 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+# Servidores que importam a aplicação e servem pedidos (gunicorn também com workers uvicorn)
+SERVER_PROGRAMS = ('gunicorn', 'uvicorn', 'daphne', 'hypercorn')
+
+
+def _is_server_process():
+    """True quando o processo vai servir pedidos (gunicorn/uvicorn/daphne/hypercorn ou runserver).
+
+    Testes, shells (`python -c`), celery e os restantes comandos não carregam o modelo.
+    """
+    argv = sys.argv
+    if not argv or not argv[0]:
+        return False
+    program = os.path.basename(argv[0])
+    if program == '__main__.py':
+        # python -m gunicorn: argv[0] é .../gunicorn/__main__.py
+        program = os.path.basename(os.path.dirname(argv[0]))
+    if program.lower().startswith(SERVER_PROGRAMS):
+        return True
+    if program != 'manage.py' or len(argv) < 2 or argv[1] != 'runserver':
+        return False
+    # O processo pai do autoreloader não serve pedidos
+    return '--noreload' in argv or os.environ.get('RUN_MAIN') == 'true'
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Carrega e aquece o modelo Tella no arranque do worker, não no primeiro pedido
+        if getattr(settings, 'TELLA_EAGER_LOAD', True) and _is_server_process():
+            from .ml import warm_up
+            warm_up()
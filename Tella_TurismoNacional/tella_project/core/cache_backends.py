@@ -0,0 +1,249 @@
+"""Backends de cache do Tella, com contadores de hits/misses.
+
+- `LocMemCache`: o LocMemCache do Django (por processo), instrumentado.
+- `SQLiteCache`: cache partilhada entre workers e persistente entre deploys, num
+  ficheiro SQLite em modo WAL, com expiração por entrada e eviction LRU limitada
+  por número de entradas (MAX_ENTRIES) e por tamanho (OPTIONS['MAX_BYTES']).
+- `RedisCache`: o RedisCache do Django, instrumentado (usado quando CACHE_URL está definido).
+
+Selecção em settings.py via CACHE_BACKEND / CACHE_URL.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache as DjangoLocMemCache
+
+
+class CacheStatsMixin:
+    """Conta hits e misses de get/get_many (por instância do backend, sob um lock)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hit_stats = {'hits': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, hits, misses):
+        with self._stats_lock:
+            self._hit_stats['hits'] += hits
+            self._hit_stats['misses'] += misses
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = super().get(key, sentinel, version=version)
+        if value is sentinel:
+            self._record(0, 1)
+            return default
+        self._record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        # BaseCache.get_many (ex. LocMemCache) chama self.get, que já conta cada chave
+        if super().get_many.__func__ is BaseCache.get_many:
+            return super().get_many(keys, version=version)
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        self._record(len(found), len(keys) - len(found))
+        return found
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._hit_stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
+
+
+class LocMemCache(CacheStatsMixin, DjangoLocMemCache):
+    pass
+
+
+class SQLiteCache(CacheStatsMixin, BaseCache):
+    """Cache num ficheiro SQLite (WAL), partilhada por todos os workers da máquina."""
+
+    # Intervalo mínimo (s) entre actualizações do instante de acesso de uma entrada (LRU aproximado)
+    touch_interval = 1.0
+    # Cada quantos `set` se verifica se é preciso fazer eviction
+    cull_every = 32
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        options = params.get('OPTIONS', {})
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._local = threading.local()
+        self._sets = 0
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    # Ligação por thread (e por processo: após um fork abre-se uma nova)
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL,'
+                ' accessed REAL NOT NULL, size INTEGER NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)')
+            self._schema_ready = True
+
+    def _get_many_raw(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        conn = self._conn()
+        placeholders = ','.join('?' * len(keys))
+        rows = conn.execute(
+            f'SELECT key, value, expires, accessed FROM cache WHERE key IN ({placeholders})', keys
+        ).fetchall()
+        found, expired, touch = {}, [], []
+        for key, blob, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                expired.append(key)
+                continue
+            found[key] = pickle.loads(blob)
+            if now - accessed > self.touch_interval:
+                touch.append(key)
+        if expired:
+            conn.execute(f"DELETE FROM cache WHERE key IN ({','.join('?' * len(expired))}) AND expires <= ?",
+                         [*expired, now])
+        if touch:
+            conn.execute(f"UPDATE cache SET accessed = ? WHERE key IN ({','.join('?' * len(touch))})",
+                         [now, *touch])
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        found = self._get_many_raw([key])
+        if key in found:
+            self._record(1, 0)
+            return found[key]
+        self._record(0, 1)
+        return default
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(k, version=version): k for k in keys}
+        found = self._get_many_raw(list(key_map))
+        self._record(len(found), len(key_map) - len(found))
+        return {key_map[k]: v for k, v in found.items()}
+
+    def _write(self, key, value, timeout, only_if_absent=False):
+        expires = self.get_backend_timeout(timeout)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        conn = self._conn()
+        if only_if_absent:
+            # Atómico entre processos: só substitui uma entrada inexistente ou expirada
+            cur = conn.execute(
+                'INSERT INTO cache (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+                'accessed = excluded.accessed, size = excluded.size '
+                'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+                (key, blob, expires, now, len(blob), now),
+            )
+            written = cur.rowcount > 0
+        else:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+                (key, blob, expires, now, len(blob)),
+            )
+            written = True
+        if written:
+            self._sets += 1
+            if self._sets % self.cull_every == 0:
+                self._cull(conn)
+        return written
+
+    def _cull(self, conn):
+        """Remove expirados e, acima dos limites, as entradas usadas há mais tempo (LRU)."""
+        conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        excess = 0
+        if count > self._max_entries:
+            # Como no Django: ao ultrapassar o limite remove 1/CULL_FREQUENCY das entradas
+            excess = count - self._max_entries + count // max(self._cull_frequency, 1)
+        if total > self._max_bytes and count:
+            avg = total / count
+            excess = max(excess, int((total - self._max_bytes * 0.9) / avg) + 1)
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,)
+            )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write(key, value, timeout, only_if_absent=True)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cur = self._conn().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+        return cur.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._conn().execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def clear(self):
+        self._conn().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Ligações persistentes por thread: não fechar no fim de cada pedido
+        pass
+
+
+try:
+    from django.core.cache.backends.redis import RedisCache as DjangoRedisCache
+
+    class RedisCache(CacheStatsMixin, DjangoRedisCache):
+        pass
+except ImportError:  # pragma: no cover - Django sem suporte Redis
+    RedisCache = None
+
+
+def cache_stats(alias='default'):
+    """Contadores de hits/misses do backend de cache (se instrumentado)."""
+    backend = caches[alias]
+    stats = backend.stats() if hasattr(backend, 'stats') else {}
+    return {'backend': type(backend).__name__, **stats}
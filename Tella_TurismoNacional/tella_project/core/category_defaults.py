@@ -0,0 +1,148 @@
+"""Valores padrão por categoria derivados do CSV de destinos, em vez de copiados à mão.
+
+`python manage.py build_category_defaults` lê `destinos_turisticos_angola.csv` (ou
+outro CSV com as mesmas colunas) aos blocos, só com as colunas necessárias (preços
+em float32, texto como category), e calcula numa groupby vectorizada a mediana (ou
+média) e a contagem de todas as colunas por categoria. Opcionalmente faz o mesmo
+por categoria × província (`nome_destino`) e por categoria × tipo de viajante;
+grupos com menos de `min_count` linhas não entram.
+
+O resultado é um JSON pequeno ao lado do modelo (`tella_category_defaults.json`),
+com o hash do modelo e do CSV. É carregado uma vez por processo, junto com o
+modelo, e ignorado se tiver sido gerado para outro modelo; nesse caso valem os
+valores de ml.DEFAULTS_BY_CATEGORY.
+"""
+from pathlib import Path
+import json
+
+import numpy as np
+from django.conf import settings
+
+from . import ml
+
+STAT_FIELDS = (
+    'preco_transporte_medio',
+    'preco_hospedagem_medio',
+    'preco_alimentacao_medio',
+    'preco_lazer_medio',
+    'indice_sazonalidade',
+    'pontuacao_popularidade',
+    'fator_sustentabilidade',
+)
+# Casas decimais de cada campo no artefacto (as mesmas de DEFAULTS_BY_CATEGORY)
+DECIMALS = {'indice_sazonalidade': 2, 'pontuacao_popularidade': 1, 'fator_sustentabilidade': 1}
+
+# Desagregações opcionais: nome -> coluna do CSV
+BREAKDOWNS = {'province': 'nome_destino', 'traveler': 'tipo_viajante'}
+
+DEFAULT_CHUNKSIZE = 200_000
+ARTIFACT_VERSION = 1
+
+
+def defaults_path(model_path=None):
+    """Ficheiro dos valores padrão: ao lado do modelo (`model_path` ou o activo)."""
+    path = getattr(settings, 'TELLA_DEFAULTS_PATH', None)
+    if path:
+        return Path(path)
+    return Path(model_path or ml._model_path()).with_name('tella_category_defaults.json')
+
+
+def read_columns(path, keys, chunksize=DEFAULT_CHUNKSIZE):
+    """DataFrame compacto com as colunas de grupo (`keys`, como category) e as estatísticas.
+
+    O CSV é lido em blocos de `chunksize` linhas: a memória de pico é a do resultado
+    (4 bytes por valor numérico e 1-2 por chave), não a do texto do ficheiro.
+    """
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+    dtype = {field: 'float32' for field in STAT_FIELDS}
+    dtype.update({key: 'category' for key in keys})
+    frames = []
+    reader = pd.read_csv(path, usecols=[*keys, *STAT_FIELDS], dtype=dtype, chunksize=chunksize,
+                         encoding='utf-8-sig')
+    for chunk in reader:
+        chunk = chunk.dropna(subset=['categoria_destino'])
+        if len(chunk):
+            frames.append(chunk)
+    if not frames:
+        raise ValueError(f'{path}: sem linhas com categoria_destino')
+    columns = {key: union_categoricals([f[key] for f in frames]) for key in keys}
+    columns.update({field: np.concatenate([f[field].to_numpy() for f in frames]) for field in STAT_FIELDS})
+    return pd.DataFrame(columns)
+
+
+def _entry(n, values):
+    return {
+        'n': int(n),
+        'values': {f: round(float(values[f]), DECIMALS.get(f, 0)) for f in STAT_FIELDS},
+    }
+
+
+def group_stats(df, keys, stat='median', min_count=1):
+    """Estatística e contagem de todas as colunas por grupo, numa única groupby.
+
+    Devolve {categoria: entrada} para uma chave e {categoria: {valor: entrada}} para duas.
+    """
+    grouped = df.groupby(list(keys), observed=True, sort=True)[list(STAT_FIELDS)]
+    values = grouped.agg(stat)
+    counts = grouped.size()
+    keep = counts >= min_count
+    result = {}
+    for index, row in values[keep].iterrows():
+        n = counts[index]
+        if len(keys) == 1:
+            result[index] = _entry(n, row)
+        else:
+            category, sub = index
+            result.setdefault(category, {})[sub] = _entry(n, row)
+    return result
+
+
+def compute_defaults(path=None, breakdowns=(), stat='median', min_count=5, chunksize=DEFAULT_CHUNKSIZE):
+    """Artefacto (dict) com os valores por categoria e as desagregações pedidas."""
+    path = Path(path) if path else ml._data_path()
+    unknown = set(breakdowns) - set(BREAKDOWNS)
+    if unknown:
+        raise ValueError(f'Desagregação desconhecida: {", ".join(sorted(unknown))}')
+    keys = ['categoria_destino', *(BREAKDOWNS[name] for name in breakdowns)]
+    df = read_columns(path, keys, chunksize)
+
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        'source': path.name,
+        'data_hash': ml._file_hash(path),
+        'rows': int(len(df)),
+        'stat': stat,
+        'min_count': min_count,
+        'categories': group_stats(df, ['categoria_destino'], stat),
+    }
+    for name in breakdowns:
+        artifact[f'by_{name}'] = group_stats(df, ['categoria_destino', BREAKDOWNS[name]], stat, min_count)
+    return artifact
+
+
+def save_defaults(artifact, model_hash, path=None):
+    path = Path(path) if path else defaults_path()
+    artifact = {**artifact, 'model_hash': model_hash}
+    path.write_text(json.dumps(artifact, ensure_ascii=False, indent=1), encoding='utf-8')
+    return path
+
+
+def load_defaults(model_hash, path=None):
+    """Artefacto gerado para `model_hash`, ou None (sem ficheiro, inválido ou de outro modelo)."""
+    path = Path(path) if path else defaults_path()
+    if not model_hash or not path.exists():
+        return None
+    try:
+        artifact = json.loads(path.read_text(encoding='utf-8'))
+    except Exception as e:
+        print(f"[ML] Falha ao ler valores padrão de {path}: {e}")
+        return None
+    if artifact.get('version') != ARTIFACT_VERSION or not artifact.get('categories'):
+        print(f"[ML] Valores padrão em {path} com formato inesperado; ignorados.")
+        return None
+    if artifact.get('model_hash') != model_hash:
+        print("[ML] Valores padrão gerados para outro modelo; ignorados.")
+        return None
+    print(f"[ML] Valores padrão por categoria ({artifact['stat']}, {artifact['rows']} linhas) carregados de: {path}")
+    return artifact
@@ -0,0 +1,138 @@
+"""Circuit breaker e timeout adaptativo para chamadas a um serviço externo.
+
+Estados do `CircuitBreaker`:
+- closed: as chamadas passam; N falhas (ou chamadas lentas) seguidas abrem o circuito;
+- open: as chamadas falham de imediato com `CircuitOpen` durante `cooldown` segundos;
+- half_open: passado o cooldown deixa passar uma única chamada de teste; se correr
+  bem fecha o circuito, senão volta a abrir.
+
+O timeout de cada chamada acompanha o p95 das latências recentes (× `multiplier`),
+entre `min_timeout` e `max_timeout`: com o upstream saudável e rápido, uma chamada
+pendurada liberta o worker em poucos segundos em vez de esperar o máximo.
+"""
+from collections import deque
+import threading
+import time
+
+
+class CircuitOpen(Exception):
+    """O circuito está aberto: o upstream não é chamado."""
+
+    def __init__(self, retry_in):
+        super().__init__(f'upstream indisponível (circuito aberto, nova tentativa em {retry_in:.0f}s)')
+        self.retry_in = retry_in
+
+
+class LatencyTracker:
+    """p95 das últimas `window` latências de chamadas bem-sucedidas."""
+
+    def __init__(self, window=200, min_samples=20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._p95 = None
+        self._dirty = 0
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+        self._dirty += 1
+
+    def p95(self):
+        if len(self._samples) < self.min_samples:
+            return None
+        # Recalcula a cada 10 amostras novas (ordenar 200 valores é barato, mas não em todos os pedidos)
+        if self._p95 is None or self._dirty >= 10:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            self._dirty = 0
+        return self._p95
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, cooldown=30.0, slow_call=5.0,
+                 min_timeout=2.0, max_timeout=15.0, multiplier=3.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.slow_call = slow_call
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.multiplier = multiplier
+        self.latency = LatencyTracker()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.opened_count = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def timeout(self):
+        """Timeout (s) para a próxima chamada."""
+        p95 = self.latency.p95()
+        if p95 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.multiplier))
+
+    def before_call(self):
+        """Levanta CircuitOpen se a chamada não deve ir ao upstream; devolve True se for a chamada de teste."""
+        with self._lock:
+            if self.state == 'closed':
+                return False
+            retry_in = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == 'open' and retry_in <= 0:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            raise CircuitOpen(max(retry_in, 0.0))
+
+    def record_success(self, elapsed):
+        with self._lock:
+            self._probe_in_flight = False
+            if elapsed > self.slow_call:
+                self._failure()
+                return
+            self.latency.add(elapsed)
+            self.failures = 0
+            if self.state != 'closed':
+                print(f"[Places] Circuito fechado: upstream respondeu em {elapsed:.2f}s")
+            self.state = 'closed'
+
+    def abandon(self):
+        """Chamada interrompida sem resultado (p.ex. cliente desligou): liberta a chamada de teste."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._probe_in_flight = False
+            self._failure()
+
+    def _failure(self):
+        self.failures += 1
+        if self.state == 'half_open':
+            reason = 'chamada de teste falhou'
+        elif self.state == 'closed' and self.failures >= self.failure_threshold:
+            reason = f'{self.failures} falha(s) seguidas'
+        else:
+            return
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.opened_count += 1
+        print(f"[Places] Circuito aberto ({reason}); nova tentativa em {self.cooldown:.0f}s")
+
+    def status(self):
+        with self._lock:
+            retry_in = None
+            if self.state != 'closed':
+                retry_in = round(max(self.opened_at + self.cooldown - time.monotonic(), 0.0), 1)
+            p95 = self.latency.p95()
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'opened': self.opened_count,
+                'rejected': self.rejected,
+                'retry_in': retry_in,
+                'p95': None if p95 is None else round(p95, 3),
+                'timeout': round(self.timeout(), 2),
+            }
@@ -0,0 +1,191 @@
+"""Formato compacto do modelo Tella: inferência só com NumPy, partilhável entre workers.
+
+`python manage.py export_tella_model` escreve, a partir do pipeline (joblib):
+
+    tella_compact/
+      meta.json    colunas, parâmetros do MinMaxScaler, vocabulário do one-hot, base_score
+      nodes.npy    todas as árvores num único array estruturado (filho esquerdo, feature,
+                   limiar, valor da folha), lido com mmap: os workers partilham as páginas
+      model.ubj    o booster no formato nativo do XGBoost (UBJ), para inspecção/recarga
+
+O CompactModel reproduz o pipeline sem sklearn, pandas nem xgboost: codifica as
+features como o FastPredictor, converte para float32 como o XGBoost e percorre
+todas as árvores de uma vez (uma iteração por nível). As folhas são somadas em
+float32 pela ordem das árvores, a partir do base_score, como o XGBoost; a
+exportação só é aceite com paridade bit-a-bit.
+
+Este módulo não importa Django: pode ser usado por scripts e benchmarks isolados.
+"""
+from pathlib import Path
+import json
+
+import numpy as np
+
+FORMAT_VERSION = 1
+# O filho direito é sempre left + 1 (o XGBoost cria os filhos aos pares)
+NODE_DTYPE = np.dtype([
+    ('left', '<i4'),
+    ('feature', '<i4'),
+    ('threshold', '<f4'),
+    ('value', '<f4'),
+    ('default_left', 'u1'),
+])
+
+
+class FeatureEncoder:
+    """Escreve os dicts de features na matriz do pipeline (MinMaxScaler + one-hot).
+
+    As subclasses definem num_cols, cat_cols, scale, min, onehot_index e n_features.
+    """
+
+    def encode(self, features_list):
+        n = len(features_list)
+        n_num = len(self.num_cols)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+        # Coluna a coluna: None/ausente vira NaN (tratado como missing pelo booster)
+        for j, col in enumerate(self.num_cols):
+            X[:, j] = np.array([f.get(col) for f in features_list], dtype=np.float64)
+        rows = np.arange(n)
+        for index, col in zip(self.onehot_index, self.cat_cols):
+            pos = np.array([index.get(f.get(col), -1) for f in features_list], dtype=np.intp)
+            known = pos >= 0
+            X[rows[known], pos[known]] = 1.0
+        # Mesma ordem de operações do MinMaxScaler.transform
+        num = X[:, :n_num]
+        num *= self.scale
+        num += self.min
+        return X
+
+
+def _tree_nodes(tree, offset):
+    """Nós de uma árvore do JSON do XGBoost, com índices absolutos.
+
+    As folhas apontam para si próprias (limiar +inf, missing à esquerda): percorrer
+    mais níveis do que a profundidade da árvore deixa-as no mesmo sítio.
+    """
+    n = int(tree['tree_param']['num_nodes'])
+    if any(tree['split_type']) or tree['categories']:
+        raise ValueError('Árvores com splits categóricos não são suportadas')
+    left = np.asarray(tree['left_children'], dtype=np.int64)
+    right = np.asarray(tree['right_children'], dtype=np.int64)
+    leaf = left < 0
+    if np.any(right[~leaf] != left[~leaf] + 1):
+        raise ValueError('Árvore com filhos não consecutivos')
+    nodes = np.zeros(n, dtype=NODE_DTYPE)
+    nodes['left'] = np.where(leaf, np.arange(n), left) + offset
+    nodes['feature'] = np.where(leaf, 0, tree['split_indices'])
+    # Nas folhas, split_conditions guarda o valor da folha
+    cond = np.asarray(tree['split_conditions'], dtype=np.float32)
+    nodes['threshold'] = np.where(leaf, np.float32(np.inf), cond)
+    nodes['value'] = np.where(leaf, cond, np.float32(0))
+    nodes['default_left'] = np.where(leaf, 1, tree['default_left'])
+    return nodes, _depth(left, right)
+
+
+def _depth(left, right):
+    depth, level = 0, [0]
+    while level:
+        level = [c for i in level for c in (left[i], right[i]) if c >= 0]
+        depth += bool(level)
+    return depth
+
+
+def export(model, directory, source_hash=None):
+    """Exporta o pipeline sklearn+XGBoost para `directory`; devolve o caminho."""
+    from .ml import FastPredictor
+
+    fast = FastPredictor(model)
+    booster = fast.booster
+    raw = json.loads(booster.save_raw('json'))
+    learner = raw['learner']
+    if learner['objective']['name'] != 'reg:squarederror' or learner['gradient_booster']['name'] != 'gbtree':
+        raise ValueError('Só modelos gbtree com reg:squarederror são suportados')
+    trees = learner['gradient_booster']['model']['trees']
+    start, stop = fast.iteration_range
+    if stop:
+        trees = trees[start:stop]
+
+    chunks, roots, depth, offset = [], [], 0, 0
+    for tree in trees:
+        nodes, tree_depth = _tree_nodes(tree, offset)
+        chunks.append(nodes)
+        roots.append(offset)
+        depth = max(depth, tree_depth)
+        offset += len(nodes)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / 'nodes.npy', np.concatenate(chunks), allow_pickle=False)
+    booster.save_model(str(directory / 'model.ubj'))
+    meta = {
+        'format': FORMAT_VERSION,
+        'source_hash': source_hash,
+        'num_cols': fast.num_cols,
+        'cat_cols': fast.cat_cols,
+        'scale': fast.scale.tolist(),
+        'min': fast.min.tolist(),
+        'categories': [sorted(index, key=index.get) for index in fast.onehot_index],
+        'n_features': fast.n_features,
+        'base_score': float(np.float32(learner['learner_model_param']['base_score'])),
+        'roots': roots,
+        'max_depth': depth,
+    }
+    (directory / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding='utf-8')
+    return directory
+
+
+class CompactModel(FeatureEncoder):
+    """Inferência a partir de um directório exportado por `export`."""
+
+    def __init__(self, meta, nodes):
+        self.meta = meta
+        self.num_cols = meta['num_cols']
+        self.cat_cols = meta['cat_cols']
+        self.scale = np.asarray(meta['scale'], dtype=np.float64)
+        self.min = np.asarray(meta['min'], dtype=np.float64)
+        self.onehot_index = []
+        offset = len(self.num_cols)
+        for cats in meta['categories']:
+            self.onehot_index.append({c: offset + i for i, c in enumerate(cats)})
+            offset += len(cats)
+        self.n_features = meta['n_features']
+        self.base_score = np.float32(meta['base_score'])
+        self.roots = np.asarray(meta['roots'], dtype=np.int64)
+        self.max_depth = meta['max_depth']
+        self.source_hash = meta.get('source_hash')
+        # Campos do array estruturado (vistas sobre o mmap, sem cópia)
+        self.left = nodes['left']
+        self.feature = nodes['feature']
+        self.threshold = nodes['threshold']
+        self.value = nodes['value']
+        self.default_left = nodes['default_left'].view(bool)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        directory = Path(directory)
+        meta = json.loads((directory / 'meta.json').read_text(encoding='utf-8'))
+        if meta.get('format') != FORMAT_VERSION:
+            raise ValueError(f'Formato compacto desconhecido: {meta.get("format")}')
+        nodes = np.load(directory / 'nodes.npy', mmap_mode='r' if mmap else None, allow_pickle=False)
+        return cls(meta, nodes)
+
+    def predict(self, features_list):
+        # O XGBoost converte os dados para float32 antes de comparar com os limiares
+        X = self.encode(features_list).astype(np.float32)
+        n = len(X)
+        flat = X.ravel()
+        row_base = (np.arange(n, dtype=np.int64) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[node]]
+            go_left = x < self.threshold[node]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[node], go_left)
+            # Filho direito = esquerdo + 1
+            node = self.left[node] + ~go_left
+        # Soma sequencial em float32 (cumsum), a começar no base_score, como o XGBoost
+        leaves = np.empty((n, len(self.roots) + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_score
+        leaves[:, 1:] = self.value[node]
+        return np.cumsum(leaves, axis=1, dtype=np.float32)[:, -1]
@@ -0,0 +1,179 @@
+"""Tabela pré-calculada de custos diários do modelo Tella.
+
+À parte rating, número de avaliações e coordenadas, as entradas de uma estimativa
+são categóricas. A tabela guarda as previsões do modelo numa grelha
+categoria × tipo de viajante × orçamento × transporte × hospedagem × rating ×
+avaliações × latitude × longitude, num ficheiro .npy (float32) lido com mmap no
+arranque. Pedidos que caem num ponto da grelha são respondidos por indexação
+directa, sem chamar o modelo; opcionalmente interpola-se entre pontos.
+
+O ficheiro é gerado por `python manage.py build_cost_table` e acompanhado de um
+.json com os eixos, o hash do modelo e o hash dos valores padrão usados; se algum
+deles não corresponder ao modelo carregado, a tabela é ignorada.
+"""
+from itertools import product
+from pathlib import Path
+import json
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from . import ml
+
+TIPOS_VIAJANTE = ['aventura', 'casal', 'família', 'negócios', 'solo']
+SIM_NAO = ['sim', 'nao']
+
+# Eixos contínuos por omissão (cobrem Angola e os limiares de sentimento 3.0/4.5)
+DEFAULT_RATINGS = [0.0, 3.0, 3.5, 4.0, 4.25, 4.5, 4.75, 5.0]
+DEFAULT_REVIEWS = [0, 10, 50, 100, 250, 500, 1000, 2500, 5000]
+DEFAULT_LAT_RANGE = (-18.0, -4.5)
+DEFAULT_LNG_RANGE = (11.5, 24.0)
+
+CATEGORICAL_AXES = ('categoria_destino', 'tipo_viajante', 'nivel_orcamento', 'precisa_transporte', 'precisa_hospedagem')
+NUMERIC_AXES = ('rating', 'reviews', 'lat', 'lng')
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def defaults_hash():
+    """Hash dos valores padrão e multiplicadores usados para montar as features."""
+    return ml.defaults_version()
+
+
+def table_path():
+    path = getattr(settings, 'TELLA_COST_TABLE_PATH', None)
+    return Path(path) if path else Path(settings.BASE_DIR).parent / 'tella_cost_table.npy'
+
+
+def default_axes(lat_steps=8, lng_steps=8):
+    return {
+        'categoria_destino': ml.category_names(),
+        'tipo_viajante': list(TIPOS_VIAJANTE),
+        'nivel_orcamento': list(ml.BUDGET_MULTIPLIERS),
+        'precisa_transporte': list(SIM_NAO),
+        'precisa_hospedagem': list(SIM_NAO),
+        'rating': list(DEFAULT_RATINGS),
+        'reviews': list(DEFAULT_REVIEWS),
+        'lat': [round(float(v), 5) for v in np.linspace(*DEFAULT_LAT_RANGE, lat_steps)],
+        'lng': [round(float(v), 5) for v in np.linspace(*DEFAULT_LNG_RANGE, lng_steps)],
+    }
+
+
+def build_table(model, axes, predict=None):
+    """Calcula a grelha completa, um bloco de pontos numéricos por combinação categórica."""
+    predict = predict or (lambda rows: ml._predict(model, rows))
+    shape = tuple(len(axes[name]) for name in CATEGORICAL_AXES + NUMERIC_AXES)
+    values = np.empty(shape, dtype=np.float32)
+    numeric_points = list(product(*(axes[name] for name in NUMERIC_AXES)))
+    numeric_shape = shape[len(CATEGORICAL_AXES):]
+    for idx in np.ndindex(*shape[:len(CATEGORICAL_AXES)]):
+        cat = [axes[name][i] for name, i in zip(CATEGORICAL_AXES, idx)]
+        rows = [
+            ml.build_place_features(cat[0], float(rating), float(reviews), cat[1], cat[2], cat[3], cat[4],
+                                    float(lat), float(lng))
+            for rating, reviews, lat, lng in numeric_points
+        ]
+        values[idx] = np.asarray(predict(rows), dtype=np.float32).reshape(numeric_shape)
+    return values
+
+
+def save_table(values, axes, model_hash, path=None):
+    path = Path(path) if path else table_path()
+    np.save(path, values, allow_pickle=False)
+    meta = {
+        'axes': axes,
+        'shape': list(values.shape),
+        'dtype': str(values.dtype),
+        'model_hash': model_hash,
+        'defaults_hash': defaults_hash(),
+    }
+    path.with_suffix('.json').write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding='utf-8')
+    return path
+
+
+class CostTable:
+    """Tabela mmap com lookup O(1) e interpolação multilinear opcional."""
+
+    def __init__(self, values, axes):
+        self.values = values
+        self.axes = axes
+        self.cat_index = [{v: i for i, v in enumerate(axes[name])} for name in CATEGORICAL_AXES]
+        self.num_axes = [np.asarray(axes[name], dtype=np.float64) for name in NUMERIC_AXES]
+        self.num_index = [{float(v): i for i, v in enumerate(axes[name])} for name in NUMERIC_AXES]
+
+    @classmethod
+    def load(cls, path=None):
+        path = Path(path) if path else table_path()
+        meta = json.loads(path.with_suffix('.json').read_text(encoding='utf-8'))
+        values = np.load(path, mmap_mode='r', allow_pickle=False)
+        if list(values.shape) != meta['shape']:
+            raise ValueError('Tabela de custos com forma inconsistente')
+        table = cls(values, meta['axes'])
+        table.meta = meta
+        return table
+
+    def _categorical(self, inputs):
+        idx = []
+        for index, name in zip(self.cat_index, CATEGORICAL_AXES):
+            i = index.get(inputs[name])
+            if i is None:
+                return None
+            idx.append(i)
+        return tuple(idx)
+
+    def lookup(self, inputs, interpolate=False):
+        """Custo diário para `inputs` (args de ml.build_place_features), ou None fora da grelha."""
+        cat = self._categorical(inputs)
+        if cat is None:
+            return None
+        point = [float(inputs[name]) for name in NUMERIC_AXES]
+        exact = [index.get(v) for index, v in zip(self.num_index, point)]
+        if None not in exact:
+            return float(self.values[cat + tuple(exact)])
+        if not interpolate:
+            return None
+
+        # Interpolação multilinear nos 4 eixos contínuos (16 vértices)
+        lows, weights = [], []
+        for axis, v in zip(self.num_axes, point):
+            if v < axis[0] or v > axis[-1]:
+                return None
+            hi = min(int(np.searchsorted(axis, v, side='right')), len(axis) - 1)
+            lo = max(hi - 1, 0)
+            span = axis[hi] - axis[lo]
+            lows.append(lo)
+            weights.append(0.0 if span == 0 else (v - axis[lo]) / span)
+        block = self.values[cat][tuple(slice(lo, lo + 2) for lo in lows)].astype(np.float64)
+        for w in weights:
+            block = block[0] * (1.0 - w) + block[-1] * w
+        return float(block)
+
+
+def get_cost_table():
+    """Tabela carregada (uma vez por processo) se válida para o modelo actual, senão None."""
+    global _table
+    if getattr(settings, 'TELLA_COST_TABLE', 'exact') == 'off':
+        return None
+    model_hash = ml.get_model_hash()
+    if _table is not None and _table[0] == model_hash:
+        return _table[1]
+    with _table_lock:
+        if _table is not None and _table[0] == model_hash:
+            return _table[1]
+        table = None
+        path = table_path()
+        if model_hash and path.exists():
+            try:
+                table = CostTable.load(path)
+                if table.meta.get('model_hash') != model_hash or table.meta.get('defaults_hash') != defaults_hash():
+                    print("[ML] Tabela de custos desactualizada para o modelo actual; ignorada.")
+                    table = None
+                else:
+                    print(f"[ML] Tabela de custos carregada (mmap) de: {path}")
+            except Exception as e:
+                print(f"[ML] Falha ao carregar tabela de custos: {e}")
+                table = None
+        _table = (model_hash, table)
+        return table
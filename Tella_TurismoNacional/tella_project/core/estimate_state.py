@@ -0,0 +1,72 @@
+"""Última estimativa e lugar seleccionado, num cookie assinado em vez da sessão.
+
+Cada estimativa gravava `last_estimate` e o dicionário `last_place` na sessão,
+ou seja, um UPDATE em django_session por pedido. O estado vai agora num cookie
+próprio, compacto:
+
+- uma lista de valores na ordem fixa de PLACE_FIELDS (sem os nomes das chaves),
+  com versão e id do utilizador, assinada com a SECRET_KEY (`django.core.signing`,
+  comprimida com zlib quando compensa);
+- o id do utilizador impede que o cookie de outra conta seja aceite neste browser;
+- expira com a sessão (SESSION_COOKIE_AGE) e é apagado no logout.
+
+Assim o caminho estimativa → redirect → planejador não escreve na base de dados.
+As chaves antigas da sessão só são lidas quando não há cookie (sessões já abertas).
+"""
+from django.conf import settings
+from django.core import signing
+
+COOKIE_NAME = 'tella_estimate'
+SALT = 'core.estimate_state'
+# Mudar a versão (ou PLACE_FIELDS) invalida os cookies existentes
+VERSION = 1
+PLACE_FIELDS = (
+    'id', 'name', 'address', 'lat', 'lng', 'rating', 'userRatingCount', 'categoria_destino',
+    'tipo_viajante', 'duracao_dias', 'nivel_orcamento', 'precisa_transporte', 'precisa_hospedagem',
+)
+
+
+def dumps(user_id, estimate, place):
+    """Valor assinado do cookie para `estimate` (float ou None) e o dicionário `place`."""
+    if estimate is not None:
+        estimate = round(float(estimate), 2)
+    values = [place.get(field) for field in PLACE_FIELDS]
+    return signing.dumps([VERSION, user_id, estimate, values], salt=SALT, compress=True)
+
+
+def loads(value, user_id):
+    """(estimativa, lugar) do cookie, ou None se for inválido, expirado ou de outro utilizador."""
+    try:
+        data = signing.loads(value, salt=SALT, max_age=settings.SESSION_COOKIE_AGE)
+        version, owner, estimate, values = data
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if version != VERSION or owner != user_id or len(values) != len(PLACE_FIELDS):
+        return None
+    return estimate, dict(zip(PLACE_FIELDS, values))
+
+
+def save(response, request, estimate, place):
+    response.set_cookie(
+        COOKIE_NAME,
+        dumps(request.user.pk, estimate, place),
+        max_age=settings.SESSION_COOKIE_AGE,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite='Lax',
+    )
+    return response
+
+
+def load(request):
+    """(estimativa, lugar) da última estimativa do utilizador; (None, None) se não houver."""
+    value = request.COOKIES.get(COOKIE_NAME)
+    if value is not None:
+        return loads(value, request.user.pk) or (None, None)
+    # Sessões anteriores ao cookie
+    return request.session.get('last_estimate'), request.session.get('last_place')
+
+
+def clear(response):
+    response.delete_cookie(COOKIE_NAME, samesite='Lax')
+    return response
@@ -0,0 +1,88 @@
+"""Distâncias geográficas vectorizadas e vizinhos mais próximos.
+
+- `haversine_km`: distância de um ponto a muitos (ou ponto a ponto, com broadcasting);
+- `pairwise_km`: matriz de distâncias entre todos os pares (N×N);
+- `GeoIndex`: BallTree (métrica haversine) sobre os destinos do CSV e os lugares já
+  vistos na Places API (os do índice de busca local), para os k mais próximos.
+
+Todas as coordenadas em graus decimais; distâncias em km.
+"""
+import math
+import threading
+
+import numpy as np
+
+from . import search_index
+
+EARTH_RADIUS_KM = 6371.0
+
+_geo_index = None
+_geo_lock = threading.Lock()
+
+
+def haversine_km_scalar(lat1, lng1, lat2, lng2):
+    """Versão escalar (math), usada como referência nos benchmarks."""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Distância de (lat, lng) a cada ponto de (lats, lngs); aceita escalares ou arrays."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs, dtype=np.float64)) - np.radians(lng)
+    a = np.sin(dlat * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng * 0.5) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def pairwise_km(lats, lngs):
+    """Matriz N×N de distâncias entre todos os pares de pontos."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    return haversine_km(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+
+
+class GeoIndex:
+    """BallTree (haversine) sobre uma lista de lugares com 'lat'/'lng'."""
+
+    def __init__(self, items):
+        # Import tardio: o sklearn só é preciso quando o índice é construído
+        from sklearn.neighbors import BallTree
+        self.items = [it for it in items if it.get('lat') is not None and it.get('lng') is not None]
+        coords = np.radians([[float(it['lat']), float(it['lng'])] for it in self.items]).reshape(-1, 2)
+        self.tree = BallTree(coords, metric='haversine') if len(self.items) else None
+
+    def __len__(self):
+        return len(self.items)
+
+    def nearest(self, lat, lng, k=5, exclude_id=None):
+        """[(lugar, distância em km)] dos k lugares mais próximos de (lat, lng)."""
+        if self.tree is None or k <= 0:
+            return []
+        # Pede um a mais para poder excluir o próprio lugar
+        n = min(len(self.items), k + (1 if exclude_id else 0))
+        dist, idx = self.tree.query(np.radians([[lat, lng]]), k=n)
+        results = []
+        for d, i in zip(dist[0], idx[0]):
+            item = self.items[i]
+            if exclude_id and item.get('id') == exclude_id:
+                continue
+            results.append((item, float(d) * EARTH_RADIUS_KM))
+        return results[:k]
+
+
+def get_geo_index():
+    """Índice espacial dos lugares do índice de busca local; reconstruído quando este muda."""
+    global _geo_index
+    source = search_index.get_index()
+    source.sync()
+    version = source.version
+    if _geo_index is not None and _geo_index[0] == version:
+        return _geo_index[1]
+    with _geo_lock:
+        if _geo_index is None or _geo_index[0] != version:
+            _geo_index = (version, GeoIndex(list(source.items.values())))
+        return _geo_index[1]
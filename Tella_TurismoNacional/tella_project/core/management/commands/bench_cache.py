@@ -0,0 +1,79 @@
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache_backends import LocMemCache, SQLiteCache
+
+
+def _payload(key):
+    # Tamanho semelhante a uma entrada de busca de Places (6 resultados)
+    return {'items': [{'id': f'{key}-{i}', 'name': f'Lugar {i}', 'address': 'Rua 1, Luanda',
+                       'lat': -8.83, 'lng': 13.23, 'rating': 4.5, 'user_ratings_total': 100,
+                       'types': ['tourist_attraction'], 'photo': None} for i in range(6)],
+            'fresh_until': time.time() + 600}
+
+
+def _make_backend(mode, location, max_entries):
+    params = {'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    if mode == 'sqlite':
+        return SQLiteCache(location, params)
+    return LocMemCache(location, params)
+
+
+def _worker(mode, location, max_entries, keys, weights, n_requests, seed, queue):
+    """Um worker gunicorn simulado: cada pedido lê a cache e, em miss, "vai ao upstream" e grava."""
+    backend = _make_backend(mode, location, max_entries)
+    rnd = random.Random(seed)
+    t0 = time.perf_counter()
+    for key in rnd.choices(keys, weights=weights, k=n_requests):
+        if backend.get(key) is None:
+            backend.set(key, _payload(key), 600)
+    stats = backend.stats()
+    queue.put((stats['hits'], stats['misses'], time.perf_counter() - t0))
+
+
+class Command(BaseCommand):
+    help = ("Compara a taxa de acerto da cache por processo (locmem) com a cache partilhada (sqlite) "
+            "com N workers a servir buscas com popularidade Zipf, antes e depois de um reinício.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=2000, help='Pedidos por worker em cada fase')
+        parser.add_argument('--keys', type=int, default=1000, help='Consultas distintas')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Expoente da distribuição de popularidade')
+        parser.add_argument('--max-entries', type=int, default=10000)
+
+    def handle(self, *args, **opts):
+        try:
+            ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            raise CommandError('Este comando precisa de multiprocessing com fork (Linux/macOS).')
+        keys = [f'places:bench:{i}' for i in range(opts['keys'])]
+        weights = [1.0 / (rank + 1) ** opts['zipf'] for rank in range(opts['keys'])]
+
+        self.stdout.write(f"{opts['workers']} workers × {opts['requests']} pedidos, {opts['keys']} consultas "
+                          f"(Zipf {opts['zipf']})")
+        self.stdout.write(f"{'modo':<8} {'fase':<16} {'hits':>7} {'misses':>7} {'hit rate':>9} {'µs/pedido':>10}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in ('locmem', 'sqlite'):
+                location = str(Path(tmp) / 'bench.sqlite3') if mode == 'sqlite' else f'bench-{time.time_ns()}'
+                # Segunda fase = processos novos (deploy/reinício): a locmem começa vazia, a sqlite não
+                for phase, seed in (('arranque', 0), ('após reinício', 1000)):
+                    queue = ctx.Queue()
+                    procs = [ctx.Process(target=_worker, args=(mode, location, opts['max_entries'], keys, weights,
+                                                               opts['requests'], seed + i, queue))
+                             for i in range(opts['workers'])]
+                    for p in procs:
+                        p.start()
+                    results = [queue.get() for _ in procs]
+                    for p in procs:
+                        p.join()
+                    hits = sum(r[0] for r in results)
+                    misses = sum(r[1] for r in results)
+                    per_req = sum(r[2] for r in results) / (hits + misses) * 1e6
+                    self.stdout.write(f"{mode:<8} {phase:<16} {hits:>7} {misses:>7} "
+                                      f"{hits / (hits + misses):>9.1%} {per_req:>10.1f}")
@@ -0,0 +1,163 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Hasher rápido só no benchmark: o PBKDF2 (~1 s de CPU por login) esconderia o custo da base de dados
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+PASSWORD = 'bench-pass-123'
+PLACE = {
+    'name': 'Fortaleza de São Miguel', 'address': 'Luanda, Angola', 'lat': '-8.8106', 'lng': '13.2247',
+    'rating': '4.5', 'userRatingCount': '1200', 'categoria_principal': 'tourist_attraction',
+    'duracao_dias': '3', 'nivel_orcamento': 'medio',
+}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+class Command(BaseCommand):
+    help = ("Escritas concorrentes na base de dados: N processos (como workers do servidor) fazem login "
+            "e estimativa (sessão, last_login) ao mesmo tempo, para cada perfil de DB_PROFILE, numa base "
+            "SQLite temporária. Mostra débito, latências e erros (p.ex. \"database is locked\").")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='default,production', help='Perfis a comparar')
+        parser.add_argument('--workers', type=int, default=4, help='Processos em simultâneo')
+        parser.add_argument('--requests', type=int, default=50, help='Logins + estimativas por processo')
+        # Modos internos (processos filhos)
+        parser.add_argument('--setup', action='store_true', help='(interno) cria os utilizadores')
+        parser.add_argument('--worker', type=int, help='(interno) corre um worker')
+
+    def handle(self, *args, **opts):
+        if opts['setup']:
+            return self._setup(opts['workers'])
+        if opts['worker'] is not None:
+            return self._worker(opts['worker'], opts['requests'])
+        n = max(1, opts['workers'])
+        self.stdout.write(f"{'perfil':<11} {'pedidos/s':>10} {'login p50':>10} {'p95':>7} {'p99':>7} "
+                          f"{'estimativa p50':>15} {'p95':>7} {'p99':>7} {'erros':>6}")
+        for profile in [p.strip() for p in opts['profiles'].split(',') if p.strip()]:
+            with tempfile.TemporaryDirectory(prefix='tella-db-') as tmp:
+                self._report(profile, self._run(profile, Path(tmp) / 'db.sqlite3', n, opts['requests']))
+
+    # --- processo principal ---
+
+    def _env(self, profile, path):
+        env = {**os.environ, 'DB_PROFILE': profile, 'SQLITE_PATH': str(path), 'DEBUG': '0',
+               'ALLOWED_HOSTS': 'testserver', 'LOG_LEVEL': 'WARNING', 'TELLA_EAGER_LOAD': '0',
+               'TELLA_MODEL_POLL_SECONDS': '0', 'PYTHONWARNINGS': 'ignore'}
+        # Só SQLite: nunca escrever na base de dados de DATABASE_URL
+        env.pop('DATABASE_URL', None)
+        return env
+
+    def _manage(self, *args):
+        return [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), *args]
+
+    def _run(self, profile, path, n, requests):
+        env = self._env(profile, path)
+        for step in (['migrate', '--noinput', '-v', '0'], ['bench_db_writes', '--setup', '--workers', str(n)]):
+            result = subprocess.run(self._manage(*step), env=env, capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f'{profile}: {" ".join(step[:2])} falhou:\n{result.stderr[-2000:]}')
+        procs = [subprocess.Popen(self._manage('bench_db_writes', '--worker', str(i), '--requests', str(requests)),
+                                  env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, text=True) for i in range(n)]
+        try:
+            # Cada worker arranca e aquece (modelo incluído); só depois começam todos ao mesmo tempo
+            for proc in procs:
+                if self._read_line(proc, lambda line: line == 'ready') is None:
+                    raise CommandError(f'{profile}: um worker terminou no arranque.')
+            t0 = time.perf_counter()
+            for proc in procs:
+                proc.stdin.write('go\n')
+                proc.stdin.flush()
+            results = [json.loads(self._read_line(proc, lambda line: line.startswith('{')) or '{}') for proc in procs]
+            elapsed = time.perf_counter() - t0
+        finally:
+            for proc in procs:
+                try:
+                    proc.communicate('', timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+        if not all(results):
+            raise CommandError(f'{profile}: um worker terminou sem resultados.')
+        return {
+            'elapsed': elapsed,
+            'login': [ms for r in results for ms in r['login']],
+            'estimate': [ms for r in results for ms in r['estimate']],
+            'errors': sum(r['errors'] for r in results),
+            'error_samples': [e for r in results for e in r['error_samples']][:3],
+        }
+
+    def _read_line(self, proc, accept):
+        """Próxima linha de `proc` aceite por `accept` (ignora os prints do modelo), ou None."""
+        for line in proc.stdout:
+            if accept(line.strip()):
+                return line.strip()
+        return None
+
+    def _report(self, profile, result):
+        done = len(result['login']) + len(result['estimate'])
+        cols = []
+        for flow in ('login', 'estimate'):
+            values = result[flow]
+            cols.append(f"{_percentile(values, 0.5):8.1f}ms {_percentile(values, 0.95):5.0f}ms {_percentile(values, 0.99):5.0f}ms")
+        self.stdout.write(f"{profile:<11} {done / result['elapsed']:10.1f} {cols[0]:>26} {cols[1]:>31} {result['errors']:6d}")
+        for sample in result['error_samples']:
+            self.stdout.write(self.style.WARNING(f'  {sample}'))
+
+    # --- processos filhos ---
+
+    def _setup(self, n):
+        from django.contrib.auth.models import User
+        from django.test.utils import override_settings
+        with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+            for i in range(n):
+                User.objects.create_user(f'bench{i}', password=PASSWORD)
+
+    def _worker(self, index, requests):
+        from django.test import Client
+        from django.test.utils import override_settings
+
+        # Cabeçalho do proxy: com DEBUG=0 o SECURE_SSL_REDIRECT redireccionaria para https
+        client = Client(HTTP_X_FORWARDED_PROTO='https')
+        credentials = {'username': f'bench{index}', 'password': PASSWORD}
+        timings = {'login': [], 'estimate': []}
+        errors, samples = 0, []
+
+        def call(flow, path, data, record=True):
+            nonlocal errors
+            t0 = time.perf_counter()
+            try:
+                response = client.post(path, data)
+                ok = response.status_code == 302
+                if not ok:
+                    samples.append(f'{flow}: HTTP {response.status_code}')
+            except Exception as e:
+                ok = False
+                samples.append(f'{flow}: {e!r}'[:200])
+            if record:
+                if ok:
+                    timings[flow].append((time.perf_counter() - t0) * 1000)
+                else:
+                    errors += 1
+
+        with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+            call('login', '/login/', credentials, record=False)
+            call('estimate', '/api/places/estimate/', PLACE, record=False)
+            print('ready', flush=True)
+            sys.stdin.readline()
+            for _ in range(requests):
+                call('login', '/login/', credentials)
+                call('estimate', '/api/places/estimate/', PLACE)
+        print(json.dumps({**timings, 'errors': errors, 'error_samples': samples[:3]}), flush=True)
+        sys.stdin.read()
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import random
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.ml import DEFAULTS_BY_CATEGORY, estimate_cost, estimate_costs, get_pipeline
+
+TIPOS_VIAJANTE = ['aventura', 'casal', 'família', 'negócios', 'solo']
+SENTIMENTOS = ['negativo', 'neutro', 'positivo']
+
+
+def synthetic_features(n, seed=42):
+    """Gera `n` dicionários de features plausíveis para o modelo Tella."""
+    rnd = random.Random(seed)
+    categorias = list(DEFAULTS_BY_CATEGORY)
+    rows = []
+    for _ in range(n):
+        cat = rnd.choice(categorias)
+        d = DEFAULTS_BY_CATEGORY[cat]
+        mult = rnd.choice([0.7, 1.0, 1.5])
+        rows.append({
+            'categoria_destino': cat,
+            'classificacao_media': round(rnd.uniform(3.0, 5.0), 2),
+            'num_avaliacoes': rnd.randint(0, 5000),
+            'sentimento_avaliacao': rnd.choice(SENTIMENTOS),
+            'tipo_viajante': rnd.choice(TIPOS_VIAJANTE),
+            'preco_transporte_medio': d['preco_transporte_medio'] * mult if rnd.random() > 0.2 else 0.0,
+            'preco_hospedagem_medio': d['preco_hospedagem_medio'] * mult if rnd.random() > 0.2 else 0.0,
+            'preco_alimentacao_medio': d['preco_alimentacao_medio'] * mult,
+            'preco_lazer_medio': d['preco_lazer_medio'] * mult,
+            'indice_sazonalidade': d['indice_sazonalidade'],
+            'pontuacao_popularidade': d['pontuacao_popularidade'],
+            'fator_sustentabilidade': d['fator_sustentabilidade'],
+            'latitude': rnd.uniform(-18.0, -4.5),
+            'longitude': rnd.uniform(11.5, 23.5),
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = ("Compara a latência da estimativa linha-a-linha (estimate_cost) com a estimativa em lote "
+            "(estimate_costs), e do lote via pipeline sklearn/pandas como referência.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,6,100,10000', help='Tamanhos N separados por vírgula')
+        parser.add_argument('--max-per-row', type=int, default=10000,
+                            help='Acima deste N o modo linha-a-linha não é medido')
+        parser.add_argument('--with-cache', action='store_true',
+                            help='Mede com a cache de previsões activa (por omissão mede só o modelo)')
+
+    def handle(self, *args, **opts):
+        with override_settings(TELLA_PREDICTION_CACHE=opts['with_cache']):
+            self._run(opts)
+
+    def _run(self, opts):
+        try:
+            sizes = [int(x) for x in opts['sizes'].split(',') if x.strip()]
+        except ValueError:
+            raise CommandError('--sizes deve ser uma lista de inteiros')
+        model = get_pipeline()
+        if model is None:
+            raise CommandError('Modelo Tella indisponível.')
+
+        # Aquecimento (primeira chamada paga imports/alocação)
+        with contextlib.redirect_stdout(io.StringIO()):
+            estimate_costs(synthetic_features(6))
+
+        self.stdout.write(f"{'N':>8} {'linha-a-linha (ms)':>20} {'lote (ms)':>12} {'speedup':>9} {'pipeline lote (ms)':>20}")
+        for n in sizes:
+            rows = synthetic_features(n)
+            per_row_ms = None
+            with contextlib.redirect_stdout(io.StringIO()):
+                if n <= opts['max_per_row']:
+                    t0 = time.perf_counter()
+                    single = [estimate_cost(f) for f in rows]
+                    per_row_ms = (time.perf_counter() - t0) * 1000
+                t0 = time.perf_counter()
+                batch = estimate_costs(rows)
+                batch_ms = (time.perf_counter() - t0) * 1000
+                t0 = time.perf_counter()
+                model.predict(pd.DataFrame(rows))
+                pipeline_ms = (time.perf_counter() - t0) * 1000
+            if per_row_ms is not None and single != batch:
+                raise CommandError(f'Resultados divergentes entre os dois modos para N={n}')
+            per_row_txt = f"{per_row_ms:20.1f}" if per_row_ms is not None else f"{'-':>20}"
+            speedup = f"{per_row_ms / batch_ms:8.1f}x" if per_row_ms is not None else f"{'-':>9}"
+            self.stdout.write(f"{n:>8} {per_row_txt} {batch_ms:12.1f} {speedup} {pipeline_ms:20.1f}")
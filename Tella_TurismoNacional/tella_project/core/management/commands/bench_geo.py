@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core import geo
+
+# Caixa que cobre Angola
+LAT_RANGE = (-18.0, -4.5)
+LNG_RANGE = (11.5, 24.0)
+LUANDA = (-8.8383, 13.2344)
+
+
+def _random_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(*LAT_RANGE, n), rng.uniform(*LNG_RANGE, n)
+
+
+def _best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = ("Compara a haversine escalar (math, em ciclo) com a vectorizada (NumPy) e a procura dos k "
+            "mais próximos por força bruta com a BallTree.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,1000000', help='Números de pontos (separados por vírgula)')
+        parser.add_argument('--pairs', type=int, default=1000, help='Pontos da matriz de todos os pares')
+        parser.add_argument('--k', type=int, default=5)
+
+    def handle(self, *args, **opts):
+        sizes = [int(s) for s in opts['sizes'].split(',') if s.strip()]
+        self.stdout.write(f"{'teste':<30} {'n':>9} {'escalar (ms)':>13} {'vectorizado (ms)':>17} {'ganho':>7}")
+        for n in sizes:
+            lats, lngs = _random_points(n)
+            lat_list, lng_list = lats.tolist(), lngs.tolist()
+            t_scalar, ref = _best_of(lambda: [geo.haversine_km_scalar(*LUANDA, la, ln)
+                                              for la, ln in zip(lat_list, lng_list)], repeat=1)
+            t_vec, out = _best_of(lambda: geo.haversine_km(*LUANDA, lats, lngs))
+            self._check(np.asarray(ref), out)
+            self._row('um → muitos', n, t_scalar, t_vec)
+
+            # k mais próximos: argpartition sobre todas as distâncias vs. BallTree
+            index = geo.GeoIndex([{'id': i, 'lat': la, 'lng': ln} for i, (la, ln) in enumerate(zip(lat_list, lng_list))])
+            queries = list(zip(*_random_points(100, seed=1)))
+            t_brute, brute = _best_of(lambda: [np.sort(geo.haversine_km(la, ln, lats, lngs))[:opts['k']]
+                                               for la, ln in queries])
+            t_tree, tree = _best_of(lambda: [[d for _, d in index.nearest(la, ln, k=opts['k'])] for la, ln in queries])
+            self._check(np.asarray(brute), np.asarray(tree))
+            self._row(f"{opts['k']} mais próximos (100 consultas)", n, t_brute, t_tree, labels=('força bruta', 'BallTree'))
+
+        n = opts['pairs']
+        lats, lngs = _random_points(n)
+        lat_list, lng_list = lats.tolist(), lngs.tolist()
+        t_scalar, ref = _best_of(lambda: [[geo.haversine_km_scalar(a, b, c, d) for c, d in zip(lat_list, lng_list)]
+                                          for a, b in zip(lat_list, lng_list)], repeat=1)
+        t_vec, out = _best_of(lambda: geo.pairwise_km(lats, lngs))
+        self._check(np.asarray(ref), out)
+        self._row('todos os pares', n * n, t_scalar, t_vec)
+
+    def _row(self, label, n, t_ref, t_new, labels=None):
+        suffix = f"  ({labels[0]} vs. {labels[1]})" if labels else ''
+        self.stdout.write(f"{label:<30} {n:>9} {t_ref * 1000:>13.1f} {t_new * 1000:>17.1f} "
+                          f"{t_ref / t_new:>6.0f}x{suffix}")
+
+    def _check(self, expected, actual):
+        if not np.allclose(expected, actual, rtol=1e-9, atol=1e-6):
+            raise CommandError('Resultado vectorizado diverge da referência escalar')
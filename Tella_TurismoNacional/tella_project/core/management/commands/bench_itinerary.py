@@ -0,0 +1,56 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core import itinerary
+from core.ml import place_inputs, warm_up
+
+TYPES = ['tourist_attraction', 'museum', 'beach', 'park', 'restaurant', 'natural_feature']
+
+
+def synthetic_places(n, seed=0):
+    """Lugares espalhados por Luanda e arredores (~100 km)."""
+    rng = np.random.default_rng(seed)
+    return [{
+        'id': f'bench{i}',
+        'name': f'Lugar {i}',
+        'lat': float(-8.8383 + rng.normal(0, 0.4)),
+        'lng': float(13.2344 + rng.normal(0, 0.4)),
+        'rating': float(np.round(rng.uniform(3, 5), 1)),
+        'userRatingCount': int(rng.integers(0, 3000)),
+        'categoria_principal': TYPES[i % len(TYPES)],
+    } for i in range(n)]
+
+
+class Command(BaseCommand):
+    help = ("Mede o planeamento de itinerários (matriz de distâncias + vizinho mais próximo + 2-opt + custos "
+            "do modelo) e falha se o p95 ultrapassar --max-ms. A correcção do plano é verificada em core/tests.py.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stops', default='10,50,100', help='Números de paragens (separados por vírgula)')
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--max-ms', type=float, default=100.0, help='Limite do p95 para 50 ou mais paragens')
+
+    def handle(self, *args, **opts):
+        warm_up()
+        start = date(2025, 7, 1)
+        end = start + timedelta(days=opts['days'] - 1)
+        self.stdout.write(f"{'paragens':>8} {'dias':>5} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        failures = []
+        for n in [int(s) for s in opts['stops'].split(',') if s.strip()]:
+            times = []
+            for run in range(opts['runs']):
+                places = synthetic_places(n, seed=run)
+                t0 = time.perf_counter()
+                cost_inputs = [place_inputs(p)[0] for p in places]
+                itinerary.plan_itinerary(places, start, end, cost_inputs)
+                times.append((time.perf_counter() - t0) * 1000)
+            p50, p95 = np.percentile(times, [50, 95])
+            self.stdout.write(f"{n:>8} {opts['days']:>5} {p50:>9.1f} {p95:>9.1f}")
+            if n >= 50 and p95 > opts['max_ms']:
+                failures.append(f'{n} paragens: p95 {p95:.1f} ms > {opts["max_ms"]:.0f} ms')
+        if failures:
+            raise CommandError('; '.join(failures))
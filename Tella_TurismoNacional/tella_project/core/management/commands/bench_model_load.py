@@ -0,0 +1,149 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Corre em cada processo medido: arranque Django, carga do modelo, primeira previsão.
+# Imprime uma linha JSON por processo pronto e espera (stdin) que o pai leia a memória.
+WORKER = r'''
+import json, os, sys, time
+t_start = time.perf_counter()
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tella_project.settings')
+django.setup()
+
+def rss_kb():
+    with open('/proc/self/status') as fh:
+        return next(int(line.split()[1]) for line in fh if line.startswith('VmRSS'))
+
+from core import ml
+rss_base = rss_kb()
+t0 = time.perf_counter()
+active = ml.get_active()
+t1 = time.perf_counter()
+ml._predict(active.model, [ml._warm_up_features()], active)
+t2 = time.perf_counter()
+info = {
+    'format': ml.model_status()['model_format'],
+    'django_ms': (t0 - t_start) * 1000,
+    'load_ms': (t1 - t0) * 1000,
+    'first_predict_ms': (t2 - t1) * 1000,
+    'rss_base_kb': rss_base,
+    'rss_kb': rss_kb(),
+    'modules': [m for m in ('pandas', 'sklearn', 'xgboost', 'scipy') if m in sys.modules],
+}
+children = int(sys.argv[1])
+if not children:
+    print(json.dumps({**info, 'pid': os.getpid()}), flush=True)
+    sys.stdin.read()
+    sys.exit(0)
+# Modo fork: o pai carrega (como um servidor com preload) e os filhos só fazem previsões
+sys.stdout.flush()
+for _ in range(children):
+    if os.fork() == 0:
+        ml._predict(active.model, [ml._warm_up_features()] * 50, active)
+        print(json.dumps({**info, 'pid': os.getpid()}), flush=True)
+        sys.stdin.read()
+        os._exit(0)
+sys.stdin.read()
+for _ in range(children):
+    os.wait()
+'''
+
+
+def smaps_rollup(pid):
+    """Pss e memória privada (kB) de um processo, de /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'pss': values.get('Pss', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Mede arranque a frio e memória por worker do modelo Tella em cada formato (joblib vs. "
+            "compacto): processos independentes e processos filhos de um pai com o modelo carregado.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Processos por cenário')
+        parser.add_argument('--formats', default='joblib,compact', help='Formatos a comparar')
+
+    def handle(self, *args, **opts):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('Requer Linux (/proc/<pid>/smaps_rollup).')
+        n = max(1, opts['workers'])
+        self.stdout.write(f"{'formato':<8} {'cenário':<14} {'django':>8} {'carga':>8} {'1ª prev.':>9} "
+                          f"{'RSS/worker':>11} {'modelo':>8} {'Pss total':>10} {'privada total':>14}  módulos")
+        for fmt in [f.strip() for f in opts['formats'].split(',') if f.strip()]:
+            for scenario, procs in (('independentes', self._spawn(fmt, n)), ('fork', self._fork(fmt, n))):
+                self._report(fmt, scenario, procs)
+
+    def _env(self, fmt):
+        return {**os.environ, 'TELLA_MODEL_FORMAT': fmt, 'TELLA_EAGER_LOAD': '0',
+                'TELLA_MODEL_POLL_SECONDS': '0', 'LOG_LEVEL': 'WARNING', 'PYTHONWARNINGS': 'ignore'}
+
+    def _start(self, fmt, children):
+        return subprocess.Popen([sys.executable, '-c', WORKER, str(children)], cwd=settings.BASE_DIR,
+                                env=self._env(fmt), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True)
+
+    def _collect(self, proc, count):
+        """Lê `count` linhas JSON de `proc` e a memória de cada pid enquanto estão vivos."""
+        results = []
+        for line in proc.stdout:
+            if not line.startswith('{'):
+                continue
+            info = json.loads(line)
+            results.append(info)
+            if len(results) == count:
+                break
+        if len(results) < count:
+            raise CommandError(f'Processo de medição terminou antes do tempo ({proc.args[-1]} filhos).')
+        return results
+
+    def _spawn(self, fmt, n):
+        # Um de cada vez, para o tempo de carga não incluir contenção de CPU
+        procs, infos = [], []
+        try:
+            for _ in range(n):
+                proc = self._start(fmt, 0)
+                procs.append(proc)
+                infos += self._collect(proc, 1)
+            for info in infos:
+                info.update(smaps_rollup(info['pid']))
+        finally:
+            for proc in procs:
+                proc.communicate('')
+        return infos
+
+    def _fork(self, fmt, n):
+        proc = self._start(fmt, n)
+        try:
+            infos = self._collect(proc, n)
+            for info in infos:
+                info.update(smaps_rollup(info['pid']))
+        finally:
+            proc.communicate('')
+        return infos
+
+    def _report(self, fmt, scenario, infos):
+        def avg(key):
+            return sum(i[key] for i in infos) / len(infos)
+        formats = {i['format'] for i in infos}
+        if formats != {fmt}:
+            self.stdout.write(self.style.WARNING(f'{fmt}: os workers carregaram {", ".join(sorted(map(str, formats)))} '
+                                                 f'(falta exportar com export_tella_model?)'))
+        self.stdout.write(
+            f"{fmt:<8} {scenario:<14} {avg('django_ms'):6.0f}ms {avg('load_ms'):6.0f}ms {avg('first_predict_ms'):7.1f}ms "
+            f"{avg('rss_kb') / 1024:9.1f}MB {(avg('rss_kb') - avg('rss_base_kb')) / 1024:6.1f}MB "
+            f"{sum(i['pss'] for i in infos) / 1024:8.1f}MB {sum(i['private'] for i in infos) / 1024:12.1f}MB  "
+            f"{','.join(infos[0]['modules']) or '-'}"
+        )
@@ -0,0 +1,123 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import place_store
+from core.models import Place
+
+# Caixa que cobre Angola
+LAT_RANGE = (-18.0, -4.5)
+LNG_RANGE = (11.5, 24.0)
+WORDS = ('praia', 'museu', 'miradouro', 'fortaleza', 'parque', 'serra', 'lagoa', 'mercado', 'igreja', 'hotel')
+GOOGLE_TYPES = ('beach', 'museum', 'tourist_attraction', 'park', 'natural_feature', 'church', 'lodging')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def synthetic_items(n, seed=0, prefix='bench'):
+    rng = random.Random(seed)
+    return [{
+        'id': f'{prefix}:{i}',
+        'name': f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}",
+        'address': 'Angola',
+        'lat': rng.uniform(*LAT_RANGE),
+        'lng': rng.uniform(*LNG_RANGE),
+        'rating': round(rng.uniform(3, 5), 1),
+        'userRatingCount': rng.randint(0, 5000),
+        'categoria_principal': rng.choice(GOOGLE_TYPES),
+    } for i in range(n)]
+
+
+def _timed(fn, repeat):
+    """Mediana e p95 (µs) de `repeat` chamadas."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+class Command(BaseCommand):
+    help = ("Mede a tabela de lugares: gravação de respostas da busca (upsert em lote vs. um lugar de cada "
+            "vez) e consultas por id, prefixo e rectângulo, com o plano de cada consulta. Corre numa "
+            "transacção desfeita no fim: não deixa linhas na base de dados.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Lugares sintéticos na tabela')
+        parser.add_argument('--lookups', type=int, default=2000, help='Consultas de cada tipo')
+        parser.add_argument('--batches', type=int, default=200, help='Respostas de 6 lugares gravadas')
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                self._run(opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, opts):
+        if opts['rows'] < 1:
+            raise CommandError('--rows deve ser positivo')
+        t0 = time.perf_counter()
+        items = synthetic_items(opts['rows'])
+        for start in range(0, len(items), 1000):
+            place_store.upsert(items[start:start + 1000])
+        self.stdout.write(f"{opts['rows']} lugares gravados em {time.perf_counter() - t0:.2f}s "
+                          f"({Place.objects.count()} na tabela)")
+
+        # Gravação de respostas de 6 lugares (metade já existentes): um upsert vs. um por lugar
+        batches = [synthetic_items(3, seed=b, prefix=f'new{b}') + items[b * 3:b * 3 + 3] for b in range(opts['batches'])]
+        t0 = time.perf_counter()
+        for batch in batches:
+            place_store.upsert(batch)
+        t_bulk = (time.perf_counter() - t0) / len(batches) * 1000
+        fields = [f for f in place_store.UPDATE_FIELDS if f != 'updated_at']
+        t0 = time.perf_counter()
+        for batch in batches:
+            for item in batch:
+                place = place_store.place_from_item(item)
+                Place.objects.update_or_create(google_id=place.google_id,
+                                               defaults={f: getattr(place, f) for f in fields})
+        t_rows = (time.perf_counter() - t0) / len(batches) * 1000
+        self.stdout.write(f"resposta de 6 lugares: upsert em lote {t_bulk:.2f} ms, "
+                          f"update_or_create por lugar {t_rows:.2f} ms ({t_rows / t_bulk:.1f}x)")
+
+        rng = random.Random(1)
+        ids = [rng.choice(items)['id'] for _ in range(opts['lookups'])]
+        prefixes = [f'{rng.choice(WORDS)} {rng.choice(WORDS)[:2]}' for _ in range(opts['lookups'])]
+        boxes = []
+        for _ in range(opts['lookups']):
+            lat, lng = rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+            boxes.append((lat - 0.25, lng - 0.25, lat + 0.25, lng + 0.25))
+        lookups = [
+            ('por id', lambda it=iter(ids): place_store.get(next(it)),
+             Place.objects.filter(google_id=ids[0])[:1]),
+            ('por prefixo (6)', lambda it=iter(prefixes): place_store.by_prefix(next(it)),
+             Place.objects.filter(name_folded__gte='praia mu', name_folded__lt='praia mv').order_by('name_folded')[:6]),
+            ('rectângulo 0.5° (100)', lambda it=iter(boxes): place_store.in_bbox(*next(it)),
+             Place.objects.filter(lat__gte=-9, lat__lte=-8.5, lng__gte=13, lng__lte=13.5)[:100]),
+        ]
+        # ORM: a chamada completa de place_store; SQL: só a execução da consulta já compilada
+        self.stdout.write(f"{'consulta':<24} {'ORM mediana (µs)':>17} {'p95':>6} {'SQL mediana (µs)':>17}  plano")
+        for name, fn, qs in lookups:
+            median, p95 = _timed(fn, opts['lookups'])
+            sql, params = qs.query.sql_with_params()
+            with connection.cursor() as cursor:
+                sql_median, _ = _timed(lambda: (cursor.execute(sql, params), cursor.fetchall()), opts['lookups'])
+            self.stdout.write(f"{name:<24} {median:17.0f} {p95:6.0f} {sql_median:17.0f}  {self._plan(qs)}")
+
+    def _plan(self, qs):
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return '; '.join(row[-1] for row in cursor.fetchall())
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return cursor.fetchone()[0]
@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core import estimate_state
+from core.management.commands.bench_db_writes import PLACE
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Consultas SQL (e quantas são escritas) por pedido no caminho estimativa → redirect → "
+            "planejador, para cada SESSION_BACKEND. Corre numa transacção desfeita no fim: o utilizador "
+            "e as sessões de teste não ficam na base de dados.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', default=','.join(settings.SESSION_BACKENDS), help='Backends a comparar')
+        parser.add_argument('--requests', type=int, default=20, help='Repetições de cada pedido')
+
+    def handle(self, *args, **opts):
+        backends = [b.strip() for b in opts['backends'].split(',') if b.strip()]
+        unknown = [b for b in backends if b not in settings.SESSION_BACKENDS]
+        if unknown:
+            raise CommandError(f"Backend(s) desconhecido(s): {', '.join(unknown)}")
+        self.stdout.write(f"{'backend':<15} {'pedido':<16} {'consultas':>10} {'escritas':>9} {'mediana':>9}")
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user('bench-sessions')
+                for backend in backends:
+                    self._run(backend, user, max(1, opts['requests']))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, backend, user, requests):
+        # Client só depois do override: o middleware de sessão lê SESSION_ENGINE em cada pedido
+        with override_settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{backend}', ALLOWED_HOSTS=['*']):
+            client = Client()
+            client.force_login(user)
+            flows = (
+                ('estimativa POST', lambda: client.post(reverse('core:estimate_place_cost'), PLACE)),
+                ('planejador GET', lambda: client.get(reverse('core:planejador'))),
+            )
+            for name, request in flows:
+                request()  # aquece (modelo, templates)
+                queries, writes, samples = [], [], []
+                for _ in range(requests):
+                    with CaptureQueriesContext(connection) as captured:
+                        t0 = time.perf_counter()
+                        response = request()
+                        samples.append((time.perf_counter() - t0) * 1000)
+                    if response.status_code >= 400:
+                        raise CommandError(f'{backend}: {name} devolveu HTTP {response.status_code}')
+                    sql = [q['sql'].lstrip().split(' ', 1)[0].upper() for q in captured.captured_queries]
+                    queries.append(len(sql))
+                    writes.append(sum(s in WRITE_STATEMENTS for s in sql))
+                self.stdout.write(f"{backend:<15} {name:<16} {statistics.mean(queries):10.1f} "
+                                  f"{statistics.mean(writes):9.1f} {statistics.median(samples):7.1f}ms")
+            cookie = client.cookies.get(estimate_state.COOKIE_NAME)
+            self.stdout.write(f"{'':<15} cookie {estimate_state.COOKIE_NAME}: "
+                              f"{len(cookie.value) if cookie else 0} bytes")
+            # Tira a sessão da cache (cached_db); a linha em django_session sai com o rollback
+            client.logout()
@@ -0,0 +1,52 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import category_defaults
+from core.ml import get_active
+
+
+class Command(BaseCommand):
+    help = ("Calcula os valores padrão por categoria (preços médios, sazonalidade, popularidade, "
+            "sustentabilidade) a partir do CSV de destinos e grava-os num JSON ao lado do modelo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', help='CSV de origem (omissão: destinos_turisticos_angola.csv)')
+        parser.add_argument('--output', help='JSON de destino (omissão: TELLA_DEFAULTS_PATH)')
+        parser.add_argument('--stat', choices=['median', 'mean'], default='median')
+        parser.add_argument('--by', default='', help='Desagregações opcionais: province,traveler')
+        parser.add_argument('--min-count', type=int, default=5, help='Linhas mínimas por grupo desagregado')
+        parser.add_argument('--chunksize', type=int, default=category_defaults.DEFAULT_CHUNKSIZE,
+                            help='Linhas por bloco na leitura do CSV')
+
+    def handle(self, *args, **opts):
+        active = get_active()
+        if active is None:
+            raise CommandError('Modelo Tella indisponível.')
+        breakdowns = [b.strip() for b in opts['by'].split(',') if b.strip()]
+
+        t0 = time.perf_counter()
+        try:
+            artifact = category_defaults.compute_defaults(opts['csv'], breakdowns, opts['stat'],
+                                                          opts['min_count'], opts['chunksize'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        path = category_defaults.save_defaults(artifact, active.hash,
+                                               opts['output'] or category_defaults.defaults_path(active.path))
+        elapsed = time.perf_counter() - t0
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        self.stdout.write(f"{'categoria':<14} {'n':>9} " + ' '.join(f'{f.split("_")[1][:11]:>11}'
+                                                                  for f in category_defaults.STAT_FIELDS))
+        for name, entry in artifact['categories'].items():
+            values = entry['values']
+            self.stdout.write(f"{name:<14} {entry['n']:>9} " + ' '.join(f'{values[f]:>11g}'
+                                                                         for f in category_defaults.STAT_FIELDS))
+        for name in breakdowns:
+            groups = sum(len(v) for v in artifact[f'by_{name}'].values())
+            self.stdout.write(f"by_{name}: {groups} grupo(s) com pelo menos {opts['min_count']} linhas")
+        self.stdout.write(self.style.SUCCESS(
+            f"{artifact['rows']} linhas ({artifact['stat']}) gravadas em {path} em {elapsed:.1f}s "
+            f"(pico de memória do processo {peak_mb:.0f} MB)"
+        ))
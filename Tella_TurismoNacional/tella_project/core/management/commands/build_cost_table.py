@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import cost_table
+from core.ml import CompactModel, FastPredictor, get_model, get_model_hash, get_pipeline
+
+
+class Command(BaseCommand):
+    help = ("Pré-calcula as previsões do modelo Tella numa grelha categoria × viajante × orçamento × "
+            "transporte × hospedagem × rating × avaliações × localização e grava-as num .npy (mmap).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Ficheiro .npy de destino (omissão: TELLA_COST_TABLE_PATH)')
+        parser.add_argument('--lat-steps', type=int, default=8, help='Pontos no eixo da latitude')
+        parser.add_argument('--lng-steps', type=int, default=8, help='Pontos no eixo da longitude')
+
+    def handle(self, *args, **opts):
+        model = get_model()
+        if model is None:
+            raise CommandError('Modelo Tella indisponível.')
+        predict = None
+        if isinstance(model, CompactModel):
+            # Milhões de linhas: o booster XGBoost é bem mais rápido em lotes grandes
+            predict = FastPredictor(get_pipeline()).predict
+        axes = cost_table.default_axes(opts['lat_steps'], opts['lng_steps'])
+
+        t0 = time.perf_counter()
+        values = cost_table.build_table(model, axes, predict)
+        path = cost_table.save_table(values, axes, get_model_hash(), opts['output'])
+        elapsed = time.perf_counter() - t0
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{values.size} previsões ({values.nbytes / 1e6:.1f} MB) gravadas em {path} em {elapsed:.1f}s'
+        ))
@@ -0,0 +1,154 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Trip, TripDay
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _parse_sizes(value):
+    try:
+        sizes = [tuple(int(n) for n in pair.split('x')) for pair in value.split(',') if pair.strip()]
+    except ValueError:
+        raise CommandError(f'--sizes inválido: {value!r} (ex. 1x1,50x30)')
+    if not sizes or any(len(s) != 2 or min(s) < 1 for s in sizes):
+        raise CommandError(f'--sizes inválido: {value!r} (ex. 1x1,50x30)')
+    return sizes
+
+
+class Command(BaseCommand):
+    help = ("Garante que \"Minhas viagens\" (API e página) faz o mesmo número de consultas SQL com "
+            "poucas ou muitas viagens e dias, que a paginação por cursor percorre todas as viagens "
+            "uma vez, por ordem, e que criar uma viagem ou mudar as suas datas custa o mesmo número "
+            "de consultas com 2 ou 60 dias. Corre numa transacção desfeita no fim; sai com erro se falhar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1x1,10x7,60x30', help='Viagens x dias por viagem, por cenário')
+        parser.add_argument('--limit', type=int, default=20, help='Viagens por página')
+        parser.add_argument('--write-days', default='2,60', help='Durações (dias) das viagens criadas e editadas')
+
+    def handle(self, *args, **opts):
+        sizes = _parse_sizes(opts['sizes'])
+        try:
+            write_days = [int(n) for n in opts['write_days'].split(',') if n.strip()]
+        except ValueError:
+            raise CommandError(f"--write-days inválido: {opts['write_days']!r}")
+        if any(n < 2 for n in write_days):
+            raise CommandError('--write-days: pelo menos 2 dias (a edição tira o primeiro)')
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+                self._run(sizes, max(1, opts['limit']))
+                self._run_writes(write_days)
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Viagens: consultas constantes e paginação OK'))
+
+    def _run(self, sizes, limit):
+        self.stdout.write(f"{'viagens x dias':<15} {'API':>5} {'página':>7} {'páginas':>8}")
+        counts = {}
+        for n_trips, n_days in sizes:
+            user = User.objects.create_user(f'check-trips-{n_trips}x{n_days}')
+            ids = self._create_trips(user, n_trips, n_days)
+            client = Client()
+            client.force_login(user)
+            api = self._count(client, f"{reverse('core:api_trips')}?limit={limit}")
+            page = self._count(client, reverse('core:minhas_viagens'))
+            pages = self._walk(client, ids, limit)
+            client.logout()
+            self.stdout.write(f"{f'{n_trips} x {n_days}':<15} {api:5d} {page:7d} {pages:8d}")
+            counts[(n_trips, n_days)] = (api, page)
+        if len(set(counts.values())) > 1:
+            raise CommandError(f'O número de consultas varia com o tamanho: {counts}')
+
+    def _create_trips(self, user, n_trips, n_days):
+        """Viagens com created_at repetido aos pares (empates resolvidos pelo id no cursor)."""
+        start = date(2025, 1, 1)
+        now = timezone.now()
+        trips = Trip.objects.bulk_create([
+            Trip(user=user, name=f'Viagem {i}', start_date=start, end_date=start + timedelta(days=n_days - 1),
+                 budget_total=Decimal('1000.00') * n_days)
+            for i in range(n_trips)
+        ])
+        # auto_now_add ignora valores explícitos no create: acertar created_at depois
+        for i, trip in enumerate(trips):
+            trip.created_at = now - timedelta(minutes=i // 2)
+        Trip.objects.bulk_update(trips, ['created_at'])
+        TripDay.objects.bulk_create([
+            TripDay(trip=trip, date=start + timedelta(days=d), order=d + 1,
+                    places=[{'name': f'Lugar {d}'}], estimate=Decimal('1000.00'))
+            for trip in trips for d in range(n_days)
+        ])
+        return [t.pk for t in sorted(trips, key=lambda t: (t.created_at, t.pk), reverse=True)]
+
+    def _count(self, client, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: HTTP {response.status_code}')
+        return len(captured.captured_queries)
+
+    def _walk(self, client, expected, limit):
+        """Percorre todas as páginas da API e compara com a ordem (created_at, id) decrescente."""
+        seen, cursor, pages = [], None, 0
+        while True:
+            url = f"{reverse('core:api_trips')}?limit={limit}" + (f'&cursor={cursor}' if cursor else '')
+            data = client.get(url).json()
+            pages += 1
+            for trip in data['results']:
+                if trip['duration_days'] != len(trip['days']):
+                    raise CommandError(f"Viagem {trip['id']}: duration_days {trip['duration_days']} "
+                                       f"≠ {len(trip['days'])} dias")
+            seen += [trip['id'] for trip in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        if seen != expected:
+            raise CommandError(f'Paginação por cursor: {len(seen)} viagens vistas, esperadas {len(expected)} '
+                               f'pela ordem (created_at, id)')
+        return pages
+
+    def _run_writes(self, write_days):
+        """Consultas para criar a viagem e para a adiar um dia (apaga 1, renumera os outros, cria 1)."""
+        user = User.objects.create_user('check-trips-writes')
+        client = Client()
+        client.force_login(user)
+        self.stdout.write(f"{'dias':<6} {'criar':>6} {'mudar datas':>12}")
+        counts = {}
+        for n_days in write_days:
+            start = date(2025, 1, 1)
+            end = start + timedelta(days=n_days - 1)
+            created, data = self._count_post(client, reverse('core:api_trips'), {
+                'name': f'{n_days} dias', 'start_date': start.isoformat(), 'end_date': end.isoformat(),
+            })
+            if len(data.get('days', [])) != n_days:
+                raise CommandError(f"Criar {n_days} dias: {data}")
+            edited, data = self._count_post(client, reverse('core:api_trip_detail', args=[data['id']]), {
+                'start_date': (start + timedelta(days=1)).isoformat(),
+                'end_date': (end + timedelta(days=1)).isoformat(),
+            })
+            if data.get('day_changes') != {'created': 1, 'deleted': 1, 'renumbered': n_days - 1}:
+                raise CommandError(f"Mudar datas ({n_days} dias): {data.get('day_changes') or data}")
+            self.stdout.write(f"{n_days:<6} {created:6d} {edited:12d}")
+            counts[n_days] = (created, edited)
+        client.logout()
+        if len(set(counts.values())) > 1:
+            raise CommandError(f'O número de consultas ao criar/editar varia com os dias: {counts}')
+
+    def _count_post(self, client, url, body):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.post(url, json.dumps(body), content_type='application/json')
+        if response.status_code not in (200, 201):
+            raise CommandError(f'{url}: HTTP {response.status_code} {response.content[:200]!r}')
+        return len(captured.captured_queries), response.json()
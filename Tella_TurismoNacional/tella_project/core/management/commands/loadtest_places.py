@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import override_settings
+
+from core import places, search_index, views
+from core.management.places_stub import PlacesStub
+
+
+class Command(BaseCommand):
+    help = ("Teste de carga de /api/places/search/ contra um stub local da Places API: compara um worker "
+            "síncrono (gunicorn sync, um pedido de cada vez) com um worker assíncrono (uvicorn, um event loop).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Pedidos por modo')
+        parser.add_argument('--concurrency', type=int, default=50, help='Clientes simultâneos no modo assíncrono')
+        parser.add_argument('--latency', type=float, default=0.2, help='Latência do stub (s)')
+        parser.add_argument('--identical', action='store_true',
+                            help='Dispara --requests buscas idênticas em simultâneo, repartidas por --workers '
+                                 'event loops, e falha se o upstream receber mais do que uma chamada')
+        parser.add_argument('--workers', type=int, default=2, help='Event loops simulados no modo --identical')
+
+    def handle(self, *args, **opts):
+        stub = PlacesStub(latency=opts['latency'])
+        # Índice local só em memória: os resultados do stub não ficam no ficheiro do autocomplete
+        search_index._index = search_index.DestinationIndex()
+        with stub.running():
+            with override_settings(RAPIDAPI_BASE_URL=stub.base_url, RAPIDAPI_KEY='stub', ALLOWED_HOSTS=['*'],
+                                   PLACES_LOCAL_MIN_HITS=0):
+                if opts['identical']:
+                    return self._check_identical(stub, opts)
+                self.stdout.write(f"{'modo':<28} {'pedidos':>8} {'tempo (s)':>10} {'req/s':>8} "
+                                  f"{'simultâneos':>12} {'ligações':>9}")
+                for label, runner in (('sync (1 pedido/worker)', self._run_sync),
+                                      ('async (uvicorn, 1 worker)', self._run_async)):
+                    stub.reset()
+                    elapsed, errors = runner(opts)
+                    self.stdout.write(f"{label:<28} {opts['requests']:>8} {elapsed:>10.2f} "
+                                      f"{opts['requests'] / elapsed:>8.1f} {stub.max_in_flight:>12} "
+                                      f"{stub.connections:>9}")
+                    if errors:
+                        self.stderr.write(f'  {errors} pedido(s) com erro em {label}')
+
+    def _queries(self, n):
+        # Consultas distintas: cada pedido é um cache miss e vai ao upstream
+        run = uuid.uuid4().hex[:8]
+        return [f'carga {run} {i}' for i in range(n)]
+
+    def _run_sync(self, opts):
+        # Um worker síncrono serve um pedido de cada vez, do início ao fim
+        factory = RequestFactory()
+        view = async_to_sync(views.api_places_search.__wrapped__)
+        errors = 0
+        t0 = time.perf_counter()
+        for q in self._queries(opts['requests']):
+            request = factory.get('/api/places/search/', {'q': q})
+            request.user = AnonymousUser()
+            errors += view(request).status_code != 200
+        return time.perf_counter() - t0, errors
+
+    def _run_async(self, opts):
+        factory = AsyncRequestFactory()
+        view = views.api_places_search.__wrapped__
+
+        async def _main():
+            sem = asyncio.Semaphore(opts['concurrency'])
+
+            async def _one(q):
+                async with sem:
+                    request = factory.get('/api/places/search/', {'q': q})
+                    request.user = AnonymousUser()
+                    return (await view(request)).status_code != 200
+
+            try:
+                t0 = time.perf_counter()
+                results = await asyncio.gather(*(_one(q) for q in self._queries(opts['requests'])))
+                return time.perf_counter() - t0, sum(results)
+            finally:
+                await places.aclose_client()
+
+        return asyncio.run(_main())
+
+    def _check_identical(self, stub, opts):
+        """N pedidos iguais ao mesmo tempo: o single-flight deve gerar exactamente 1 chamada upstream.
+
+        Cada worker simulado é um thread com o seu event loop (como um worker uvicorn); os workers
+        partilham a cache do processo, pelo que a coordenação entre eles passa pelo lock na cache.
+        """
+        # Sufixo aleatório: garante que a consulta não está já na cache
+        query = f'Ilha do Mussulo {uuid.uuid4().hex[:8]}'
+        factory = AsyncRequestFactory()
+        view = views.api_places_search.__wrapped__
+        n_workers = max(1, opts['workers'])
+        per_worker = [opts['requests'] // n_workers + (i < opts['requests'] % n_workers) for i in range(n_workers)]
+        statuses = []
+        barrier = threading.Barrier(n_workers)
+
+        def _worker(n):
+            async def _main():
+                async def _one():
+                    request = factory.get('/api/places/search/', {'q': query})
+                    request.user = AnonymousUser()
+                    return (await view(request)).status_code
+
+                barrier.wait()
+                try:
+                    statuses.extend(await asyncio.gather(*(_one() for _ in range(n))))
+                finally:
+                    await places.aclose_client()
+
+            asyncio.run(_main())
+
+        threads = [threading.Thread(target=_worker, args=(n,)) for n in per_worker]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        ok = sum(1 for status in statuses if status == 200)
+        self.stdout.write(f"{len(statuses)} buscas idênticas em {n_workers} worker(s): {ok} OK, "
+                          f"{stub.search_requests} chamada(s) upstream, {elapsed:.2f}s")
+        if ok != len(statuses):
+            raise CommandError(f'{len(statuses) - ok} pedido(s) falharam')
+        if stub.search_requests != 1:
+            raise CommandError(f'Esperada 1 chamada upstream, houve {stub.search_requests}')
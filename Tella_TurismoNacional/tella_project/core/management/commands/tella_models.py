@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import model_registry
+
+
+class Command(BaseCommand):
+    help = ("Registo de versões do modelo Tella: list, publish <joblib>, activate <versão> e rollback. "
+            "Os workers em execução trocam para a versão activa sem reiniciar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['list', 'publish', 'activate', 'rollback'])
+        parser.add_argument('target', nargs='?', help='Ficheiro .joblib (publish) ou versão (activate)')
+        parser.add_argument('--activate', action='store_true', help='Com publish, activar a nova versão')
+
+    def handle(self, *args, **opts):
+        action, target = opts['action'], opts['target']
+        try:
+            if action == 'publish':
+                if not target:
+                    raise CommandError('Indique o ficheiro .joblib a publicar')
+                version = model_registry.publish(target)
+                self.stdout.write(f'Publicada: {version}')
+                if opts['activate']:
+                    model_registry.activate(version)
+                    self.stdout.write(self.style.SUCCESS(f'Activa: {version}'))
+            elif action == 'activate':
+                if not target:
+                    raise CommandError('Indique a versão a activar')
+                model_registry.activate(target)
+                self.stdout.write(self.style.SUCCESS(f'Activa: {target}'))
+            elif action == 'rollback':
+                version = model_registry.rollback()
+                self.stdout.write(self.style.SUCCESS(f'Activa: {version}'))
+            else:
+                self._list()
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+    def _list(self):
+        active = model_registry.active_version()
+        versions = model_registry.list_versions()
+        if not versions:
+            self.stdout.write(f'Sem versões em {model_registry.registry_dir()}')
+            return
+        self.stdout.write(f"  {'versão':<34} {'criado':<26} {'RMSE val.':>10} {'R²':>6}")
+        for version, meta in versions:
+            metrics = meta.get('metrics', {})
+            rmse = f"{metrics['rmse']:.0f}" if 'rmse' in metrics else '-'
+            r2 = f"{metrics['r2']:.2f}" if 'r2' in metrics else '-'
+            marker = '*' if version == active else ' '
+            self.stdout.write(f"{marker} {version:<34} {meta.get('created_at', '-'):<26} {rmse:>10} {r2:>6}")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ml import CompactModel, FastPredictor, check_fast_path_parity, get_active, get_pipeline, load_reference_rows
+from core.management.commands.bench_estimate import synthetic_features
+
+
+class Command(BaseCommand):
+    help = ("Verifica que o caminho rápido NumPy (e o formato compacto, se for o activo) devolve "
+            "exactamente os mesmos valores que model.predict.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', help='CSV de referência (omissão: destinos_turisticos_angola.csv)')
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Número de linhas sintéticas adicionais a verificar')
+
+    def handle(self, *args, **opts):
+        model = get_pipeline()
+        if model is None:
+            raise CommandError('Modelo Tella indisponível.')
+        predictors = [('caminho rápido', FastPredictor(model))]
+        active = get_active()
+        if isinstance(active.model, CompactModel):
+            predictors.append(('formato compacto', active.model))
+
+        try:
+            rows = load_reference_rows(opts['csv'])
+        except FileNotFoundError as e:
+            raise CommandError(f'CSV de referência não encontrado: {e}')
+        if opts['synthetic']:
+            rows += synthetic_features(opts['synthetic'])
+
+        for name, predictor in predictors:
+            mismatches = check_fast_path_parity(model, predictor, rows)
+            if mismatches:
+                raise CommandError(f'{name}: {mismatches} de {len(rows)} linha(s) divergem do pipeline.')
+            self.stdout.write(self.style.SUCCESS(f'{name}: paridade bit-a-bit confirmada em {len(rows)} linha(s).'))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import tempfile
+from pathlib import Path
+
+from core import ml, model_registry, training
+
+
+class Command(BaseCommand):
+    help = ("Treina o modelo Tella a partir do CSV de destinos (procura de hiperparâmetros em paralelo, "
+            "opcionalmente por successive halving) e grava o joblib com os metadados ao lado.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', help='CSV de treino (omissão: destinos_turisticos_angola.csv)')
+        parser.add_argument('--output', help='Ficheiro .joblib de destino (omissão: modelo_tella.joblib fixo)')
+        parser.add_argument('--publish', action='store_true', help='Publicar no registo de modelos em vez de --output')
+        parser.add_argument('--activate', action='store_true', help='Com --publish, activar a nova versão')
+        parser.add_argument('--search', choices=['grid', 'halving'], default='grid')
+        parser.add_argument('--jobs', type=int, help='Processos da procura (omissão: número de CPUs)')
+        parser.add_argument('--xgb-threads', type=int, help='Threads de cada XGBoost no treino (omissão: CPUs / jobs)')
+        parser.add_argument('--predict-threads', type=int, default=1, help='Threads do XGBoost no modelo gravado')
+        parser.add_argument('--folds', type=int, default=5)
+
+    def handle(self, *args, **opts):
+        try:
+            model, metadata = training.train(opts['csv'], opts['search'], opts['jobs'], opts['xgb_threads'],
+                                             opts['predict_threads'], opts['folds'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Falha no treino: {e}')
+
+        # O servidor usa o caminho rápido: confirmar que reproduz o novo pipeline
+        mismatches = ml.check_fast_path_parity(model, ml.FastPredictor(model))
+        metadata['fast_path_parity'] = mismatches == 0
+        if opts['publish']:
+            with tempfile.TemporaryDirectory() as tmp:
+                path, metadata = training.save_model(model, metadata, Path(tmp) / model_registry.MODEL_FILE)
+                version = model_registry.publish(path)
+            if opts['activate']:
+                model_registry.activate(version)
+            path = model_registry.model_path(version)
+        else:
+            path, metadata = training.save_model(model, metadata, opts['output'] or ml._legacy_model_path())
+
+        search = metadata['search']
+        self.stdout.write(f"{search['strategy']}: {search['candidates']} candidatos, {search['fits']} treinos ({search['folds']} folds), "
+                          f"{search['jobs']} processo(s) × {search['xgb_threads']} thread(s) XGBoost, "
+                          f"{metadata['training_seconds']:.1f}s")
+        self.stdout.write(f"Melhores parâmetros: {search['best_params']} (RMSE CV {search['cv_rmse']:.0f})")
+        metrics = metadata['metrics']
+        self.stdout.write(f"Validação ({metadata['data']['validation_rows']} linhas): RMSE {metrics['rmse']:.0f}, "
+                          f"MAE {metrics['mae']:.0f}, R² {metrics['r2']:.2f}")
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f'Caminho rápido diverge em {mismatches} linha(s); '
+                                                 'o servidor usará model.predict.'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Modelo {metadata['model_hash']} gravado em {path} (metadados em {training.metadata_path(path)})"))
+        if opts['publish']:
+            state = 'activa' if opts['activate'] else 'publicada (activar com: manage.py tella_models activate ...)'
+            self.stdout.write(f"Versão {path.parent.name} {state}")
@@ -0,0 +1,154 @@
+"""Stub HTTP local da RapidAPI Google Places, para os testes (core/tests.py) e os testes de carga dos comandos de gestão.
+
+Responde a `POST /v1/places:searchText` e `GET /v1/places/<id>/photos/<ref>/media`
+com latência e taxa de erro configuráveis, e conta pedidos, ligações abertas e o
+máximo de pedidos em simultâneo.
+"""
+import asyncio
+import io
+import json
+import random
+import threading
+from contextlib import contextmanager
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def _sample_jpeg():
+    """JPEG válido 800x600 (com Pillow), para as miniaturas; senão só o cabeçalho JPEG."""
+    if Image is None:
+        return b'\xff\xd8\xff\xe0' + b'0' * 2048
+    out = io.BytesIO()
+    Image.new('RGB', (800, 600), (200, 120, 40)).save(out, format='JPEG')
+    return out.getvalue()
+
+
+class PlacesStub:
+    def __init__(self, latency=0.2, error_rate=0.0, results=6, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.results = results
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.search_requests = 0
+        self.photo_requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queries = []
+        self.base_url = None
+        self.image = _sample_jpeg()
+        self._conns = {}
+
+    def reset(self):
+        self.requests = self.search_requests = self.photo_requests = 0
+        self.connections = self.in_flight = self.max_in_flight = 0
+        self.queries = []
+
+    def _search_payload(self, query):
+        places = []
+        for i in range(self.results):
+            places.append({
+                'id': f'stub{abs(hash((query, i))) % 10**8}',
+                'displayName': {'text': f'{query.title()} {i + 1}'},
+                'formattedAddress': f'Rua {i + 1}, Luanda, Angola',
+                'location': {'latitude': -8.8383 - i * 0.01, 'longitude': 13.2344 + i * 0.01},
+                'rating': 4.0 + (i % 5) / 10,
+                'userRatingCount': 100 * (i + 1),
+                'types': ['tourist_attraction'],
+                'photos': [{'name': f'places/stub{i}/photos/ref{i}'}],
+            })
+        return {'places': places}
+
+    async def _respond(self, method, path, body):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            latency = self.latency() if callable(self.latency) else self.latency
+            if latency:
+                await asyncio.sleep(latency)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 503, 'application/json', b'{"error": "stub indisponivel"}', {}
+            if method == 'POST' and path.startswith('/v1/places:searchText'):
+                self.search_requests += 1
+                query = json.loads(body or b'{}').get('textQuery', '')
+                self.queries.append(query)
+                return 200, 'application/json', json.dumps(self._search_payload(query)).encode(), {}
+            if method == 'GET' and '/photos/' in path:
+                self.photo_requests += 1
+                if 'skipHttpRedirect=true' in path:
+                    uri = f'{self.base_url}/img/{abs(hash(path)) % 10**8}.jpg'
+                    return 200, 'application/json', json.dumps({'photoUri': uri}).encode(), {}
+                return 200, 'image/jpeg', self.image, {}
+            if method == 'GET' and path.startswith('/img/'):
+                return 200, 'image/jpeg', self.image, {}
+            return 404, 'application/json', b'{"error": "not found"}', {}
+        finally:
+            self.in_flight -= 1
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._conns[asyncio.current_task()] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    k, v = line.decode('latin-1').split(':', 1)
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get('content-length', '0') or 0))
+                status, ctype, payload, extra = await self._respond(method, path, body)
+                head = [f'HTTP/1.1 {status} {"OK" if status == 200 else "ERR"}',
+                        f'Content-Type: {ctype}', f'Content-Length: {len(payload)}', 'Connection: keep-alive']
+                head += [f'{k}: {v}' for k, v in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._conns.pop(asyncio.current_task(), None)
+            writer.close()
+
+    @contextmanager
+    def running(self, host='127.0.0.1'):
+        """Arranca o stub num thread com event loop próprio; define `base_url`."""
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        stopped = None
+
+        async def _main():
+            nonlocal stopped
+            stopped = asyncio.Event()
+            server = await asyncio.start_server(self._handle, host, 0, backlog=1024)
+            port = server.sockets[0].getsockname()[1]
+            self.base_url = f'http://{host}:{port}'
+            ready.set()
+            await stopped.wait()
+            server.close()
+            # Fecha as ligações keep-alive abertas: os handlers terminam normalmente
+            for writer in list(self._conns.values()):
+                writer.close()
+            await asyncio.gather(*list(self._conns), return_exceptions=True)
+            await server.wait_closed()
+
+        thread = threading.Thread(target=loop.run_until_complete, args=(_main(),), daemon=True)
+        thread.start()
+        ready.wait(5)
+        try:
+            yield self
+        finally:
+            loop.call_soon_threadsafe(stopped.set)
+            thread.join(5)
+            loop.close()
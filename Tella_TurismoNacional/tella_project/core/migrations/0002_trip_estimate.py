@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='budget_level',
+            field=models.CharField(default='medio', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='needs_lodging',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='needs_transport',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='traveler_type',
+            field=models.CharField(default='família', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='tripday',
+            name='budget_level',
+            field=models.CharField(blank=True, help_text='Vazio: usa o nível da viagem', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='tripday',
+            name='estimate',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='tripday',
+            name='estimate_breakdown',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tripday',
+            name='estimate_key',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='tripday',
+            name='places',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
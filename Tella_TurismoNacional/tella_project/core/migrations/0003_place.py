@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_trip_estimate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('google_id', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('name_folded', models.CharField(max_length=255)),
+                ('address', models.CharField(blank=True, max_length=500)),
+                ('lat', models.FloatField(blank=True, null=True)),
+                ('lng', models.FloatField(blank=True, null=True)),
+                ('rating', models.FloatField(blank=True, null=True)),
+                ('user_rating_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('google_type', models.CharField(blank=True, max_length=60)),
+                ('category', models.CharField(blank=True, max_length=30)),
+                ('subcategory', models.CharField(blank=True, max_length=60)),
+                ('province', models.CharField(blank=True, max_length=60)),
+                ('photo_url', models.CharField(blank=True, max_length=1000)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name_folded'], name='place_name_folded_idx'), models.Index(fields=['category', 'name_folded'], name='place_category_idx'), models.Index(fields=['lat', 'lng'], name='place_lat_lng_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:57
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_trip_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trip',
+            name='budget_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='travelers',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)]),
+        ),
+    ]
@@ -1,10 +1,34 @@
+from collections import OrderedDict
 from pathlib import Path
 from django.conf import settings
-import pandas as pd
+from django.core.cache import cache
+import hashlib
+import json
+import threading
+import time
+import numpy as np
 
-_model = None
+from .compact_model import CompactModel, FeatureEncoder
 
-# Valores padrão baseados no CSV destinos_turisticos_angola.csv
+# Modelo activo (LoadedModel): trocado de uma só vez quando o registo muda de versão
+_active = None
+# Versão anterior, mantida em memória: o rollback não precisa de a carregar de novo
+_previous = None
+# Carregamento protegido: um único load por processo, mesmo com workers em threads
+_lock = threading.RLock()
+# Estado de falha: evita repetir o load do disco em cada pedido enquanto dura o backoff
+_load_error = None
+_load_failures = 0
+_next_retry_at = 0.0
+_warmed_up = False
+# Hot swap: próxima verificação do ponteiro ACTIVE, versão a carregar e última que falhou
+_next_poll = 0.0
+_reloading = None
+_failed_version = None
+_UNSET = object()
+
+# Valores padrão baseados no CSV destinos_turisticos_angola.csv (médias por categoria).
+# Substituídos pelo artefacto de core/category_defaults.py quando este existe para o modelo.
 DEFAULTS_BY_CATEGORY = {
     'praia': {
         'preco_transporte_medio': 77658,
@@ -87,8 +111,32 @@ GOOGLE_TYPES_TO_CATEGORY = {
     'administrative_area_level_1': 'cidade',
 }
 
+class LoadedModel:
+    """Um modelo carregado e o que depende dele (hash, valores padrão, caminho rápido).
+
+    `model` é o pipeline sklearn (joblib) ou um CompactModel exportado dele; o hash é
+    sempre o do joblib e identifica a versão nas chaves da cache de previsões: trocar
+    de modelo invalida-as, voltar a um modelo anterior reaproveita-as.
+    """
+    __slots__ = ('model', 'hash', 'version', 'path', 'defaults', 'fast')
+
+    def __init__(self, model, model_hash, version, path, defaults):
+        self.model = model
+        self.hash = model_hash
+        self.version = version or model_hash
+        self.path = path
+        self.defaults = defaults
+        self.fast = _UNSET
+
 def _model_path():
-    """Localiza o novo modelo Tella."""
+    """Localiza o modelo Tella: a versão activa do registo ou, sem registo, o joblib fixo."""
+    from . import model_registry
+    version = model_registry.active_version()
+    if version:
+        return model_registry.model_path(version)
+    return _legacy_model_path()
+
+def _legacy_model_path():
     base = Path(settings.BASE_DIR)
     # Tenta primeiro na raiz do projeto Django
     fallback1 = base / 'modelo_tella.joblib'
@@ -98,19 +146,197 @@ def _model_path():
     fallback2 = base.parent / 'modelo_tella.joblib'
     return fallback2
 
-def get_model():
-    global _model
-    if _model is None:
+def _data_path():
+    """Localiza o CSV destinos_turisticos_angola.csv (mesma ordem de busca do modelo)."""
+    base = Path(settings.BASE_DIR)
+    fallback1 = base / 'destinos_turisticos_angola.csv'
+    if fallback1.exists():
+        return fallback1
+    return base.parent / 'destinos_turisticos_angola.csv'
+
+def _retry_backoff(failures):
+    """Espera (s) antes de nova tentativa de load: exponencial, limitada."""
+    base = getattr(settings, 'TELLA_MODEL_RETRY_SECONDS', 30)
+    cap = getattr(settings, 'TELLA_MODEL_RETRY_MAX_SECONDS', 600)
+    return min(base * (2 ** (failures - 1)), cap)
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+def compact_path(model_path):
+    """Directório do formato compacto exportado de um joblib (ao lado dele)."""
+    return Path(model_path).with_name('tella_compact')
+
+def _load_compact(path, model_hash):
+    """CompactModel exportado deste joblib, ou None (formato joblib, sem export ou desactualizado)."""
+    fmt = getattr(settings, 'TELLA_MODEL_FORMAT', 'auto')
+    if fmt == 'joblib':
+        return None
+    directory = compact_path(path)
+    try:
+        compact = CompactModel.load(directory)
+        if compact.source_hash != model_hash:
+            raise ValueError('exportado de outro modelo')
+        return compact
+    except Exception as e:
+        if fmt == 'compact':
+            raise
+        if directory.exists():
+            print(f"[ML] Formato compacto em {directory} ignorado: {e}")
+        return None
+
+def _load(path, version=None):
+    from .category_defaults import defaults_path, load_defaults
+    path = Path(path)
+    model_hash = _file_hash(path)
+    model = _load_compact(path, model_hash)
+    if model is None:
+        from joblib import load
+        model = load(path)
+    return LoadedModel(model, model_hash, version, path, load_defaults(model_hash, defaults_path(path)))
+
+def get_active():
+    """Modelo activo (LoadedModel) ou None; carrega-o na primeira chamada."""
+    global _active, _load_error, _load_failures, _next_retry_at
+    active = _active
+    if active is not None:
+        _poll_registry(active)
+        return active
+    if time.monotonic() < _next_retry_at:
+        return None
+    with _lock:
+        # Outra thread pode ter carregado (ou falhado) enquanto esperávamos
+        if _active is not None or time.monotonic() < _next_retry_at:
+            return _active
         try:
-            from joblib import load
-            path = _model_path()
+            from . import model_registry
+            version = model_registry.active_version()
+            path = model_registry.model_path(version) if version else _legacy_model_path()
             print(f"[ML] Carregando modelo Tella de: {path}")
-            _model = load(path)
+            _active = _load(path, version)
+            _load_error = None
+            _load_failures = 0
+            _next_retry_at = 0.0
             print("[ML] Modelo Tella carregado com sucesso.")
         except Exception as e:
-            print(f"[ML] Falha ao carregar modelo Tella: {e}")
-            _model = None
-    return _model
+            _load_failures += 1
+            _load_error = str(e)
+            wait = _retry_backoff(_load_failures)
+            _next_retry_at = time.monotonic() + wait
+            print(f"[ML] Falha ao carregar modelo Tella: {e} (nova tentativa em {wait:.0f}s)")
+            _active = None
+    return _active
+
+def get_model():
+    active = get_active()
+    return active.model if active is not None else None
+
+def get_pipeline():
+    """Pipeline sklearn do modelo activo (lê o joblib se o activo é o formato compacto)."""
+    active = get_active()
+    if active is None:
+        return None
+    if isinstance(active.model, CompactModel):
+        from joblib import load
+        return load(active.path)
+    return active.model
+
+def get_model_hash():
+    """Hash do conteúdo do modelo carregado (None se o modelo não está carregado)."""
+    active = get_active()
+    return active.hash if active is not None else None
+
+def _poll_registry(active):
+    """Vê se o ponteiro do registo mudou (no máximo a cada TELLA_MODEL_POLL_SECONDS).
+
+    Se mudou, carrega a nova versão numa thread; os pedidos continuam a usar a actual.
+    """
+    global _next_poll, _reloading
+    interval = getattr(settings, 'TELLA_MODEL_POLL_SECONDS', 5)
+    now = time.monotonic()
+    if interval <= 0 or now < _next_poll:
+        return
+    _next_poll = now + interval
+    from . import model_registry
+    version = model_registry.active_version()
+    if not version or version in (active.version, _failed_version):
+        return
+    with _lock:
+        if _reloading is not None or _active is not active:
+            return
+        _reloading = version
+    threading.Thread(target=_swap_to, args=(version,), name='tella-model-reload', daemon=True).start()
+
+def _swap_to(version):
+    """Carrega `version`, prepara o caminho rápido e faz uma previsão; só depois troca o activo."""
+    global _active, _previous, _reloading, _failed_version
+    try:
+        current = _active
+        if _previous is not None and _previous.version == version:
+            loaded = _previous
+        else:
+            from . import model_registry
+            loaded = _load(model_registry.model_path(version), version)
+        get_fast_predictor(loaded)
+        _predict(loaded.model, [_warm_up_features()], loaded)
+        with _lock:
+            _previous, _active = current, loaded
+            _failed_version = None
+        print(f"[ML] Modelo Tella trocado: {current.version if current else '-'} -> {version}")
+    except Exception as e:
+        _failed_version = version
+        print(f"[ML] Falha ao carregar a versão {version}: {e!r}; mantém-se a actual.")
+    finally:
+        _reloading = None
+
+def _warm_up_features():
+    return {
+        'categoria_destino': 'cidade',
+        'classificacao_media': 4.0,
+        'num_avaliacoes': 100,
+        'latitude': -8.8383,
+        'longitude': 13.2344,
+        **get_smart_defaults('cidade', 4.0),
+    }
+
+def warm_up():
+    """Carrega o modelo, prepara o caminho rápido e faz uma previsão sintética.
+
+    Chamado no arranque de cada worker (CoreConfig.ready) para que o primeiro
+    utilizador não pague o unpickle nem a primeira inferência.
+    """
+    global _warmed_up
+    if get_model() is None:
+        return False
+    get_fast_predictor()
+    from .cost_table import get_cost_table
+    get_cost_table()
+    _warmed_up = estimate_costs([_warm_up_features()])[0] is not None
+    return _warmed_up
+
+def model_status():
+    """Estado do modelo para o endpoint de prontidão."""
+    active = _active
+    retry_in = max(0.0, _next_retry_at - time.monotonic()) if active is None else 0.0
+    return {
+        'model_loaded': active is not None,
+        'warmed_up': _warmed_up and active is not None,
+        'fast_path': bool(active is not None and active.fast not in (None, _UNSET)),
+        'error': _load_error,
+        'failures': _load_failures,
+        'retry_in': round(retry_in, 1),
+        'model_hash': active.hash if active else None,
+        'model_version': active.version if active else None,
+        'model_format': (('compact' if isinstance(active.model, CompactModel) else 'joblib')
+                         if active else None),
+        'previous_version': _previous.version if _previous else None,
+        'reloading': _reloading,
+        'prediction_cache': prediction_cache_stats(),
+    }
 
 def map_google_type_to_category(google_types):
     """Mapeia tipos do Google Places para categoria_destino."""
@@ -123,9 +349,50 @@ def map_google_type_to_category(google_types):
     
     return 'cidade'  # Padrão
 
-def get_smart_defaults(categoria_destino, rating=None):
+def category_names():
+    """Categorias com valores padrão (as do artefacto, se carregado)."""
+    artifact = _active.defaults if _active is not None else None
+    if artifact is not None:
+        return list(artifact['categories'])
+    return list(DEFAULTS_BY_CATEGORY)
+
+def category_defaults(categoria_destino, tipo_viajante=None, province=None):
+    """Preços e índices médios de uma categoria.
+
+    Com o artefacto carregado usa, por esta ordem, o grupo categoria × província
+    (`province` comparada com `nome_destino` do CSV), categoria × tipo de viajante ou
+    só a categoria (os grupos pequenos não existem no artefacto). Sem artefacto usa
+    DEFAULTS_BY_CATEGORY.
+    """
+    artifact = _active.defaults if _active is not None else None
+    if artifact is None:
+        return DEFAULTS_BY_CATEGORY.get(categoria_destino, DEFAULTS_BY_CATEGORY['cidade'])
+    categories = artifact['categories']
+    if categoria_destino not in categories:
+        categoria_destino = 'cidade' if 'cidade' in categories else next(iter(categories))
+    for level, key in (('by_province', province), ('by_traveler', tipo_viajante)):
+        entry = artifact.get(level, {}).get(categoria_destino, {}).get(key) if key else None
+        if entry:
+            return entry['values']
+    return categories[categoria_destino]['values']
+
+def has_province_defaults(categoria_destino, province):
+    """Se o artefacto tem um grupo categoria × província (a tabela de custos não o cobre)."""
+    artifact = _active.defaults if _active is not None else None
+    if artifact is None or not province:
+        return False
+    return bool(artifact.get('by_province', {}).get(categoria_destino, {}).get(province))
+
+def defaults_version():
+    """Hash dos valores padrão activos e dos multiplicadores de orçamento."""
+    artifact = _active.defaults if _active is not None else None
+    active = artifact if artifact is not None else DEFAULTS_BY_CATEGORY
+    payload = json.dumps([active, BUDGET_MULTIPLIERS], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+def get_smart_defaults(categoria_destino, rating=None, tipo_viajante=None, provincia=None):
     """Retorna valores padrão inteligentes baseados no CSV de Angola."""
-    defaults = DEFAULTS_BY_CATEGORY.get(categoria_destino, DEFAULTS_BY_CATEGORY['cidade'])
+    defaults = category_defaults(categoria_destino, tipo_viajante, provincia)
     
     # Inferir sentimento baseado no rating
     sentimento = 'neutro'
@@ -141,20 +408,407 @@ def get_smart_defaults(categoria_destino, rating=None):
         **defaults
     }
 
+# Multiplicador de preços por nível de orçamento
+BUDGET_MULTIPLIERS = {
+    'economico': 0.7,
+    'medio': 1.0,
+    'luxo': 1.5
+}
+
+def build_place_features(categoria_destino, rating, reviews, tipo_viajante, nivel_orcamento,
+                         precisa_transporte, precisa_hospedagem, lat, lng, provincia=None):
+    """Monta o dict de features do modelo Tella para um lugar e as escolhas do utilizador."""
+    # Obter valores padrão inteligentes baseados no CSV
+    defaults = get_smart_defaults(categoria_destino, rating, tipo_viajante, provincia)
+
+    # Ajustar valores baseados no nível de orçamento
+    multiplicador_orcamento = BUDGET_MULTIPLIERS.get(nivel_orcamento, 1.0)
+
+    # Aplicar multiplicador aos preços
+    preco_transporte = defaults['preco_transporte_medio'] * multiplicador_orcamento
+    preco_hospedagem = defaults['preco_hospedagem_medio'] * multiplicador_orcamento
+    preco_alimentacao = defaults['preco_alimentacao_medio'] * multiplicador_orcamento
+    preco_lazer = defaults['preco_lazer_medio'] * multiplicador_orcamento
+
+    # Zerar custos se usuário não precisa
+    if precisa_transporte == 'nao':
+        preco_transporte = 0.0
+    if precisa_hospedagem == 'nao':
+        preco_hospedagem = 0.0
+
+    return {
+        'categoria_destino': categoria_destino,
+        'classificacao_media': rating,
+        'num_avaliacoes': int(reviews),
+        'sentimento_avaliacao': defaults['sentimento_avaliacao'],
+        'tipo_viajante': tipo_viajante,
+        'preco_transporte_medio': preco_transporte,
+        'preco_hospedagem_medio': preco_hospedagem,
+        'preco_alimentacao_medio': preco_alimentacao,
+        'preco_lazer_medio': preco_lazer,
+        'indice_sazonalidade': defaults['indice_sazonalidade'],
+        'pontuacao_popularidade': defaults['pontuacao_popularidade'],
+        'fator_sustentabilidade': defaults['fator_sustentabilidade'],
+        'latitude': lat,
+        'longitude': lng,
+    }
+
+def place_inputs(data):
+    """Normaliza os dados de um lugar para a estimativa do modelo Tella.
+
+    `data` é um dict-like (request.POST ou um item JSON). Devolve (inputs, contexto):
+    inputs são os argumentos de build_place_features; o contexto guarda os valores
+    originais usados pelo planejador.
+    """
+    lat = data.get('lat')
+    lng = data.get('lng')
+    rating = data.get('rating') or '0'
+    reviews = data.get('userRatingCount') or '0'
+    categoria_principal = data.get('categoria_principal') or 'place'
+
+    # Inputs do usuário para personalização
+    tipo_viajante = data.get('tipo_viajante') or 'família'
+    duracao_dias = data.get('duracao_dias') or '3'
+    nivel_orcamento = data.get('nivel_orcamento') or 'medio'
+    precisa_transporte = data.get('precisa_transporte') or 'sim'
+    precisa_hospedagem = data.get('precisa_hospedagem') or 'sim'
+
+    # Converter coordenadas
+    try:
+        lat_f = float(lat) if lat else 0.0
+        lng_f = float(lng) if lng else 0.0
+        rating_f = float(rating)
+        reviews_f = float(reviews)
+        duracao_f = float(duracao_dias)
+    except Exception:
+        lat_f = lng_f = rating_f = reviews_f = duracao_f = 0.0
+
+    # Se categoria_principal é um tipo do Google, mapear
+    if categoria_principal in ['tourist_attraction', 'natural_feature', 'park', 'beach', 'mountain', 'museum', 'church', 'restaurant', 'lodging', 'shopping_mall', 'locality']:
+        categoria_destino = map_google_type_to_category([categoria_principal])
+    else:
+        # Mapear valores do formulário para categorias do modelo
+        category_map = {
+            'place': 'cidade',
+            'restaurant': 'cidade',
+            'hotel': 'cidade',
+            'attraction': 'cultural',
+            'shopping': 'cidade'
+        }
+        categoria_destino = category_map.get(categoria_principal, 'cidade')
+
+    inputs = {
+        'categoria_destino': categoria_destino,
+        'rating': rating_f,
+        'reviews': reviews_f,
+        'tipo_viajante': tipo_viajante,
+        'nivel_orcamento': nivel_orcamento,
+        'precisa_transporte': precisa_transporte,
+        'precisa_hospedagem': precisa_hospedagem,
+        'lat': lat_f,
+        'lng': lng_f,
+    }
+    # Só quando conhecida: os lugares sem província mantêm os mesmos inputs (e impressões digitais)
+    provincia = data.get('provincia')
+    if provincia:
+        inputs['provincia'] = provincia
+    context = {
+        'lat': lat,
+        'lng': lng,
+        'rating': rating,
+        'userRatingCount': reviews,
+        'categoria_destino': categoria_destino,
+        'tipo_viajante': tipo_viajante,
+        'duracao_dias': duracao_dias,
+        'duracao_f': duracao_f,
+        'nivel_orcamento': nivel_orcamento,
+        'precisa_transporte': precisa_transporte,
+        'precisa_hospedagem': precisa_hospedagem,
+    }
+    return inputs, context
+
+class FastPredictor(FeatureEncoder):
+    """Caminho rápido de inferência, sem pandas nem ColumnTransformer.
+
+    Extrai uma única vez do pipeline carregado os parâmetros do MinMaxScaler, as
+    categorias do OneHotEncoder e o booster XGBoost. As features são escritas
+    directamente num array NumPy e passadas ao `inplace_predict` do booster, com
+    exactamente as mesmas operações do pipeline (resultados bit-a-bit iguais).
+    """
+
+    def __init__(self, model):
+        preprocessor = model.steps[0][1]
+        regressor = model.steps[-1][1]
+        transformers = {name: (tr, list(cols)) for name, tr, cols in preprocessor.transformers_}
+        if set(transformers) - {'num', 'cat', 'remainder'} or getattr(preprocessor, 'sparse_output_', False):
+            raise ValueError('Pipeline Tella com estrutura inesperada')
+        scaler, self.num_cols = transformers['num']
+        encoder, self.cat_cols = transformers['cat']
+        if getattr(scaler, 'clip', False) or getattr(encoder, 'drop_idx_', None) is not None:
+            raise ValueError('Pipeline Tella com estrutura inesperada')
+
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+        self.min = np.asarray(scaler.min_, dtype=np.float64)
+        # Posição de cada (coluna categórica, valor) no vector one-hot; desconhecidos ficam a zero
+        n_num = len(self.num_cols)
+        self.onehot_index = []
+        offset = n_num
+        for cats in encoder.categories_:
+            self.onehot_index.append({c: offset + i for i, c in enumerate(cats)})
+            offset += len(cats)
+        self.n_features = offset
+
+        self.booster = regressor.get_booster()
+        self.missing = regressor.missing
+        self.iteration_range = regressor._get_iteration_range(None)
+
+    def predict(self, features_list):
+        X = self.encode(features_list)
+        return self.booster.inplace_predict(
+            X,
+            iteration_range=self.iteration_range,
+            predict_type='value',
+            missing=self.missing,
+        )
+
+def get_fast_predictor(active=None):
+    """FastPredictor do modelo activo (ou de `active`), ou None se indisponível/desactivado.
+
+    O formato compacto já é inferência NumPy: não tem caminho rápido à parte.
+    """
+    if not getattr(settings, 'TELLA_FAST_PATH', True):
+        return None
+    active = active or get_active()
+    if active is None or isinstance(active.model, CompactModel):
+        return None
+    if active.fast is _UNSET:
+        with _lock:
+            if active.fast is _UNSET:
+                try:
+                    fast = FastPredictor(active.model)
+                    mismatches = check_fast_path_parity(active.model, fast)
+                    if mismatches:
+                        print(f"[ML] Caminho rápido desactivado: {mismatches} linha(s) divergem do pipeline.")
+                        fast = None
+                except Exception as e:
+                    print(f"[ML] Caminho rápido indisponível: {e}")
+                    fast = None
+                active.fast = fast
+    return active.fast
+
+def load_reference_rows(path=None):
+    """Lê as linhas de destinos_turisticos_angola.csv como dicionários de features."""
+    import pandas as pd
+    path = Path(path) if path else _data_path()
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    return df.to_dict('records')
+
+def check_fast_path_parity(model, fast, rows=None):
+    """Compara FastPredictor (ou CompactModel) com model.predict e devolve o número de linhas divergentes.
+
+    Por omissão usa as linhas do CSV de referência; sem CSV não há verificação.
+    """
+    import pandas as pd
+    if rows is None:
+        try:
+            rows = load_reference_rows()
+        except FileNotFoundError:
+            print("[ML] CSV de referência não encontrado; paridade do caminho rápido não verificada.")
+            return 0
+    expected = np.asarray(model.predict(pd.DataFrame(rows)))
+    got = np.asarray(fast.predict(rows))
+    if expected.dtype != got.dtype or expected.shape != got.shape:
+        return len(rows)
+    # Comparação bit-a-bit (NaN e -0.0 incluídos)
+    bits = f'u{expected.itemsize}'
+    return int(np.count_nonzero(expected.view(bits) != got.view(bits)))
+
+class LRUCache:
+    """Cache LRU em memória, limitada em número de entradas e segura entre threads."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_prediction_lru = LRUCache(getattr(settings, 'TELLA_PREDICTION_CACHE_SIZE', 4096))
+_cache_stats = {'hits_local': 0, 'hits_shared': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+# Colunas categóricas do modelo; as restantes são numéricas e normalizadas para float
+_CATEGORICAL_FEATURES = ('categoria_destino', 'sentimento_avaliacao', 'tipo_viajante')
+
+def _canonical_features(features):
+    """Forma canónica do dict de features: 100 e 100.0 (ou '100') geram a mesma chave."""
+    canon = {}
+    for k, v in features.items():
+        if v is None or k in _CATEGORICAL_FEATURES:
+            canon[k] = v
+        else:
+            try:
+                canon[k] = float(v)
+            except (TypeError, ValueError):
+                canon[k] = str(v)
+    return canon
+
+def prediction_cache_key(features, model_hash=None):
+    payload = json.dumps(_canonical_features(features), sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    return f"tella:pred:{model_hash or get_model_hash()}:{digest}"
+
+def _count(name, n=1):
+    if n:
+        with _stats_lock:
+            _cache_stats[name] += n
+
+def prediction_cache_stats():
+    """Contadores de hits/misses da cache de previsões."""
+    with _stats_lock:
+        stats = dict(_cache_stats)
+    lookups = stats['hits_local'] + stats['hits_shared'] + stats['misses']
+    stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else None
+    stats['size'] = len(_prediction_lru)
+    return stats
+
+def _predict(model, features_list, active=None):
+    """Inferência sem cache: formato compacto, caminho rápido quando disponível, senão o pipeline."""
+    if isinstance(model, CompactModel):
+        return model.predict(features_list)
+    active = active or _active
+    fast = get_fast_predictor(active) if active is not None and active.model is model else None
+    if fast is not None:
+        return fast.predict(features_list)
+    import pandas as pd
+    return model.predict(pd.DataFrame(features_list))
+
 def estimate_cost(features: dict):
     """Estima custo usando o novo modelo Tella."""
-    model = get_model()
-    if model is None:
+    print(f"[ML] Tella predict -> {features}")
+    return estimate_costs([features])[0]
+
+def estimate_costs(features_list):
+    """Estima custos de vários destinos numa única chamada vectorizada ao modelo Tella.
+
+    Devolve uma lista com um float (ou None em caso de falha) por dicionário de features,
+    na mesma ordem da entrada.
+    """
+    features_list = list(features_list)
+    if not features_list:
+        return []
+    # Um só snapshot do modelo activo: uma troca a meio não mistura modelo e chaves
+    active = get_active()
+    if active is None:
         print("[ML] Modelo Tella indisponível.")
-        return None
-    
-    df = pd.DataFrame([features])
-    print(f"[ML] Tella predict -> {df.iloc[0].to_dict()}")
-    
+        return [None] * len(features_list)
+
+    use_cache = getattr(settings, 'TELLA_PREDICTION_CACHE', True)
+    results = [None] * len(features_list)
+    keys = [prediction_cache_key(f, active.hash) for f in features_list] if use_cache else []
+
+    # 1) LRU local; 2) cache Django partilhada; 3) modelo, num único lote
+    pending = list(range(len(features_list)))
+    if use_cache:
+        pending = []
+        for i, key in enumerate(keys):
+            value = _prediction_lru.get(key)
+            if value is None:
+                pending.append(i)
+            else:
+                results[i] = value
+        _count('hits_local', len(features_list) - len(pending))
+        if pending:
+            try:
+                shared = cache.get_many({keys[i] for i in pending})
+            except Exception:
+                shared = {}
+            still = []
+            for i in pending:
+                value = shared.get(keys[i])
+                if value is None:
+                    still.append(i)
+                else:
+                    results[i] = value
+                    _prediction_lru.set(keys[i], value)
+            _count('hits_shared', len(pending) - len(still))
+            pending = still
+        _count('misses', len(pending))
+
+    if not pending:
+        return results
+
     try:
-        pred = model.predict(df)
-        print(f"[ML] Tella pred: {pred}")
-        return float(pred[0])
+        preds = _predict(active.model, [features_list[i] for i in pending], active)
+        print(f"[ML] Tella pred ({len(pending)} linha(s)): {preds[:6]}")
     except Exception as e:
         print(f"[ML] Erro Tella: {e}")
-        return None
+        return results
+
+    fresh = {}
+    for i, p in zip(pending, preds):
+        results[i] = float(p)
+        if use_cache:
+            fresh[keys[i]] = results[i]
+            _prediction_lru.set(keys[i], results[i])
+    if fresh:
+        try:
+            cache.set_many(fresh, timeout=getattr(settings, 'TELLA_PREDICTION_CACHE_TTL', 86400))
+        except Exception:
+            pass
+    return results
+
+def estimate_place_costs(places):
+    """Custos diários para lugares descritos pelos argumentos de build_place_features.
+
+    Consulta primeiro a tabela pré-calculada (modo TELLA_COST_TABLE: 'exact' só responde
+    em pontos da grelha, 'interpolate' interpola entre eles); os restantes lugares vão
+    ao modelo num único lote.
+    """
+    from .cost_table import get_cost_table
+
+    places = list(places)
+    results = [None] * len(places)
+    pending = list(range(len(places)))
+    table = get_cost_table()
+    if table is not None:
+        interpolate = getattr(settings, 'TELLA_COST_TABLE', 'exact') == 'interpolate'
+        pending = []
+        for i, place in enumerate(places):
+            # A grelha não tem o eixo da província: esses lugares vão ao modelo
+            if has_province_defaults(place['categoria_destino'], place.get('provincia')):
+                pending.append(i)
+                continue
+            value = table.lookup(place, interpolate=interpolate)
+            if value is None:
+                pending.append(i)
+            else:
+                results[i] = value
+    if pending:
+        costs = estimate_costs([build_place_features(**places[i]) for i in pending])
+        for i, cost in zip(pending, costs):
+            results[i] = cost
+    return results
@@ -0,0 +1,119 @@
+"""Registo de versões do modelo Tella.
+
+    tella_models/
+      versions/<versão>/modelo_tella.joblib   (+ modelo_tella.json, tella_category_defaults.json)
+      ACTIVE     versão activa (uma linha, trocada com os.replace: atómico)
+      HISTORY    versões activadas, uma por linha (o rollback volta à anterior)
+
+A versão é "<AAAAmmdd-HHMMSS>-<hash do joblib>". Publicar não muda nada em
+produção; activar só escreve ACTIVE. Cada worker verifica o ponteiro no máximo a
+cada TELLA_MODEL_POLL_SECONDS e carrega a nova versão em segundo plano,
+continuando a servir com a anterior até a troca (ver ml.get_active).
+
+Sem ACTIVE (registo vazio ou inexistente) usa-se o modelo_tella.joblib fixo.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import os
+import shutil
+
+from django.conf import settings
+
+from . import ml
+
+MODEL_FILE = 'modelo_tella.joblib'
+METADATA_FILE = 'modelo_tella.json'
+
+
+def registry_dir():
+    path = getattr(settings, 'TELLA_MODEL_REGISTRY', None)
+    return Path(path) if path else Path(settings.BASE_DIR).parent / 'tella_models'
+
+
+def model_path(version):
+    return registry_dir() / 'versions' / version / MODEL_FILE
+
+
+def _write_atomic(path, text):
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def active_version():
+    """Versão apontada por ACTIVE, ou None sem registo."""
+    try:
+        version = (registry_dir() / 'ACTIVE').read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def history():
+    try:
+        lines = (registry_dir() / 'HISTORY').read_text(encoding='utf-8').split()
+    except FileNotFoundError:
+        return []
+    return [line for line in lines if line]
+
+
+def read_metadata(version):
+    try:
+        return json.loads((model_path(version).with_name(METADATA_FILE)).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def list_versions():
+    """[(versão, metadados)] das versões publicadas, da mais antiga para a mais recente."""
+    root = registry_dir() / 'versions'
+    if not root.is_dir():
+        return []
+    return [(p.name, read_metadata(p.name)) for p in sorted(root.iterdir())
+            if p.is_dir() and not p.name.startswith('.') and (p / MODEL_FILE).exists()]
+
+
+def publish(source, metadata=None):
+    """Copia um joblib (e o .json de metadados ao lado, se existir) para uma nova versão.
+
+    Publicar o mesmo ficheiro duas vezes devolve a versão já existente.
+    """
+    source = Path(source)
+    model_hash = ml._file_hash(source)
+    for version, _ in list_versions():
+        if version.endswith(f'-{model_hash}'):
+            return version
+    version = f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{model_hash}"
+    target = registry_dir() / 'versions' / version
+    tmp = target.with_name(f'.{version}.tmp')
+    tmp.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(source, tmp / MODEL_FILE)
+    meta_source = Path(metadata) if metadata else source.with_suffix('.json')
+    if meta_source.exists():
+        shutil.copy2(meta_source, tmp / METADATA_FILE)
+    # Só aparece em versions/ já completa
+    os.rename(tmp, target)
+    return version
+
+
+def activate(version):
+    if not model_path(version).exists():
+        raise ValueError(f'Versão inexistente: {version}')
+    root = registry_dir()
+    past = history()
+    if not past or past[-1] != version:
+        _write_atomic(root / 'HISTORY', '\n'.join([*past, version]) + '\n')
+    _write_atomic(root / 'ACTIVE', version + '\n')
+
+
+def rollback():
+    """Volta à versão activada antes da actual; devolve-a."""
+    past = history()
+    if len(past) < 2:
+        raise ValueError('Não há versão anterior para onde voltar')
+    past.pop()
+    root = registry_dir()
+    _write_atomic(root / 'HISTORY', '\n'.join(past) + '\n')
+    _write_atomic(root / 'ACTIVE', past[-1] + '\n')
+    return past[-1]
@@ -1,17 +1,31 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+# Máximo de viajantes por viagem: budget_total = custo por pessoa × viajantes
+TRIP_MAX_TRAVELERS = 50
 
 class Trip(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='trips')
     name = models.CharField(max_length=150)
     start_date = models.DateField()
     end_date = models.DateField()
-    travelers = models.PositiveIntegerField(default=1)
-    budget_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    travelers = models.PositiveIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(TRIP_MAX_TRAVELERS)])
+    budget_total = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    # Preferências usadas na estimativa do modelo Tella (valores de ml.place_inputs)
+    traveler_type = models.CharField(max_length=30, default='família')
+    budget_level = models.CharField(max_length=20, default='medio')
+    needs_transport = models.BooleanField(default=True)
+    needs_lodging = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # "Minhas viagens": filtro por utilizador e paginação por (created_at, id) sobre o mesmo índice
+            models.Index(fields=['user', 'created_at', 'id'], name='trip_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
@@ -32,10 +46,62 @@ class TripDay(models.Model):
     activities = models.TextField(blank=True)
     lodging = models.CharField(max_length=200, blank=True)
     notes = models.TextField(blank=True)
+    # Paragens do dia (id, name, lat, lng, rating, userRatingCount, categoria_principal)
+    places = models.JSONField(default=list, blank=True)
+    budget_level = models.CharField(max_length=20, blank=True, help_text="Vazio: usa o nível da viagem")
+    # Última estimativa (por pessoa) e impressão digital das linhas que a produziram
+    estimate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    estimate_breakdown = models.JSONField(default=dict, blank=True)
+    estimate_key = models.CharField(max_length=32, blank=True)
 
     class Meta:
         ordering = ['order']
         unique_together = ('trip', 'order')
 
     def __str__(self):
-        return f"Dia {self.order} - {self.trip.name}"
\ No newline at end of file
+        return f"Dia {self.order} - {self.trip.name}"
+
+class Place(models.Model):
+    """Lugar devolvido pela Places API, gravado a cada busca (upsert pelo id do Google)."""
+    google_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255)
+    # Nome normalizado (search_index.fold): minúsculas, sem acentos; busca por prefixo
+    name_folded = models.CharField(max_length=255)
+    address = models.CharField(max_length=500, blank=True)
+    lat = models.FloatField(null=True, blank=True)
+    lng = models.FloatField(null=True, blank=True)
+    rating = models.FloatField(null=True, blank=True)
+    user_rating_count = models.PositiveIntegerField(null=True, blank=True)
+    # Tipo principal do Google e categoria do modelo Tella (ml.map_google_type_to_category)
+    google_type = models.CharField(max_length=60, blank=True)
+    category = models.CharField(max_length=30, blank=True)
+    subcategory = models.CharField(max_length=60, blank=True)
+    province = models.CharField(max_length=60, blank=True)
+    photo_url = models.CharField(max_length=1000, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name_folded'], name='place_name_folded_idx'),
+            models.Index(fields=['category', 'name_folded'], name='place_category_idx'),
+            models.Index(fields=['lat', 'lng'], name='place_lat_lng_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def to_item(self):
+        """O lugar no formato dos resultados de /api/places/search/."""
+        return {
+            'name': self.name,
+            'address': self.address,
+            'lat': self.lat,
+            'lng': self.lng,
+            'rating': self.rating,
+            'userRatingCount': self.user_rating_count,
+            'categoria_principal': self.google_type or None,
+            'subcategoria': self.subcategory or None,
+            'provincia': self.province or None,
+            'photo_url': self.photo_url or None,
+            'id': self.google_id,
+        }
@@ -0,0 +1,216 @@
+"""Cache em disco das fotos da Places API (content-addressed).
+
+- `blobs/ab/<sha256>`: o conteúdo da imagem, com nome = sha256 dos bytes (também é o ETag);
+  variantes iguais partilham o mesmo ficheiro.
+- `keys/ab/<hash da chave>`: JSON com o sha256 e o Content-Type de cada
+  `(place_id, photo_ref, tamanho)`.
+
+O download do upstream é gravado em blocos num ficheiro temporário e só entra na
+cache (rename atómico) quando termina. As miniaturas são geradas uma vez a partir da
+variante `full` (requer Pillow; sem Pillow serve-se a `full`). O tamanho total é
+limitado por PLACES_PHOTO_CACHE_MB com eviction LRU pelo mtime dos blobs, que é
+actualizado a cada leitura.
+"""
+from pathlib import Path
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional: sem ele não há miniaturas
+    Image = None
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def photo_sizes():
+    """Variantes disponíveis: nome → lado máximo em píxeis."""
+    return settings.PLACES_PHOTO_SIZES
+
+
+class PhotoWriter:
+    """Escrita em blocos de um download; `commit` grava-o na cache, `discard` apaga o temporário."""
+
+    def __init__(self, store, key, content_type):
+        self.store = store
+        self.key = key
+        self.content_type = content_type
+        self._hash = hashlib.sha256()
+        self.size = 0
+        fd, self._tmp = tempfile.mkstemp(dir=store.root / 'tmp')
+        self._fh = os.fdopen(fd, 'wb')
+        self.sha = None
+
+    def write(self, chunk):
+        self._fh.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        self._fh.close()
+        self.sha = self._hash.hexdigest()
+        self.store._commit(self.key, self._tmp, self.sha, self.content_type, self.size)
+        self._tmp = None
+        return self.sha
+
+    def discard(self):
+        if self._tmp is not None:
+            self._fh.close()
+            try:
+                os.unlink(self._tmp)
+            except FileNotFoundError:
+                pass
+            self._tmp = None
+
+
+class PhotoStore:
+    # Intervalo mínimo (s) entre actualizações do mtime de um blob lido (LRU aproximado)
+    touch_interval = 60
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        for sub in ('blobs', 'keys', 'tmp'):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total = None
+
+    @staticmethod
+    def key(place_id, photo_ref, size):
+        return hashlib.sha256(f'{place_id}\0{photo_ref}\0{size}'.encode('utf-8')).hexdigest()
+
+    def _key_path(self, key):
+        return self.root / 'keys' / key[:2] / key
+
+    def blob_path(self, sha):
+        return self.root / 'blobs' / sha[:2] / sha
+
+    def lookup(self, place_id, photo_ref, size):
+        """(caminho, sha256, content_type) da foto em cache, ou None."""
+        key_path = self._key_path(self.key(place_id, photo_ref, size))
+        try:
+            meta = json.loads(key_path.read_text(encoding='utf-8'))
+            path = self.blob_path(meta['sha'])
+            mtime = path.stat().st_mtime
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        if time.time() - mtime > self.touch_interval:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+        return path, meta['sha'], meta.get('content_type') or 'image/jpeg'
+
+    def writer(self, place_id, photo_ref, size, content_type):
+        return PhotoWriter(self, self.key(place_id, photo_ref, size), content_type)
+
+    def put(self, place_id, photo_ref, size, content, content_type):
+        writer = self.writer(place_id, photo_ref, size, content_type)
+        try:
+            writer.write(content)
+            writer.commit()
+        finally:
+            writer.discard()
+        return self.lookup(place_id, photo_ref, size)
+
+    def _commit(self, key, tmp, sha, content_type, size):
+        blob = self.blob_path(sha)
+        blob.parent.mkdir(exist_ok=True)
+        if blob.exists():
+            os.unlink(tmp)  # mesmo conteúdo já guardado (outra chave ou outro worker)
+            os.utime(blob)
+        else:
+            os.replace(tmp, blob)
+            self._account(size)
+        key_path = self._key_path(key)
+        key_path.parent.mkdir(exist_ok=True)
+        # Temporário próprio (como o do blob): vários pedidos podem gravar a mesma chave ao mesmo tempo
+        fd, tmp_key = tempfile.mkstemp(dir=self.root / 'tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                json.dump({'sha': sha, 'content_type': content_type}, fh)
+            os.replace(tmp_key, key_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_key)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _account(self, size):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(entry.stat().st_size for _, entry in self._blobs())
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _blobs(self):
+        for bucket in os.scandir(self.root / 'blobs'):
+            if bucket.is_dir():
+                for entry in os.scandir(bucket.path):
+                    yield bucket.name, entry
+
+    def _evict(self):
+        """Apaga os blobs lidos há mais tempo até ficar a 90% do limite.
+
+        As chaves que apontam para blobs apagados passam a dar miss e são regravadas no
+        próximo download. Chamado com `_lock`.
+        """
+        entries = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for _, e in self._blobs()))
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total = total
+
+    def make_variant(self, place_id, photo_ref, size):
+        """Gera (uma vez) a miniatura `size` a partir da variante full já em cache."""
+        full = self.lookup(place_id, photo_ref, 'full')
+        if full is None:
+            return None
+        if Image is None:
+            return full
+        max_px = photo_sizes()[size]
+        try:
+            with Image.open(full[0]) as img:
+                if max(img.size) <= max_px:
+                    return full
+                img.thumbnail((max_px, max_px))
+                if img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+                out = io.BytesIO()
+                img.save(out, format='JPEG', quality=82, optimize=True)
+        except OSError as e:
+            print(f"[Places] Miniatura {size} de {place_id} não gerada: {e}")
+            return full
+        return self.put(place_id, photo_ref, size, out.getvalue(), 'image/jpeg')
+
+
+def photo_cache_dir():
+    path = getattr(settings, 'PLACES_PHOTO_DIR', None)
+    return Path(path) if path else Path(settings.BASE_DIR).parent / 'tella_photos'
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PhotoStore(photo_cache_dir(), settings.PLACES_PHOTO_CACHE_MB * 1024 * 1024)
+    return _store
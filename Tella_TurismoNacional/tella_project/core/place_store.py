@@ -0,0 +1,113 @@
+"""Lugares da Places API guardados na base de dados (tabela core_place).
+
+Cada resposta de /api/places/search/ vinda do upstream é gravada com um único
+INSERT ... ON CONFLICT DO UPDATE (`bulk_create(update_conflicts=True)` pelo id do
+Google), em vez de um SELECT + UPDATE/INSERT por lugar. Os lugares escolhidos
+deixam de depender só dos campos escondidos do formulário e da sessão.
+
+Consultas, todas servidas por índices:
+
+- `get`: pelo id do Google (índice único);
+- `by_prefix`: prefixo do nome normalizado (search_index.fold), como intervalo
+  [prefixo, prefixo seguinte) sobre o índice de `name_folded`, por ordem do nome;
+- `in_bbox`: rectângulo de coordenadas, pelo índice (lat, lng).
+"""
+from django.db import DatabaseError
+from django.db.models import Q
+
+from . import ml
+from .models import Place
+from .search_index import fold
+
+# Campos actualizados quando o lugar já existe (todos menos a chave)
+UPDATE_FIELDS = [
+    'name', 'name_folded', 'address', 'lat', 'lng', 'rating', 'user_rating_count',
+    'google_type', 'category', 'subcategory', 'province', 'photo_url', 'updated_at',
+]
+
+
+def _text(value, field):
+    return str(value or '')[:Place._meta.get_field(field).max_length]
+
+
+def _number(value, cast):
+    try:
+        return cast(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def place_from_item(item):
+    """Place (não gravado) a partir de um resultado de /api/places/search/."""
+    google_type = item.get('categoria_principal') or ''
+    return Place(
+        google_id=_text(item['id'], 'google_id'),
+        name=_text(item.get('name'), 'name'),
+        name_folded=_text(fold(item.get('name')), 'name_folded'),
+        address=_text(item.get('address'), 'address'),
+        lat=_number(item.get('lat'), float),
+        lng=_number(item.get('lng'), float),
+        rating=_number(item.get('rating'), float),
+        user_rating_count=_number(item.get('userRatingCount'), int),
+        google_type=_text(google_type, 'google_type'),
+        category=ml.map_google_type_to_category([google_type] if google_type else []),
+        subcategory=_text(item.get('subcategoria'), 'subcategory'),
+        province=_text(item.get('provincia'), 'province'),
+        photo_url=_text(item.get('photo_url'), 'photo_url'),
+    )
+
+
+def upsert(items):
+    """Grava (ou actualiza) os lugares numa única instrução; devolve quantos foram enviados."""
+    places = {}
+    for item in items:
+        if item.get('id') and item.get('name'):
+            # Ids repetidos no mesmo lote: fica o último (um ON CONFLICT não pode tocar a mesma linha duas vezes)
+            places[str(item['id'])] = place_from_item(item)
+    if not places:
+        return 0
+    try:
+        Place.objects.bulk_create(
+            list(places.values()),
+            update_conflicts=True,
+            unique_fields=['google_id'],
+            update_fields=UPDATE_FIELDS,
+        )
+    except DatabaseError as e:
+        print(f"[Places] Falha ao gravar lugares: {e}")
+        return 0
+    return len(places)
+
+
+def get(google_id):
+    if not google_id:
+        return None
+    return Place.objects.filter(google_id=google_id).first()
+
+
+def _next_prefix(prefix):
+    """Menor texto maior que todos os que começam por `prefix` (limite superior do intervalo)."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def by_prefix(query, limit=6, category=None):
+    """Lugares cujo nome normalizado começa por `query` (normalizada)."""
+    prefix = fold(query)
+    if not prefix:
+        return []
+    qs = Place.objects.filter(name_folded__gte=prefix, name_folded__lt=_next_prefix(prefix))
+    if category:
+        qs = qs.filter(category=category)
+    return list(qs.order_by('name_folded')[:limit])
+
+
+def in_bbox(south, west, north, east, limit=100, category=None):
+    """Lugares dentro do rectângulo; com west > east o rectângulo atravessa o antimeridiano."""
+    qs = Place.objects.filter(lat__gte=south, lat__lte=north)
+    if west <= east:
+        qs = qs.filter(lng__gte=west, lng__lte=east)
+    else:
+        qs = qs.filter(Q(lng__gte=west) | Q(lng__lte=east))
+    if category:
+        qs = qs.filter(category=category)
+    return list(qs[:limit])
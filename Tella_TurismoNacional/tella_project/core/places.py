@@ -0,0 +1,289 @@
+"""Cliente HTTP assíncrono partilhado para a RapidAPI (Google Places New V2).
+
+Um único `httpx.AsyncClient` por event loop (um por worker uvicorn), com ligações
+keep-alive e pool limitado: os pedidos seguintes reutilizam a ligação TLS já aberta
+ao host da RapidAPI em vez de abrir uma nova em cada cache miss.
+
+Com o worker síncrono (WSGI) cada view assíncrona corre num event loop próprio,
+pelo que o cliente só dura um pedido; o pool só é efectivo sob ASGI (uvicorn).
+Pela mesma razão, sob WSGI o trabalho em segundo plano (refresh stale-while-revalidate,
+prefetch de fotos) não pode ficar como tarefa no loop do pedido, que é cancelada
+quando a view devolve: corre numa thread com event loop próprio (`thread=True`).
+"""
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+from urllib.parse import urlencode
+
+import httpx
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.cache import cache
+
+from .circuit import CircuitBreaker, CircuitOpen
+
+_clients = weakref.WeakKeyDictionary()
+# Pedidos upstream em curso por event loop: {loop: {chave: Future}}
+_inflight = weakref.WeakKeyDictionary()
+# Referências às tarefas de refresh em segundo plano (evita que sejam recolhidas pelo GC)
+_background = set()
+# Circuit breaker do processo, partilhado pela busca e pelas fotos
+_breaker = None
+
+
+def upstream_url(path: str) -> str:
+    base = getattr(settings, 'RAPIDAPI_BASE_URL', None) or f"https://{settings.RAPIDAPI_HOST}"
+    return base.rstrip('/') + path
+
+
+def upstream_headers(**extra):
+    return {
+        'x-rapidapi-host': settings.RAPIDAPI_HOST,
+        'x-rapidapi-key': settings.RAPIDAPI_KEY or '',
+        **extra,
+    }
+
+
+def _new_client():
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.PLACES_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PLACES_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.PLACES_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            settings.PLACES_HTTP_TIMEOUT,
+            connect=settings.PLACES_HTTP_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Cliente partilhado do event loop corrente (criado na primeira utilização)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _new_client()
+        _clients[loop] = client
+    return client
+
+
+def get_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker(
+            failure_threshold=settings.PLACES_BREAKER_FAILURES,
+            cooldown=settings.PLACES_BREAKER_COOLDOWN,
+            slow_call=settings.PLACES_BREAKER_SLOW_CALL,
+            min_timeout=settings.PLACES_HTTP_MIN_TIMEOUT,
+            max_timeout=settings.PLACES_HTTP_TIMEOUT,
+        )
+    return _breaker
+
+
+def reset_breaker():
+    """Descarta o estado do circuit breaker (volta a ler as settings na próxima chamada)."""
+    global _breaker
+    _breaker = None
+
+
+async def call_upstream(send):
+    """Chama a RapidAPI através do circuit breaker.
+
+    `send(timeout)` faz o pedido com o timeout adaptativo e devolve o httpx.Response.
+    Levanta CircuitOpen sem chamar o upstream se o circuito estiver aberto; erros de
+    rede, timeouts, 5xx e 429 contam como falhas.
+    """
+    breaker = get_breaker()
+    breaker.before_call()
+    timeout = breaker.timeout()
+    t0 = time.monotonic()
+    try:
+        resp = await send(httpx.Timeout(timeout, connect=min(settings.PLACES_HTTP_CONNECT_TIMEOUT, timeout)))
+    except httpx.HTTPError:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.abandon()
+        raise
+    if resp.status_code >= 500 or resp.status_code == 429:
+        breaker.record_failure()
+    else:
+        breaker.record_success(time.monotonic() - t0)
+    return resp
+
+
+async def aclose_client():
+    """Fecha o cliente do event loop corrente (testes de carga, encerramento)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _fetch_with_lock(cache_key, fetch):
+    """Entre workers: só quem obtém o lock na cache chama o upstream; os outros esperam pelo resultado."""
+    lock_key = f"{cache_key}:lock"
+    poll = settings.PLACES_SINGLEFLIGHT_POLL
+    deadline = time.monotonic() + settings.PLACES_SINGLEFLIGHT_WAIT
+    while True:
+        try:
+            acquired = await cache.aadd(lock_key, 1, timeout=settings.PLACES_SINGLEFLIGHT_LOCK_TTL)
+        except Exception:
+            acquired = True  # cache indisponível: segue sem coordenação
+        if acquired:
+            try:
+                return await fetch()
+            finally:
+                try:
+                    await cache.adelete(lock_key)
+                except Exception:
+                    pass
+        await asyncio.sleep(poll)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            return cached
+        if time.monotonic() >= deadline:
+            # O outro worker demorou demais: desiste de esperar e vai ao upstream
+            return await fetch()
+
+
+async def single_flight(cache_key, fetch):
+    """Coalesce pedidos idênticos: uma chamada a `fetch` por chave de cada vez.
+
+    No mesmo processo os pedidos concorrentes aguardam o mesmo Future; entre
+    workers gunicorn a coordenação é feita por um lock na cache (cache.add), que
+    só é efectivo com um backend de cache partilhado. `fetch` deve gravar o
+    resultado em `cache_key`.
+    """
+    loop = asyncio.get_running_loop()
+    inflight = _inflight.setdefault(loop, {})
+    future = inflight.get(cache_key)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = loop.create_future()
+    inflight[cache_key] = future
+    try:
+        result = await _fetch_with_lock(cache_key, fetch)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # evita o aviso "exception was never retrieved" sem waiters
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        inflight.pop(cache_key, None)
+
+
+def cache_entry(items):
+    """Entrada de cache com o instante até ao qual é considerada fresca (TTL soft)."""
+    return {'items': items, 'fresh_until': time.time() + settings.PLACES_CACHE_TTL}
+
+
+def is_fresh(entry):
+    return time.time() < entry.get('fresh_until', 0)
+
+
+def _spawn(coro_fn, label, thread=False):
+    """Corre `coro_fn()` em segundo plano, sem bloquear o pedido.
+
+    Por omissão numa tarefa do event loop corrente (ASGI: o loop vive com o worker).
+    Com `thread`, numa thread com loop próprio, para pedidos WSGI.
+    """
+    async def _run():
+        try:
+            # Contexto próprio: o executor do pedido original termina com a resposta
+            async with ThreadSensitiveContext():
+                await coro_fn()
+        except CircuitOpen:
+            pass  # upstream em baixo: o refresh fica para depois
+        except Exception as e:
+            print(f"[Places] Falha em segundo plano ({label}): {e}")
+
+    if thread:
+        async def _run_and_close():
+            try:
+                await _run()
+            finally:
+                await aclose_client()
+
+        worker = threading.Thread(target=asyncio.run, args=(_run_and_close(),), name='places-background', daemon=True)
+        worker.start()
+        return worker
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+def refresh_in_background(cache_key, fetch, thread=False):
+    """Agenda um refresh (single-flight) sem bloquear o pedido; ignora se já houver um em curso.
+
+    `fetch` pode correr noutro event loop (com `thread`): deve obter o cliente com get_client().
+    """
+    if cache_key in _inflight.get(asyncio.get_running_loop(), {}):
+        return
+    _spawn(lambda: single_flight(cache_key, fetch), f'refresh de {cache_key}', thread)
+
+
+def photo_uri_key(place_id, photo_ref):
+    # photo_ref tem centenas de caracteres: hash para respeitar o limite de 250 das chaves
+    digest = hashlib.blake2b(f'{place_id}\0{photo_ref}'.encode('utf-8'), digest_size=16).hexdigest()
+    return f"places:photo_uri:{digest}"
+
+
+def photo_media_url(place_id, photo_ref, **params):
+    max_px = settings.PLACES_PHOTO_SIZES['full']
+    query = urlencode({'maxWidthPx': max_px, 'maxHeightPx': max_px, **params})
+    return upstream_url(f"/v1/places/{place_id}/photos/{photo_ref}/media?{query}")
+
+
+async def resolve_photo_uri(place_id, photo_ref):
+    """URL pública (photoUri) da foto, memorizada na cache por PLACES_PHOTO_URI_TTL.
+
+    Pedidos simultâneos para a mesma foto (p.ex. o prefetch da busca e o browser)
+    partilham uma única chamada à RapidAPI. Devolve '' se o upstream não der photoUri.
+    """
+    cache_key = photo_uri_key(place_id, photo_ref)
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    async def _fetch():
+        url = photo_media_url(place_id, photo_ref, skipHttpRedirect='true')
+        resp = await call_upstream(lambda timeout: get_client().get(url, headers=upstream_headers(), timeout=timeout))
+        uri = ''
+        if resp.status_code == 200:
+            try:
+                data = resp.json()
+                uri = data.get('photoUri') or data.get('photo_uri') or ''
+            except ValueError:
+                pass
+        # Sem photoUri guarda-se '' por pouco tempo: quem espera pelo lock não fica a fazer polling
+        await cache.aset(cache_key, uri, timeout=settings.PLACES_PHOTO_URI_TTL if uri else 60)
+        return uri
+
+    return await single_flight(cache_key, _fetch)
+
+
+async def forget_photo_uri(place_id, photo_ref):
+    """Esquece um photoUri memorizado (p.ex. expirou no CDN)."""
+    await cache.adelete(photo_uri_key(place_id, photo_ref))
+
+
+def prefetch_photo_uris(photos, thread=False):
+    """Resolve em paralelo, em segundo plano, os photoUri de [(place_id, photo_ref), ...]."""
+    if not photos:
+        return
+
+    async def _prefetch():
+        await asyncio.gather(*(resolve_photo_uri(pid, ref) for pid, ref in photos), return_exceptions=True)
+
+    _spawn(_prefetch, f'prefetch de {len(photos)} foto(s)', thread)
@@ -0,0 +1,296 @@
+"""Índice local de destinos para o autocomplete da busca de lugares.
+
+Construído a partir de `destinos_turisticos_angola.csv` e de todos os resultados da
+Places API já vistos. A busca é feita sobre os nomes normalizados (minúsculas, sem
+acentos: "Huíla" → "huila"):
+
+- prefixo: cada termo da consulta tem de ser prefixo de um termo do nome
+  (lista ordenada de termos + bisect);
+- aproximada: se houver poucos resultados por prefixo, semelhança de trigramas
+  (índice invertido trigrama → lugares), tolerante a erros como "Kalandla".
+
+Os resultados novos são acrescentados a um ficheiro JSON Lines (um lugar por linha),
+relido no arranque; os workers lêem também as linhas acrescentadas pelos outros.
+A compactação reescreve o ficheiro sob um lock exclusivo (flock num ficheiro `.lock`
+ao lado) e as escritas pedem um lock partilhado, para nenhuma linha se perder a meio.
+"""
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from pathlib import Path
+import csv
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: só o lock entre threads
+    fcntl = None
+
+from . import ml
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Categoria do modelo → tipo Google equivalente (para os destinos do CSV)
+CATEGORY_TO_GOOGLE_TYPE = {}
+for _gtype, _cat in ml.GOOGLE_TYPES_TO_CATEGORY.items():
+    CATEGORY_TO_GOOGLE_TYPE.setdefault(_cat, _gtype)
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def fold(text):
+    """Normaliza para busca: minúsculas, sem acentos, só letras/dígitos separados por espaço."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def trigrams(folded):
+    padded = f'  {folded} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def index_path():
+    path = getattr(settings, 'PLACES_INDEX_PATH', None)
+    return Path(path) if path else Path(settings.BASE_DIR).parent / 'tella_places_index.jsonl'
+
+
+def csv_items(path=None):
+    """Destinos do CSV de referência no formato dos resultados de /api/places/search/."""
+    path = Path(path) if path else ml._data_path()
+    items = []
+    with open(path, encoding='utf-8-sig', newline='') as fh:
+        for row in csv.DictReader(fh):
+            categoria = row['categoria_destino']
+            items.append({
+                'name': row['nome_destino'],
+                'address': f"{row['nome_destino']}, Angola",
+                'lat': float(row['latitude']),
+                'lng': float(row['longitude']),
+                'rating': float(row['classificacao_media']),
+                'userRatingCount': int(float(row['num_avaliacoes'])),
+                'categoria_principal': CATEGORY_TO_GOOGLE_TYPE.get(categoria, 'locality'),
+                'subcategoria': categoria.capitalize(),
+                'provincia': None,
+                'photo_url': None,
+                'id': f"csv:{row['id_destino']}",
+            })
+    return items
+
+
+class DestinationIndex:
+    """Índice em memória (prefixo + trigramas), actualizado incrementalmente."""
+
+    # Semelhança mínima de trigramas (Jaccard) para a busca aproximada
+    min_similarity = 0.3
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.items = {}
+        self._folded = {}
+        self._tokens = []           # termos distintos, ordenados (busca por prefixo)
+        self._token_ids = {}        # termo → ids
+        self._trigram_ids = {}      # trigrama → ids
+        self._offset = 0
+        self._inode = None          # ficheiro lido (a compactação de outro worker substitui-o)
+        self._lines = 0             # linhas lidas do ficheiro (inclui versões antigas do mesmo lugar)
+        self.version = 0            # incrementado a cada alteração (invalida índices derivados, p.ex. geo)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def _unindex(self, place_id):
+        folded = self._folded.pop(place_id, None)
+        if folded is None:
+            return
+        for token in set(folded.split()):
+            ids = self._token_ids.get(token)
+            if ids is not None:
+                ids.discard(place_id)
+                if not ids:
+                    del self._token_ids[token]
+                    self._tokens.pop(bisect_left(self._tokens, token))
+        for gram in trigrams(folded):
+            ids = self._trigram_ids.get(gram)
+            if ids is not None:
+                ids.discard(place_id)
+                if not ids:
+                    del self._trigram_ids[gram]
+
+    def _index(self, item):
+        place_id = item['id']
+        folded = fold(item.get('name'))
+        if self._folded.get(place_id) != folded:
+            self._unindex(place_id)
+            self._folded[place_id] = folded
+            for token in set(folded.split()):
+                if token not in self._token_ids:
+                    self._token_ids[token] = set()
+                    insort(self._tokens, token)
+                self._token_ids[token].add(place_id)
+            for gram in trigrams(folded):
+                self._trigram_ids.setdefault(gram, set()).add(place_id)
+        if self.items.get(place_id) != item:
+            self.items[place_id] = item
+            self.version += 1
+
+    def add(self, items, persist=True):
+        """Acrescenta (ou actualiza) lugares; devolve os que mudaram e grava-os no ficheiro."""
+        changed = []
+        with self._lock:
+            for item in items:
+                if not item.get('id') or not item.get('name'):
+                    continue
+                if self.items.get(item['id']) != item:
+                    self._index(item)
+                    changed.append(item)
+            if changed and persist and self.path is not None:
+                self._append(changed)
+        return changed
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """flock entre workers: partilhado para acrescentar linhas, exclusivo para compactar."""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.path.with_suffix('.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)  # liberta o flock
+
+    def _append(self, items):
+        lines = ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in items).encode('utf-8')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._file_lock(exclusive=False):
+                # O_APPEND: escritas de vários workers não se sobrepõem
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, lines)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print(f"[Places] Falha ao gravar índice local: {e}")
+
+    def sync(self):
+        """Lê as linhas acrescentadas ao ficheiro desde a última leitura (por este ou outro worker)."""
+        if self.path is None:
+            return
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        size = stat.st_size
+        with self._lock:
+            if stat.st_ino != self._inode or size < self._offset:
+                # Ficheiro novo ou compactado/substituído: relê tudo
+                self._inode, self._offset, self._lines = stat.st_ino, 0, 0
+            if size == self._offset:
+                return
+            with open(self.path, 'rb') as fh:
+                fh.seek(self._offset)
+                data = fh.read()
+            # Só consome linhas completas (uma escrita concorrente pode estar a meio)
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].splitlines():
+                self._lines += 1
+                try:
+                    self._index(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+            self._offset += end
+
+    def search(self, query, limit=6):
+        folded = fold(query)
+        if not folded:
+            return []
+        self.sync()
+        terms = folded.split()
+        with self._lock:
+            matched = None
+            for term in terms:
+                ids = set()
+                i = bisect_left(self._tokens, term)
+                while i < len(self._tokens) and self._tokens[i].startswith(term):
+                    ids |= self._token_ids[self._tokens[i]]
+                    i += 1
+                matched = ids if matched is None else matched & ids
+                if not matched:
+                    break
+            ranked = sorted(matched or (), key=lambda pid: self._popularity(pid), reverse=True)
+            if len(ranked) < limit:
+                seen = set(ranked)
+                ranked += [pid for pid in self._fuzzy(folded) if pid not in seen]
+            return [self.items[pid] for pid in ranked[:limit]]
+
+    def _popularity(self, place_id):
+        item = self.items[place_id]
+        return (float(item.get('rating') or 0), int(item.get('userRatingCount') or 0))
+
+    def _fuzzy(self, folded):
+        grams = trigrams(folded)
+        counts = {}
+        for gram in grams:
+            for pid in self._trigram_ids.get(gram, ()):
+                counts[pid] = counts.get(pid, 0) + 1
+        scored = []
+        for pid, shared in counts.items():
+            similarity = shared / (len(grams) + len(trigrams(self._folded[pid])) - shared)
+            if similarity >= self.min_similarity:
+                scored.append((similarity, self._popularity(pid), pid))
+        scored.sort(reverse=True)
+        return [pid for _, _, pid in scored]
+
+    def compact(self):
+        """Reescreve o ficheiro com uma linha por lugar (remove versões antigas)."""
+        if self.path is None:
+            return
+        with self._lock, self._file_lock(exclusive=True):
+            # Sob o lock exclusivo: já não há linhas de outros workers a meio
+            self.sync()
+            tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+            try:
+                with open(tmp, 'w', encoding='utf-8') as fh:
+                    for item in self.items.values():
+                        if not str(item['id']).startswith('csv:'):
+                            fh.write(json.dumps(item, ensure_ascii=False) + '\n')
+                os.replace(tmp, self.path)
+            except OSError:
+                tmp.unlink(missing_ok=True)
+                raise
+            stat = self.path.stat()
+            self._inode, self._offset = stat.st_ino, stat.st_size
+            self._lines = sum(1 for pid in self.items if not str(pid).startswith('csv:'))
+
+
+def get_index():
+    """Índice do processo: CSV de referência + ficheiro de lugares já vistos (carregado uma vez)."""
+    global _index
+    if _index is not None:
+        return _index
+    with _index_lock:
+        if _index is None:
+            index = DestinationIndex(index_path())
+            try:
+                index.add(csv_items(), persist=False)
+            except FileNotFoundError:
+                print("[Places] CSV de referência não encontrado; índice local só com lugares vistos.")
+            index.sync()
+            # Muitas versões repetidas no ficheiro: compacta no arranque
+            if index._lines > 2 * len(index) + 1000:
+                try:
+                    index.compact()
+                except OSError as e:
+                    print(f"[Places] Falha ao compactar índice local: {e}")
+            _index = index
+    return _index
@@ -0,0 +1,497 @@
+import asyncio
+import itertools
+import json
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import numpy as np
+
+from . import compact_model, estimate_state, geo, itinerary, ml, places, search_index, trips, views
+from .circuit import CircuitBreaker, CircuitOpen
+from .management.commands.bench_estimate import synthetic_features
+from .management.commands.bench_itinerary import synthetic_places
+from .management.places_stub import PlacesStub
+from .models import Trip, TripDay
+
+# "Minhas viagens": sessão, utilizador, página de viagens e dias de todas elas
+LIST_QUERIES = 4
+
+
+def create_trips(user, n_trips, n_days):
+    """Viagens com created_at repetido aos pares; devolve os ids pela ordem (created_at, id) decrescente."""
+    start = date(2025, 1, 1)
+    now = timezone.now()
+    trips = Trip.objects.bulk_create([
+        Trip(user=user, name=f'Viagem {i}', start_date=start, end_date=start + timedelta(days=n_days - 1),
+             budget_total=Decimal('1000.00') * n_days)
+        for i in range(n_trips)
+    ])
+    # auto_now_add ignora valores explícitos no create: acertar created_at depois
+    for i, trip in enumerate(trips):
+        trip.created_at = now - timedelta(minutes=i // 2)
+    Trip.objects.bulk_update(trips, ['created_at'])
+    TripDay.objects.bulk_create([
+        TripDay(trip=trip, date=start + timedelta(days=d), order=d + 1,
+                places=[{'name': f'Lugar {d}'}], estimate=Decimal('1000.00'))
+        for trip in trips for d in range(n_days)
+    ])
+    return [t.pk for t in sorted(trips, key=lambda t: (t.created_at, t.pk), reverse=True)]
+
+
+class TripQueriesTests(TestCase):
+    """O número de consultas de "Minhas viagens" não cresce com as viagens nem com os dias."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('viajante')
+        self.client.force_login(self.user)
+
+    def assert_list_queries(self, n_trips, n_days):
+        create_trips(self.user, n_trips, n_days)
+        with self.assertNumQueries(LIST_QUERIES):
+            response = self.client.get(reverse('core:api_trips'), {'limit': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), min(n_trips, 20))
+        with self.assertNumQueries(LIST_QUERIES):
+            response = self.client.get(reverse('core:minhas_viagens'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_one_trip_one_day(self):
+        self.assert_list_queries(1, 1)
+
+    def test_sixty_trips_thirty_days(self):
+        self.assert_list_queries(60, 30)
+
+    def test_cursor_walks_every_trip_once_in_order(self):
+        expected = create_trips(self.user, 60, 3)
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 20, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(reverse('core:api_trips'), params).json()
+            pages += 1
+            for trip in data['results']:
+                self.assertEqual(trip['duration_days'], len(trip['days']))
+            seen += [trip['id'] for trip in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('core:api_trips'), {'cursor': '!!'})
+        self.assertEqual(response.status_code, 400)
+
+    def count_post(self, url, body):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(url, json.dumps(body), content_type='application/json')
+        self.assertIn(response.status_code, (200, 201), response.content[:200])
+        return len(captured.captured_queries), response.json()
+
+    def test_create_and_move_cost_the_same_for_any_duration(self):
+        counts = {}
+        for n_days in (2, 60):
+            start = date(2025, 1, 1)
+            end = start + timedelta(days=n_days - 1)
+            created, data = self.count_post(reverse('core:api_trips'), {
+                'name': f'{n_days} dias', 'start_date': start.isoformat(), 'end_date': end.isoformat(),
+            })
+            self.assertEqual(len(data['days']), n_days)
+            # Adiar um dia: apaga 1, renumera os outros, cria 1
+            edited, data = self.count_post(reverse('core:api_trip_detail', args=[data['id']]), {
+                'start_date': (start + timedelta(days=1)).isoformat(),
+                'end_date': (end + timedelta(days=1)).isoformat(),
+            })
+            self.assertEqual(data['day_changes'], {'created': 1, 'deleted': 1, 'renumbered': n_days - 1})
+            counts[n_days] = (created, edited)
+        self.assertEqual(counts[2], counts[60])
+
+
+class FastPathParityTests(SimpleTestCase):
+    """O caminho rápido NumPy e o formato compacto devolvem bit a bit o mesmo que model.predict."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = ml.get_pipeline()
+        cls.rows = ml.load_reference_rows() + synthetic_features(500)
+
+    def test_model_available(self):
+        self.assertIsNotNone(self.model, ml.model_status().get('error'))
+
+    def test_fast_predictor(self):
+        self.assertEqual(ml.check_fast_path_parity(self.model, ml.FastPredictor(self.model), self.rows), 0)
+
+    def test_compact_model(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            compact = ml.CompactModel.load(compact_model.export(self.model, tmp), mmap=False)
+            self.assertEqual(ml.check_fast_path_parity(self.model, compact, self.rows), 0)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Buscas idênticas em simultâneo fazem uma só chamada ao upstream (stub local da Places API)."""
+
+    def setUp(self):
+        self.stub = PlacesStub(latency=0.2)
+        stub_context = self.stub.running()
+        stub_context.__enter__()
+        self.addCleanup(stub_context.__exit__, None, None, None)
+        settings_context = override_settings(RAPIDAPI_BASE_URL=self.stub.base_url, RAPIDAPI_KEY='stub')
+        settings_context.enable()
+        self.addCleanup(settings_context.disable)
+        places.reset_breaker()
+        self.addCleanup(places.reset_breaker)
+        # Sufixo aleatório: a consulta nunca está já na cache
+        self.cache_key = f'places:teste-{uuid.uuid4().hex}'
+
+    async def search(self, calls):
+        async def _fetch():
+            client = places.get_client()
+            resp = await places.call_upstream(lambda timeout: client.post(
+                places.upstream_url('/v1/places:searchText'), json={'textQuery': 'Ilha do Mussulo'},
+                headers=places.upstream_headers(), timeout=timeout))
+            resp.raise_for_status()
+            entry = places.cache_entry(resp.json()['places'])
+            await cache.aset(self.cache_key, entry)
+            return entry
+
+        try:
+            return await asyncio.gather(*(places.single_flight(self.cache_key, _fetch) for _ in range(calls)))
+        finally:
+            await places.aclose_client()
+
+    def test_fifty_identical_calls_one_upstream_request(self):
+        entries = asyncio.run(self.search(50))
+        self.assertEqual(self.stub.search_requests, 1)
+        self.assertEqual(len(entries), 50)
+        self.assertTrue(all(entry['items'] == entries[0]['items'] for entry in entries))
+
+    def test_fifty_identical_calls_across_two_event_loops(self):
+        # Dois workers (um event loop cada) coordenados pelo lock na cache
+        barrier = threading.Barrier(2)
+        results = []
+
+        def _worker():
+            barrier.wait()
+            results.extend(asyncio.run(self.search(25)))
+
+        threads = [threading.Thread(target=_worker) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.stub.search_requests, 1)
+        self.assertEqual(len(results), 50)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def breaker(self, **kwargs):
+        return CircuitBreaker(**{'failure_threshold': 3, 'cooldown': 0.05, 'min_timeout': 0.5,
+                                 'max_timeout': 15.0, **kwargs})
+
+    def open_breaker(self, breaker):
+        for _ in range(breaker.failure_threshold):
+            breaker.before_call()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+    def test_opens_after_n_consecutive_failures(self):
+        breaker = self.breaker()
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        # Um sucesso pelo meio recomeça a contagem
+        breaker.record_success(0.01)
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = self.breaker(slow_call=1.0)
+        for _ in range(3):
+            breaker.record_success(2.0)
+        self.assertEqual(breaker.state, 'open')
+
+    def test_short_circuits_while_open(self):
+        breaker = self.breaker(cooldown=30.0)
+        self.open_breaker(breaker)
+        for _ in range(5):
+            with self.assertRaises(CircuitOpen) as ctx:
+                breaker.before_call()
+        self.assertGreater(ctx.exception.retry_in, 29)
+        self.assertEqual(breaker.rejected, 5)
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = self.breaker()
+        self.open_breaker(breaker)
+        time.sleep(0.06)
+        self.assertTrue(breaker.before_call())
+        self.assertEqual(breaker.state, 'half_open')
+        # Só uma chamada de teste de cada vez
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        time.sleep(0.06)
+        self.assertTrue(breaker.before_call())
+        breaker.record_success(0.01)
+        self.assertEqual(breaker.state, 'closed')
+        self.assertFalse(breaker.before_call())
+
+    def test_abandoned_probe_frees_the_slot(self):
+        breaker = self.breaker()
+        self.open_breaker(breaker)
+        time.sleep(0.06)
+        self.assertTrue(breaker.before_call())
+        breaker.abandon()
+        self.assertTrue(breaker.before_call())
+
+    def test_timeout_follows_p95(self):
+        breaker = self.breaker()
+        # Sem amostras suficientes: o máximo
+        for _ in range(19):
+            breaker.record_success(1.0)
+        self.assertEqual(breaker.timeout(), 15.0)
+        # 100 amostras: 95 de 1 s e 5 de 2 s → p95 = 2 s, timeout = 3 × 2 s
+        breaker = self.breaker()
+        for elapsed in [1.0] * 95 + [2.0] * 5:
+            breaker.record_success(elapsed)
+        self.assertEqual(breaker.latency.p95(), 2.0)
+        self.assertEqual(breaker.timeout(), 6.0)
+
+    def test_timeout_is_clamped(self):
+        fast = self.breaker()
+        for _ in range(20):
+            fast.record_success(0.01)
+        self.assertEqual(fast.timeout(), 0.5)
+        slow = self.breaker(slow_call=100.0, max_timeout=10.0)
+        for _ in range(20):
+            slow.record_success(8.0)
+        self.assertEqual(slow.timeout(), 10.0)
+
+
+@override_settings(PLACES_LOCAL_MIN_HITS=0, PLACES_BREAKER_FAILURES=3, PLACES_BREAKER_COOLDOWN=0.5,
+                   PLACES_HTTP_MIN_TIMEOUT=0.3, PLACES_HTTP_TIMEOUT=15.0)
+class CircuitBreakerSearchTests(TestCase):
+    """Busca de lugares contra o stub com latência e erros: saudável → lento → aberto → erros → recuperado."""
+
+    def setUp(self):
+        self.stub = PlacesStub(latency=0.02)
+        stub_context = self.stub.running()
+        stub_context.__enter__()
+        self.addCleanup(stub_context.__exit__, None, None, None)
+        settings_context = override_settings(RAPIDAPI_BASE_URL=self.stub.base_url, RAPIDAPI_KEY='stub')
+        settings_context.enable()
+        self.addCleanup(settings_context.disable)
+        # Índice local só com o CSV, em memória: é o fallback quando o upstream falha
+        index = search_index.DestinationIndex()
+        index.add(search_index.csv_items(), persist=False)
+        self.addCleanup(setattr, search_index, '_index', search_index._index)
+        search_index._index = index
+        places.reset_breaker()
+        self.addCleanup(places.reset_breaker)
+
+    async def search(self, n, query='Kalandula'):
+        results = []
+        for _ in range(n):
+            # Cache limpa: cada pedido tem de decidir entre o upstream e o fallback
+            await cache.aclear()
+            request = AsyncRequestFactory().get('/api/places/search/', {'q': query})
+            request.user = AnonymousUser()
+            t0 = time.perf_counter()
+            response = await views.api_places_search.__wrapped__(request)
+            results.append((response, time.perf_counter() - t0))
+        return results
+
+    def cache_statuses(self, results):
+        return {response.get('X-Cache-Status') for response, _ in results}
+
+    async def test_breaker_scenario(self):
+        breaker = places.get_breaker()
+        try:
+            # 1) Upstream saudável: 200 do upstream e o timeout desce para perto do p95 observado
+            results = await self.search(30)
+            self.assertEqual({response.status_code for response, _ in results}, {200})
+            self.assertEqual(self.cache_statuses(results), {'miss'})
+            self.assertEqual(breaker.state, 'closed')
+            adapted = breaker.timeout()
+            self.assertEqual(adapted, 0.3)
+
+            # 2) Upstream lento: cada chamada corta no timeout adaptativo e serve o índice local
+            self.stub.latency = 2.0
+            self.stub.reset()
+            results = await self.search(3)
+            self.assertLess(max(elapsed for _, elapsed in results), adapted + 1.0)
+            self.assertEqual(self.cache_statuses(results), {'local'})
+            self.assertEqual(breaker.state, 'open')
+
+            # 3) Circuito aberto: falha rápida, sem chamar o upstream, com fallback local
+            self.stub.reset()
+            results = await self.search(10)
+            self.assertEqual(self.stub.requests, 0)
+            self.assertEqual(self.cache_statuses(results), {'local'})
+            self.assertLess(max(elapsed for _, elapsed in results), 0.2)
+            photo = AsyncRequestFactory().get('/api/places/photo/x/y/')
+            photo.user = AnonymousUser()
+            response = await views.api_place_photo.__wrapped__(photo, 'x', 'y')
+            self.assertEqual(response.status_code, 503)
+            self.assertTrue(response.get('Retry-After'))
+
+            # 4) Cooldown passado, upstream com erros: uma única chamada de teste, que volta a abrir
+            self.stub.latency, self.stub.error_rate = 0.02, 1.0
+            await asyncio.sleep(0.6)
+            self.stub.reset()
+            await self.search(5)
+            self.assertEqual(self.stub.requests, 1)
+            self.assertEqual(breaker.state, 'open')
+
+            # 5) Upstream recuperado: a chamada de teste fecha o circuito
+            self.stub.error_rate = 0.0
+            await asyncio.sleep(0.6)
+            results = await self.search(3)
+            self.assertEqual(breaker.state, 'closed')
+            self.assertEqual(self.cache_statuses(results), {'miss'})
+        finally:
+            await places.aclose_client()
+
+
+class ItineraryTests(SimpleTestCase):
+    def distances(self, places):
+        return geo.pairwise_km([p['lat'] for p in places], [p['lng'] for p in places])
+
+    def test_two_opt_never_worse_than_nearest_neighbour(self):
+        for seed in range(10):
+            dist = self.distances(synthetic_places(60, seed=seed))
+            nn = itinerary.nearest_neighbour(dist)
+            tour = itinerary.two_opt(nn, dist)
+            self.assertEqual(sorted(tour), list(range(60)))
+            self.assertLessEqual(itinerary.path_length(tour, dist), itinerary.path_length(nn, dist) + 1e-9)
+
+    def test_two_opt_uncrosses(self):
+        # Quatro cantos de um quadrado visitados em "Z": o 2-opt desfaz o cruzamento
+        corners = [(0, 0), (1, 1), (1, 0), (0, 1)]
+        dist = self.distances([{'lat': lat, 'lng': lng} for lat, lng in corners])
+        tour = itinerary.two_opt([0, 1, 2, 3], dist)
+        best = min(itinerary.path_length(p, dist) for p in itertools.permutations(range(4)))
+        self.assertAlmostEqual(itinerary.path_length(tour, dist), best)
+        self.assertLess(best, itinerary.path_length([0, 1, 2, 3], dist))
+
+    def test_split_path_balanced_and_cuts_longest_links(self):
+        rng = np.random.default_rng(0)
+        for n, n_days in [(7, 3), (10, 4), (9, 3), (5, 5), (3, 5), (12, 1)]:
+            dist = rng.uniform(1, 100, (n, n))
+            path = list(rng.permutation(n))
+            segments = itinerary.split_path(path, dist, n_days)
+            self.assertEqual(len(segments), n_days)
+            self.assertEqual([i for segment in segments for i in segment], path)
+            base = n // n_days
+            self.assertTrue(all(len(segment) in (base, base + 1) for segment in segments))
+            if n_days == 1:
+                continue
+            # Força bruta: de todas as partições equilibradas, a que corta as ligações mais longas
+            best = max(
+                sum(dist[path[c - 1], path[c]] for c in cuts if 0 < c < n)
+                for sizes in itertools.product((base, base + 1), repeat=n_days) if sum(sizes) == n
+                for cuts in [list(itertools.accumulate(sizes))[:-1]]
+            )
+            bounds = list(itertools.accumulate(len(segment) for segment in segments))[:-1]
+            self.assertAlmostEqual(sum(dist[path[c - 1], path[c]] for c in bounds if 0 < c < n), best)
+
+    def test_split_path_many_days(self):
+        # Um ano: o DP com ponteiros para trás é linear no número de dias
+        path = list(range(400))
+        dist = np.ones((400, 400))
+        t0 = time.perf_counter()
+        segments = itinerary.split_path(path, dist, trips.TRIP_MAX_DAYS)
+        self.assertLess(time.perf_counter() - t0, 1.0)
+        self.assertEqual(len(segments), trips.TRIP_MAX_DAYS)
+        self.assertEqual([i for segment in segments for i in segment], path)
+
+    def test_plan_visits_every_place_once(self):
+        places_ = synthetic_places(50)
+        start = date(2025, 7, 1)
+        plan = itinerary.plan_itinerary(places_, start, start + timedelta(days=6))
+        self.assertEqual([day['date'] for day in plan['days']], [start + timedelta(days=i) for i in range(7)])
+        ids = [stop['id'] for day in plan['days'] for stop in day['stops']]
+        self.assertCountEqual(ids, [p['id'] for p in places_])
+        self.assertIsNone(plan['estimate'])
+
+
+class TripPlanApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planeador')
+        self.client.force_login(self.user)
+
+    def plan(self, start, end, **extra):
+        body = {'start_date': start.isoformat(), 'end_date': end.isoformat(),
+                'places': synthetic_places(3), **extra}
+        return self.client.post(reverse('core:api_trip_plan'), json.dumps(body), content_type='application/json')
+
+    def test_date_range_is_capped(self):
+        start = date(2025, 1, 1)
+        response = self.plan(start, start + timedelta(days=trips.TRIP_MAX_DAYS))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(trips.TRIP_MAX_DAYS), response.json()['error'])
+        response = self.plan(start, start - timedelta(days=1))
+        self.assertEqual(response.status_code, 400)
+        response = self.plan(start, start + timedelta(days=trips.TRIP_MAX_DAYS - 1))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['days']), trips.TRIP_MAX_DAYS)
+
+    def test_plan_moves_the_trip_dates(self):
+        trip = trips.create_trip(self.user, 'Benguela', date(2025, 1, 1), date(2025, 1, 3))
+        start = date(2025, 2, 1)
+        response = self.plan(start, start + timedelta(days=1), trip_id=trip.pk)
+        self.assertEqual(response.status_code, 200)
+        trip.refresh_from_db()
+        self.assertEqual((trip.start_date, trip.end_date), (start, start + timedelta(days=1)))
+        self.assertEqual(list(trip.days.values_list('date', flat=True)), [start, start + timedelta(days=1)])
+
+
+class NearestPlacesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('vizinho')
+        self.client.force_login(self.user)
+
+    def select_place(self, **place):
+        self.client.cookies[estimate_state.COOKIE_NAME] = estimate_state.dumps(self.user.pk, 1000.0, place)
+
+    def nearest(self, **params):
+        return self.client.get(reverse('core:api_places_nearest'), params)
+
+    def test_query_string_origin(self):
+        response = self.nearest(lat='-8.84', lng='13.23', k='3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertEqual(self.nearest(lat='abc', lng='13.23').status_code, 400)
+        self.assertEqual(self.nearest(lat='95', lng='13.23').status_code, 400)
+
+    def test_selected_place_origin(self):
+        self.select_place(name='Kalandula', lat='-9.07', lng='16.0')
+        response = self.nearest()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['origin'], {'name': 'Kalandula', 'lat': -9.07, 'lng': 16.0})
+
+    def test_invalid_selected_place_is_a_400(self):
+        for lat, lng in [('abc', '13.2'), ('-8.8', 'nan'), ('-8.8', '200'), (['-8.8'], '13.2')]:
+            self.select_place(name='Estragado', lat=lat, lng=lng)
+            response = self.nearest()
+            self.assertEqual(response.status_code, 400, (lat, lng))
+            self.assertIn('lat/lng', response.json()['error'])
+
+    def test_without_origin(self):
+        self.assertEqual(self.nearest().status_code, 400)
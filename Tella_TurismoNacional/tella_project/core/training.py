@@ -0,0 +1,155 @@
+"""Treino reprodutível do modelo Tella (o que o notebook do projecto fazia à mão).
+
+Mesmo pipeline do notebook: MinMaxScaler nas colunas numéricas, OneHotEncoder nas
+categóricas e XGBRegressor, com a mesma grelha de hiperparâmetros (36
+combinações) e validação cruzada em 5 folds. A avaliação final usa 20% do CSV
+guardados à parte (o `dados_teste_tella.csv` do notebook não faz parte do repo).
+
+Paralelismo: a procura corre `jobs` candidatos×folds em simultâneo (processos
+joblib) e cada XGBoost usa `xgb_threads` threads. Por omissão jobs × threads =
+número de CPUs, sem sobre-subscrição. O modelo gravado fica com `predict_threads`
+(1 por omissão), porque cada worker do servidor já é um processo.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost
+from sklearn.compose import ColumnTransformer
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold, ParameterGrid, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+from xgboost import XGBRegressor
+
+from . import ml
+
+TARGET = 'custo_total_previsto'
+CAT_FEATURES = ['categoria_destino', 'sentimento_avaliacao', 'tipo_viajante']
+DROP_COLUMNS = ['id_destino', 'nome_destino', 'data_coleta']
+
+PARAM_GRID = {
+    'model__n_estimators': [100, 200],
+    'model__max_depth': [3, 6, 10],
+    'model__learning_rate': [0.01, 0.1, 0.2],
+    'model__subsample': [0.7, 1],
+}
+RANDOM_STATE = 42
+
+
+def load_dataset(path=None):
+    """(X, y) a partir do CSV, com as colunas pela ordem do ficheiro (como no notebook)."""
+    path = Path(path) if path else ml._data_path()
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    df.columns = df.columns.str.strip()
+    df = df.drop(columns=DROP_COLUMNS, errors='ignore').dropna(subset=[TARGET])
+    return df.drop(columns=[TARGET]), df[TARGET]
+
+
+def build_pipeline(num_features, xgb_threads=1):
+    preprocessor = ColumnTransformer([
+        ('num', MinMaxScaler(), num_features),
+        ('cat', OneHotEncoder(handle_unknown='ignore'), CAT_FEATURES),
+    ])
+    return Pipeline([
+        ('preprocessor', preprocessor),
+        ('model', XGBRegressor(objective='reg:squarederror', random_state=RANDOM_STATE, n_jobs=xgb_threads)),
+    ])
+
+
+def thread_plan(jobs=None, xgb_threads=None):
+    """(processos da procura, threads por XGBoost) sem ultrapassar o número de CPUs."""
+    cpus = os.cpu_count() or 1
+    jobs = max(1, jobs or cpus)
+    xgb_threads = max(1, xgb_threads or cpus // jobs)
+    return jobs, xgb_threads
+
+
+def make_search(pipeline, search='grid', jobs=1, folds=5):
+    cv = KFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+    if search == 'halving':
+        # Successive halving: todos os candidatos com poucas linhas, só os melhores com todas
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+        return HalvingGridSearchCV(pipeline, PARAM_GRID, cv=cv, scoring='neg_mean_squared_error',
+                                   factor=3, min_resources='exhaust', n_jobs=jobs, random_state=RANDOM_STATE)
+    return GridSearchCV(pipeline, PARAM_GRID, cv=cv, scoring='neg_mean_squared_error', n_jobs=jobs)
+
+
+def evaluate(model, X, y):
+    pred = model.predict(X)
+    mse = float(mean_squared_error(y, pred))
+    return {
+        'mse': round(mse, 2),
+        'rmse': round(float(np.sqrt(mse)), 2),
+        'mae': round(float(mean_absolute_error(y, pred)), 2),
+        'r2': round(float(r2_score(y, pred)), 4),
+    }
+
+
+def train(path=None, search='grid', jobs=None, xgb_threads=None, predict_threads=1, folds=5, test_size=0.2):
+    """Procura de hiperparâmetros + avaliação. Devolve (pipeline treinado, metadados)."""
+    path = Path(path) if path else ml._data_path()
+    X, y = load_dataset(path)
+    num_features = [c for c in X.columns if c not in CAT_FEATURES]
+    jobs, xgb_threads = thread_plan(jobs, xgb_threads)
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=test_size, random_state=RANDOM_STATE)
+
+    t0 = time.perf_counter()
+    searcher = make_search(build_pipeline(num_features, xgb_threads), search, jobs, folds)
+    searcher.fit(X_train, y_train)
+    elapsed = time.perf_counter() - t0
+
+    model = searcher.best_estimator_
+    # Threads do XGBoost na inferência (sklearn e booster nativo, usado pelo caminho rápido)
+    model.set_params(model__n_jobs=predict_threads)
+    model.steps[-1][1].get_booster().set_param({'nthread': predict_threads})
+
+    metadata = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'features': {'numeric': num_features, 'categorical': list(CAT_FEATURES)},
+        'target': TARGET,
+        'data': {'source': path.name, 'hash': ml._file_hash(path), 'rows': int(len(X)),
+                 'train_rows': int(len(X_train)), 'validation_rows': int(len(X_val))},
+        'search': {
+            'strategy': search,
+            'candidates': len(ParameterGrid(PARAM_GRID)),
+            'fits': int(len(searcher.cv_results_['params'])) * folds,
+            'folds': folds,
+            'jobs': jobs,
+            'xgb_threads': xgb_threads,
+            'best_params': {k.removeprefix('model__'): getattr(v, 'item', lambda: v)()
+                            for k, v in searcher.best_params_.items()},
+            'cv_rmse': round(float(np.sqrt(-searcher.best_score_)), 2),
+        },
+        'metrics': evaluate(model, X_val, y_val),
+        'predict_threads': predict_threads,
+        'training_seconds': round(elapsed, 2),
+        'versions': {'scikit-learn': sklearn.__version__, 'xgboost': xgboost.__version__,
+                     'pandas': pd.__version__, 'numpy': np.__version__},
+    }
+    return model, metadata
+
+
+def metadata_path(model_path):
+    return Path(model_path).with_suffix('.json')
+
+
+def save_model(model, metadata, path):
+    """Grava o joblib e os metadados (hash do modelo incluído) por substituição atómica."""
+    from joblib import dump
+
+    path = Path(path)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    dump(model, tmp)
+    metadata = {**metadata, 'model_hash': ml._file_hash(tmp)}
+    meta_tmp = tmp.with_suffix('.json')
+    meta_tmp.write_text(json.dumps(metadata, ensure_ascii=False, indent=1, default=str), encoding='utf-8')
+    os.replace(tmp, path)
+    os.replace(meta_tmp, metadata_path(path))
+    return path, metadata
@@ -0,0 +1,153 @@
+"""Estimativa de custo de uma viagem inteira (Trip + TripDays) numa só passagem.
+
+Cada paragem de cada dia dá uma linha de features (lugar × preferências do dia).
+Todas as linhas que precisam de ser recalculadas vão ao modelo numa única chamada
+(`ml.estimate_place_costs`).
+
+- Custo de um dia: média dos custos diários das suas paragens (por pessoa), como
+  no planeamento de itinerários.
+- Repartição por componente (transporte, hospedagem, alimentação, lazer): a
+  previsão de cada linha é dividida na proporção dos preços médios usados como
+  features. Esses preços já têm o multiplicador do nível de orçamento e os zeros
+  de "não preciso de transporte/hospedagem".
+- Trip.budget_total: soma dos dias × número de viajantes.
+
+Reestimativa incremental: cada dia guarda a impressão digital das suas linhas
+(inputs + hash do modelo e dos valores padrão). Só os dias cuja impressão mudou voltam ao modelo; os
+outros reutilizam a estimativa gravada. Por exemplo, mudar o nível de orçamento de
+um dia só recalcula esse dia; mudar o da viagem recalcula os dias que o herdam.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from . import ml
+from .models import TripDay
+
+COMPONENTS = (
+    ('transporte', 'preco_transporte_medio'),
+    ('hospedagem', 'preco_hospedagem_medio'),
+    ('alimentacao', 'preco_alimentacao_medio'),
+    ('lazer', 'preco_lazer_medio'),
+)
+
+# Campos de cada paragem guardados em TripDay.places
+PLACE_FIELDS = ('id', 'name', 'lat', 'lng', 'rating', 'userRatingCount', 'categoria_principal', 'provincia')
+
+
+def clean_place(place):
+    return {k: place.get(k) for k in PLACE_FIELDS if place.get(k) is not None}
+
+
+def day_prefs(trip, day):
+    """Preferências da viagem, com o nível de orçamento do dia por cima."""
+    return {
+        'tipo_viajante': trip.traveler_type,
+        'nivel_orcamento': day.budget_level or trip.budget_level,
+        'precisa_transporte': 'sim' if trip.needs_transport else 'nao',
+        'precisa_hospedagem': 'sim' if trip.needs_lodging else 'nao',
+    }
+
+
+def day_inputs(trip, day):
+    prefs = day_prefs(trip, day)
+    return [ml.place_inputs({**clean_place(place), **prefs})[0] for place in day.places or []]
+
+
+def rows_key(inputs):
+    """Impressão digital das linhas de um dia: muda com os inputs, o modelo ou os valores padrão."""
+    version = [ml.get_model_hash(), ml.defaults_version(), getattr(settings, 'TELLA_COST_TABLE', 'exact')]
+    payload = json.dumps([version, inputs], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def split_cost(daily, features):
+    """Divide o custo previsto de uma linha pelos componentes, na proporção dos preços."""
+    prices = [max(float(features[f]), 0.0) for _, f in COMPONENTS]
+    total = sum(prices)
+    if not total:
+        return {name: 0.0 for name, _ in COMPONENTS}
+    return {name: daily * price / total for (name, _), price in zip(COMPONENTS, prices)}
+
+
+def _money(value):
+    return Decimal(str(round(value, 2)))
+
+
+def _day_result(inputs, costs):
+    """(estimativa, repartição) de um dia a partir dos custos das suas linhas; None se faltar algum."""
+    if not costs or any(c is None for c in costs):
+        return None, {}
+    parts = [split_cost(cost, ml.build_place_features(**row)) for row, cost in zip(inputs, costs)]
+    n = len(costs)
+    breakdown = {name: round(sum(p[name] for p in parts) / n, 2) for name, _ in COMPONENTS}
+    return sum(costs) / n, breakdown
+
+
+def estimate_trip(trip, force=False):
+    """Estima a viagem, grava as estimativas dos dias alterados e Trip.budget_total.
+
+    Com `force`, recalcula todos os dias. Devolve um dict com os dias (estimativa por
+    pessoa, repartição, se foram recalculados) e os totais da viagem.
+    """
+    days = list(trip.days.all())
+    pending = []   # (dia, inputs, impressão digital)
+    for day in days:
+        inputs = day_inputs(trip, day)
+        key = rows_key(inputs) if inputs else ''
+        if force or key != day.estimate_key or (inputs and day.estimate is None):
+            pending.append((day, inputs, key))
+
+    # Uma única chamada ao modelo para todas as linhas dos dias alterados
+    rows = [row for _, inputs, _ in pending for row in inputs]
+    costs = ml.estimate_place_costs(rows) if rows else []
+
+    changed = []
+    pos = 0
+    for day, inputs, key in pending:
+        day_costs = costs[pos:pos + len(inputs)]
+        pos += len(inputs)
+        estimate, breakdown = _day_result(inputs, day_costs)
+        day.estimate = _money(estimate) if estimate is not None else None
+        day.estimate_breakdown = breakdown
+        # Sem estimativa (modelo indisponível) a impressão fica vazia para tentar de novo
+        day.estimate_key = key if estimate is not None else ''
+        changed.append(day)
+
+    per_person = sum((d.estimate for d in days if d.estimate is not None), Decimal('0'))
+    travelers = max(trip.travelers or 1, 1)
+    estimated = any(d.estimate is not None for d in days)
+    with transaction.atomic():
+        if changed:
+            TripDay.objects.bulk_update(changed, ['estimate', 'estimate_breakdown', 'estimate_key'])
+        trip.budget_total = per_person * travelers if estimated else None
+        trip.save(update_fields=['budget_total'])
+    if changed:
+        print(f"[ML] Viagem {trip.pk}: {len(changed)}/{len(days)} dia(s) recalculado(s), {len(rows)} linha(s)")
+
+    recomputed = {d.pk for d in changed}
+    totals = {name: 0.0 for name, _ in COMPONENTS}
+    for day in days:
+        for name, value in (day.estimate_breakdown or {}).items():
+            totals[name] = totals.get(name, 0.0) + value * travelers
+    return {
+        'trip_id': trip.pk,
+        'travelers': travelers,
+        'days': [{
+            'order': day.order,
+            'date': day.date.isoformat(),
+            'stops': len(day.places or []),
+            'budget_level': day.budget_level or trip.budget_level,
+            'estimate': float(day.estimate) if day.estimate is not None else None,
+            'breakdown': day.estimate_breakdown or {},
+            'recomputed': day.pk in recomputed,
+        } for day in days],
+        'estimate_per_person': float(per_person) if estimated else None,
+        'budget_total': float(trip.budget_total) if trip.budget_total is not None else None,
+        'breakdown': {name: round(value, 2) for name, value in totals.items()},
+        'rows': sum(len(d.places or []) for d in days),
+        'recomputed_rows': len(rows),
+    }
@@ -0,0 +1,213 @@
+"""Viagens do utilizador ("Minhas viagens") com um número fixo de consultas.
+
+- Uma consulta para a página de viagens e outra para os dias de todas elas
+  (`prefetch_related('days')`), em vez de uma por viagem via `trip.days`.
+- A duração e o orçamento por dia são anotações calculadas na base de dados
+  (`duration`, `daily_budget`) e não as propriedades `duration_days`/`budget_per_day`.
+- Paginação por cursor (keyset) sobre (created_at, id), do mais recente para o mais
+  antigo, servida pelo índice trip_user_created_idx: o custo de uma página não
+  cresce com o número de páginas anteriores, ao contrário de OFFSET.
+
+Criação e edição de datas com um número fixo de instruções, seja qual for a duração:
+
+- `create_trip`: a viagem e um TripDay por data num INSERT em lote (`bulk_create`),
+  na mesma transacção;
+- `update_dates`: os dias ficam presos à sua data. Apagam-se num só DELETE os que
+  saem do intervalo, criam-se num só INSERT os que faltam e, se a data de início
+  mudou, renumeram-se os restantes em dois UPDATE (primeiro para fora do intervalo
+  das ordens, para não colidir com unique_together (trip, order) a meio);
+- `apply_plan`: datas e paragens de um plano de itinerário (/api/trips/plan/) na
+  viagem, via `update_dates` e um `bulk_update` dos dias.
+"""
+import base64
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Func, IntegerField, Q, When
+
+from . import trip_estimate
+from .models import Trip, TripDay
+
+PAGE_SIZE = 20
+PAGE_MAX = 100
+# Duração máxima de uma viagem (dias)
+TRIP_MAX_DAYS = 366
+
+
+class TripDuration(Func):
+    """end_date - start_date + 1 (dias), calculado pela base de dados."""
+    arity = 2
+    arg_joiner = ' - '
+    template = '(%(expressions)s + 1)'
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra):
+        return self.as_sql(compiler, connection, arg_joiner=') - julianday(',
+                           template='(CAST(julianday(%(expressions)s) AS INTEGER) + 1)', **extra)
+
+    def as_mysql(self, compiler, connection, **extra):
+        return self.as_sql(compiler, connection, function='DATEDIFF', arg_joiner=', ',
+                           template='(%(function)s(%(expressions)s) + 1)', **extra)
+
+
+def trips_for(user):
+    """Viagens de `user`, mais recentes primeiro, com os dias e as anotações do painel."""
+    return (
+        Trip.objects.filter(user=user)
+        .annotate(duration=TripDuration('end_date', 'start_date'))
+        .annotate(daily_budget=Case(
+            # "* 1.0": o SQLite guarda 1000.00 como inteiro e 1000 / 3 daria 333
+            When(budget_total__isnull=False, duration__gt=0, then=ExpressionWrapper(
+                F('budget_total') * 1.0 / F('duration'),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            )),
+            default=None,
+        ))
+        .prefetch_related('days')
+        .order_by('-created_at', '-id')
+    )
+
+
+def encode_cursor(trip):
+    raw = f'{trip.created_at.isoformat()}|{trip.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) de um cursor de encode_cursor; ValueError se for inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f'cursor inválido: {cursor!r}') from e
+
+
+def page(user, cursor=None, limit=PAGE_SIZE):
+    """Uma página de viagens depois de `cursor`; devolve (viagens, cursor seguinte ou None)."""
+    qs = trips_for(user)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    # Uma viagem a mais só para saber se há página seguinte
+    trips = list(qs[:limit + 1])
+    if len(trips) > limit:
+        trips = trips[:limit]
+        return trips, encode_cursor(trips[-1])
+    return trips, None
+
+
+def _number(value):
+    return float(round(value, 2)) if value is not None else None
+
+
+def trip_summary(trip):
+    """Viagem de `trips_for` em JSON (usa os dias já carregados e as anotações)."""
+    return {
+        'id': trip.pk,
+        'name': trip.name,
+        'start_date': trip.start_date.isoformat(),
+        'end_date': trip.end_date.isoformat(),
+        'duration_days': trip.duration,
+        'travelers': trip.travelers,
+        'budget_total': _number(trip.budget_total),
+        'budget_per_day': _number(trip.daily_budget),
+        'tipo_viajante': trip.traveler_type,
+        'nivel_orcamento': trip.budget_level,
+        'created_at': trip.created_at.isoformat(),
+        'days': [{
+            'order': day.order,
+            'date': day.date.isoformat(),
+            'activities': day.activities,
+            'lodging': day.lodging,
+            'stops': [place.get('name') for place in day.places or []],
+            'estimate': _number(day.estimate),
+        } for day in trip.days.all()],
+    }
+
+
+def validate_dates(start, end):
+    """ValueError com a mensagem para o cliente se o intervalo for inválido."""
+    if start is None or end is None:
+        raise ValueError('start_date/end_date inválidas (AAAA-MM-DD)')
+    if end < start:
+        raise ValueError('end_date anterior a start_date')
+    if (end - start).days + 1 > TRIP_MAX_DAYS:
+        raise ValueError(f'Máximo de {TRIP_MAX_DAYS} dias por viagem')
+
+
+def _new_days(trip, dates):
+    return [TripDay(trip=trip, date=d, order=(d - trip.start_date).days + 1) for d in dates]
+
+
+def _date_range(start, end):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def create_trip(user, name, start, end, **fields):
+    """Cria a viagem e os seus dias (um por data) numa transacção: 2 INSERT."""
+    validate_dates(start, end)
+    with transaction.atomic():
+        trip = Trip.objects.create(user=user, name=name, start_date=start, end_date=end, **fields)
+        TripDay.objects.bulk_create(_new_days(trip, _date_range(start, end)))
+    return trip
+
+
+def update_dates(trip, start, end):
+    """Muda as datas da viagem mantendo os dias (e o seu conteúdo) das datas que continuam.
+
+    Devolve {'created': n, 'deleted': n, 'renumbered': n}. Trip.budget_total passa a ser
+    a soma das estimativas dos dias que ficam (× viajantes), como em trip_estimate.
+    """
+    validate_dates(start, end)
+    with transaction.atomic():
+        days = list(trip.days.values_list('pk', 'date', 'order', 'estimate'))
+        keep, drop = {}, []
+        for pk, day_date, order, estimate in days:
+            # Um dia por data: duplicados (ou fora do intervalo) saem
+            if start <= day_date <= end and day_date not in keep:
+                keep[day_date] = (pk, order, estimate)
+            else:
+                drop.append(pk)
+        moved = {pk: (d - start).days + 1 for d, (pk, order, _) in keep.items() if order != (d - start).days + 1}
+
+        if drop:
+            TripDay.objects.filter(pk__in=drop).delete()
+        if moved:
+            # Primeiro acima de todas as ordens actuais e finais, depois para o valor certo
+            offset = max([order for _, _, order, _ in days] + [(end - start).days + 1]) + 1
+            TripDay.objects.filter(pk__in=moved).update(order=F('order') + offset)
+            TripDay.objects.bulk_update([TripDay(pk=pk, order=order) for pk, order in moved.items()], ['order'])
+
+        trip.start_date, trip.end_date = start, end
+        missing = [d for d in _date_range(start, end) if d not in keep]
+        if missing:
+            TripDay.objects.bulk_create(_new_days(trip, missing))
+
+        update_fields = ['start_date', 'end_date']
+        if drop:
+            estimates = [estimate for _, _, estimate in keep.values() if estimate is not None]
+            trip.budget_total = sum(estimates, Decimal('0')) * max(trip.travelers or 1, 1) if estimates else None
+            update_fields.append('budget_total')
+        trip.save(update_fields=update_fields)
+    return {'created': len(missing), 'deleted': len(drop), 'renumbered': len(moved)}
+
+
+def apply_plan(trip, start, end, plan_days):
+    """Grava na viagem as datas e as paragens dos dias de itinerary.plan_itinerary.
+
+    As datas da viagem passam a ser as do plano (`update_dates`: os dias das datas que
+    continuam mantêm alojamento e nível de orçamento); as paragens, actividades e notas
+    de cada dia são substituídas pelas do plano num só UPDATE.
+    """
+    with transaction.atomic():
+        update_dates(trip, start, end)
+        days = {day.order: day for day in trip.days.all()}
+        for planned in plan_days:
+            day = days[planned['order']]
+            day.activities = '\n'.join(f"{i}. {stop.get('name') or 'Lugar'}"
+                                       for i, stop in enumerate(planned['stops'], start=1))
+            day.notes = f"Percurso: {planned['distance_km']} km"
+            day.places = [trip_estimate.clean_place(stop) for stop in planned['stops']]
+        TripDay.objects.bulk_update(list(days.values()), ['activities', 'notes', 'places'])
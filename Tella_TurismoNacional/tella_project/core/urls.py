@@ -7,9 +7,20 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('destinos/', views.destinos, name='destinos'),
     path('planejador/', views.planejador, name='planejador'),
+    path('viagens/', views.minhas_viagens, name='minhas_viagens'),
     path('api/places/search/', views.api_places_search, name='api_places_search'),
     path('api/places/photo/<str:place_id>/<path:photo_ref>/', views.api_place_photo, name='api_place_photo'),
+    path('api/places/nearest/', views.api_places_nearest, name='api_places_nearest'),
+    path('api/places/prefix/', views.api_places_prefix, name='api_places_prefix'),
+    path('api/places/bbox/', views.api_places_bbox, name='api_places_bbox'),
+    path('api/places/by-id/<str:place_id>/', views.api_place_detail, name='api_place_detail'),
     path('api/places/estimate/', views.estimate_place_cost, name='estimate_place_cost'),
+    path('api/places/estimate/batch/', views.api_places_estimate_batch, name='api_places_estimate_batch'),
+    path('api/trips/', views.api_trips, name='api_trips'),
+    path('api/trips/<int:trip_id>/', views.api_trip_detail, name='api_trip_detail'),
+    path('api/trips/plan/', views.api_trip_plan, name='api_trip_plan'),
+    path('api/trips/<int:trip_id>/estimate/', views.api_trip_estimate, name='api_trip_estimate'),
+    path('api/ready/', views.api_ready, name='api_ready'),
     path('login/', views.login_view, name='login'),
     path('cadastro/', views.cadastro, name='cadastro'),
     path('logout/', views.logout_view, name='logout'),
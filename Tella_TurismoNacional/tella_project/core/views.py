@@ -2,16 +2,23 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponseRedirect
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
 from django.conf import settings
-import requests
-import math
+from django.db import transaction
+import json
+from datetime import date
+from decimal import Decimal
 from urllib.parse import quote
 from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from . import estimate_state, geo, itinerary, photo_store, place_store, places, search_index, trip_estimate, trips
+from .cache_backends import cache_stats
+from .circuit import CircuitOpen
 from .forms import UserRegistrationForm, LoginForm
-from .models import Trip
-from .ml import get_model, estimate_cost
+from .models import TRIP_MAX_TRAVELERS, Trip, TripDay
+from .ml import BUDGET_MULTIPLIERS, get_model, estimate_place_costs, model_status, place_inputs
 
 
 def home(request):
@@ -23,13 +30,20 @@ def destinos(request):
 
 @login_required(login_url='/login/')
 def planejador(request):
-    # Recupera última estimativa e lugar, se existir
-    # Recupera última estimativa e lugar, se existir
-    est = request.session.get('last_estimate')
-    place = request.session.get('last_place')
+    # Recupera última estimativa e lugar, se existir (cookie assinado, sem ler a sessão)
+    est, place = estimate_state.load(request)
     return render(request, 'core/planejador.html', {"estimate": est, "place": place})
 
 
+@login_required(login_url='/login/')
+def minhas_viagens(request):
+    try:
+        page, next_cursor = trips.page(request.user, request.GET.get('cursor'))
+    except ValueError:
+        page, next_cursor = trips.page(request.user)
+    return render(request, 'core/viagens.html', {'trips': page, 'next_cursor': next_cursor})
+
+
 def login_view(request):
     if request.method == 'POST':
         form = LoginForm(request, data=request.POST)
@@ -61,7 +75,7 @@ def cadastro(request):
 def logout_view(request):
     auth_logout(request)
     messages.success(request, 'Sessão terminada com sucesso.')
-    return redirect('core:home')
+    return estimate_state.clear(redirect('core:home'))
 
 def ui_placeholder(request):
     return render(request, 'core/ui.html')
@@ -73,6 +87,19 @@ def contato(request):
     return render(request, 'core/contato.html')
 
 
+# Prontidão: o worker só está pronto com o modelo Tella carregado
+def api_ready(request):
+    # Respeita o backoff: só tenta recarregar se a última falha já expirou
+    get_model()
+    status = model_status()
+    status['upstream'] = places.get_breaker().status()
+    try:
+        status['cache'] = cache_stats()
+    except Exception as e:
+        status['cache'] = {'error': str(e)}
+    return JsonResponse({'ready': status['model_loaded'], **status}, status=200 if status['model_loaded'] else 503)
+
+
 # Helpers de busca/feature engineering
 def _infer_subcategoria(types):
     if not types:
@@ -95,17 +122,21 @@ def _infer_subcategoria(types):
     return types[0]
 
 
-def _photo_url_from_photos(host: str, place_id: str, photos):
+def _photo_ref_from_photos(photos):
     try:
         if not photos:
             return None
         name = photos[0].get('name') or photos[0].get('photo_reference')
-        photo_ref = None
         if isinstance(name, str):
-            if 'photos/' in name:
-                photo_ref = name.split('photos/')[-1]
-            else:
-                photo_ref = name
+            return name.split('photos/')[-1] if 'photos/' in name else name
+        return None
+    except Exception:
+        return None
+
+
+def _photo_url_from_photos(host: str, place_id: str, photos):
+    try:
+        photo_ref = _photo_ref_from_photos(photos)
         if not photo_ref:
             return None
         # Usa proxy local para tratar headers e redirecionamento
@@ -114,38 +145,45 @@ def _photo_url_from_photos(host: str, place_id: str, photos):
         return None
 
 
-def _haversine_km(lat: float, lng: float, center_lat: float = -8.8383, center_lng: float = 13.2344):
-    try:
-        R = 6371.0
-        dlat = math.radians(lat - center_lat)
-        dlng = math.radians(lng - center_lng)
-        a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(center_lat)) * math.cos(math.radians(lat)) * math.sin(dlng / 2) ** 2
-        return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    except Exception:
-        return None
+def _places_response(items, freshness):
+    response = JsonResponse({'results': items})
+    # local | fresh | stale | miss — permite medir quantos pedidos esperam pelo upstream
+    response['X-Cache-Status'] = freshness
+    return response
 
 
 # API: Busca de lugares (RapidAPI Google Places New V2)
 @login_required(login_url='/login/')
-def api_places_search(request):
+async def api_places_search(request):
     query = request.GET.get('q')
     if not query:
         return JsonResponse({'results': []})
+    # Autocomplete: responde do índice local (CSV + lugares já vistos) se houver resultados suficientes
+    min_hits = settings.PLACES_LOCAL_MIN_HITS
+    local = search_index.get_index().search(query, limit=6)
+    if min_hits and len(local) >= min_hits:
+        return _places_response(local, 'local')
     # Cache key e TTL (sanitizado para compat. memcached)
     q_norm = ' '.join(query.strip().lower().split())
     cache_key = f"places:{quote(q_norm, safe=':+')}"
-    cached = cache.get(cache_key)
+    # Stale-while-revalidate: após o TTL "soft" serve o cache e actualiza em segundo plano;
+    # só após o TTL "hard" (expiração na cache) o pedido espera pelo upstream
+    cached = await cache.aget(cache_key)
     if cached is not None:
-        return JsonResponse({'results': cached})
+        freshness = 'fresh' if places.is_fresh(cached) else 'stale'
+    else:
+        freshness = 'miss'
+    if freshness == 'fresh':
+        return _places_response(cached['items'], freshness)
     # Validação de chave
     if not getattr(settings, 'RAPIDAPI_KEY', None):
+        if cached is not None:
+            return _places_response(cached['items'], freshness)
         return JsonResponse({'error': 'RAPIDAPI_KEY não configurada no servidor.', 'results': []}, status=500)
-    headers = {
+    headers = places.upstream_headers(**{
         'Content-Type': 'application/json',
         'X-Goog-FieldMask': 'places.id,places.displayName,places.formattedAddress,places.location,places.rating,places.userRatingCount,places.types,places.photos',
-        'x-rapidapi-host': settings.RAPIDAPI_HOST,
-        'x-rapidapi-key': settings.RAPIDAPI_KEY or ''
-    }
+    })
     body_base = {
         "maxResultCount": 6,
         "openNow": False,
@@ -159,20 +197,26 @@ def api_places_search(request):
             }
         },
     }
-    def _do_search(q: str):
+    # Sob WSGI o loop do pedido morre com a resposta: o trabalho em segundo plano vai para uma thread
+    detach = not isinstance(request, ASGIRequest)
+    async def _do_search(q: str):
         body = dict(body_base)
         body["textQuery"] = q
-        resp = requests.post(f"https://{settings.RAPIDAPI_HOST}/v1/places:searchText", json=body, headers=headers, timeout=15)
+        # Cliente do loop corrente: o refresh em segundo plano pode correr noutro loop
+        client = places.get_client()
+        resp = await places.call_upstream(lambda timeout: client.post(
+            places.upstream_url("/v1/places:searchText"), json=body, headers=headers, timeout=timeout))
         resp.raise_for_status()
         return resp.json()
-    try:
-        data = _do_search(query)
-        places = data.get('places', []) or []
-        if not places and 'luanda' not in query.strip().lower():
-            data = _do_search(query + ' Luanda')
-            places = data.get('places', []) or []
+    async def _fetch():
+        data = await _do_search(query)
+        results = data.get('places', []) or []
+        if not results and 'luanda' not in query.strip().lower():
+            data = await _do_search(query + ' Luanda')
+            results = data.get('places', []) or []
         items = []
-        for p in places[:6]:
+        photos = []
+        for p in results[:6]:
             raw_id = p.get('id') or p.get('name') or ''
             place_id = raw_id.split('/')[-1] if isinstance(raw_id, str) else ''
             types = p.get('types') or []
@@ -185,6 +229,9 @@ def api_places_search(request):
                 )
             except Exception:
                 photo_url = None
+            photo_ref = _photo_ref_from_photos(p.get('photos'))
+            if photo_url and photo_ref and photo_store.get_store().lookup(place_id, photo_ref, 'full') is None:
+                photos.append((place_id, photo_ref))
             items.append({
                 'name': p.get('displayName', {}).get('text'),
                 'address': p.get('formattedAddress'),
@@ -198,48 +245,129 @@ def api_places_search(request):
                 'photo_url': photo_url,
                 'id': place_id,
             })
-        # guarda no cache
-        cache.set(cache_key, items, timeout=getattr(settings, 'PLACES_CACHE_TTL', 600))
-        return JsonResponse({'results': items})
+        # O browser vai pedir as fotos a seguir: resolve já os photoUri, em paralelo
+        places.prefetch_photo_uris(photos, thread=detach)
+        # guarda no cache, no índice local (autocomplete das próximas buscas) e na BD (um só upsert)
+        search_index.get_index().add(items)
+        await sync_to_async(place_store.upsert)(items)
+        entry = places.cache_entry(items)
+        await cache.aset(cache_key, entry, timeout=settings.PLACES_CACHE_STALE_TTL)
+        return entry
+    if freshness == 'stale':
+        places.refresh_in_background(cache_key, _fetch, thread=detach)
+        return _places_response(cached['items'], freshness)
+    try:
+        # Single-flight: pedidos simultâneos com o mesmo q_norm partilham uma única chamada upstream
+        entry = await places.single_flight(cache_key, _fetch)
+        return _places_response(entry['items'], freshness)
     except Exception as e:
-        return JsonResponse({'error': str(e), 'results': []}, status=500)
+        # Upstream em baixo, lento ou com o circuito aberto: degrada para o índice local
+        if local:
+            return _places_response(local, 'local')
+        return JsonResponse({'error': str(e), 'results': []}, status=503 if isinstance(e, CircuitOpen) else 500)
+
+
+# Proxy de foto: serve do cache em disco; num miss descarrega do upstream uma única vez
+PHOTO_CHUNK_SIZE = 64 * 1024
+
+
+def _photo_file_response(request, hit):
+    path, sha, content_type = hit
+    etag = f'"{sha}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.PLACES_PHOTO_MAX_AGE}'
+    return response
+
+
+async def _resolve_photo(client, place_id: str, photo_ref: str):
+    """Pedido (em streaming) da imagem original; o chamador fecha a resposta."""
+    timeout = settings.PLACES_PHOTO_TIMEOUT
+    # photoUri memorizado (ou pré-resolvido pela busca): URL pública no CDN do Google,
+    # sem cabeçalhos nem chamada à RapidAPI
+    photo_uri = await places.resolve_photo_uri(place_id, photo_ref)
+    if photo_uri:
+        resp = await client.send(client.build_request('GET', photo_uri, timeout=timeout),
+                                 stream=True, follow_redirects=True)
+        if resp.status_code == 200:
+            return resp
+        # O URL expirou no CDN: esquece-o e segue pelo redirecionamento
+        await resp.aclose()
+        await places.forget_photo_uri(place_id, photo_ref)
+    # Segundo modo: sem skipHttpRedirect, seguindo o redirecionamento até à imagem
+    url_redirect = places.photo_media_url(place_id, photo_ref)
+    return await places.call_upstream(lambda upstream_timeout: client.send(
+        client.build_request('GET', url_redirect, headers=places.upstream_headers(), timeout=upstream_timeout),
+        stream=True, follow_redirects=True))
+
+
+async def _download_photo(store, resp, place_id, photo_ref):
+    """Grava a resposta em disco em blocos (sem a manter em memória)."""
+    writer = store.writer(place_id, photo_ref, 'full', resp.headers.get('Content-Type', 'image/jpeg'))
+    try:
+        async for chunk in resp.aiter_bytes(PHOTO_CHUNK_SIZE):
+            writer.write(chunk)
+        writer.commit()
+    finally:
+        writer.discard()
+        await resp.aclose()
+    return store.lookup(place_id, photo_ref, 'full')
 
 
-# Proxy de foto: redireciona para URL pública da imagem
 @login_required(login_url='/login/')
-def api_place_photo(request, place_id: str, photo_ref: str):
+async def api_place_photo(request, place_id: str, photo_ref: str):
+    size = request.GET.get('size') or 'full'
+    if size not in photo_store.photo_sizes():
+        return JsonResponse({'error': f'size inválido: {size}'}, status=400)
+    store = photo_store.get_store()
+    hit = store.lookup(place_id, photo_ref, size)
+    if hit is not None:
+        return _photo_file_response(request, hit)
+    if size != 'full':
+        # Miniatura: gerada uma vez a partir da original (se já estiver em cache)
+        hit = await sync_to_async(store.make_variant)(place_id, photo_ref, size)
+        if hit is not None:
+            return _photo_file_response(request, hit)
     if not getattr(settings, 'RAPIDAPI_KEY', None):
         return JsonResponse({'error': 'RAPIDAPI_KEY não configurada no servidor.'}, status=500)
     try:
-        # Tenta primeiro obter JSON com skipHttpRedirect=true para extrair photoUri
-        base = f"https://{settings.RAPIDAPI_HOST}/v1/places/{place_id}/photos/{photo_ref}/media"
-        url_json = base + "?maxWidthPx=800&maxHeightPx=800&skipHttpRedirect=true"
-        headers = {
-            'x-rapidapi-host': settings.RAPIDAPI_HOST,
-            'x-rapidapi-key': settings.RAPIDAPI_KEY or ''
-        }
-        # Primeiro modo JSON
-        resp_json = requests.get(url_json, headers=headers, timeout=20)
-        if resp_json.status_code == 200:
+        resp = await _resolve_photo(places.get_client(), place_id, photo_ref)
+        content_type = resp.headers.get('Content-Type', '')
+        if resp.status_code != 200 or not content_type.startswith('image/'):
+            await resp.aclose()
+            return JsonResponse({'error': f'foto_indisponivel: upstream {resp.status_code}'}, status=502)
+        if size != 'full' or 'wsgi.version' in request.META:
+            # Miniatura, ou worker WSGI (o streaming assíncrono não sobrevive ao fim da view):
+            # grava em disco primeiro e serve o ficheiro
+            hit = await _download_photo(store, resp, place_id, photo_ref)
+            if size != 'full':
+                hit = await sync_to_async(store.make_variant)(place_id, photo_ref, size)
+            return _photo_file_response(request, hit)
+
+        async def _stream():
+            # Os mesmos blocos vão para o cliente e para o disco; só entra na cache se terminar
+            writer = store.writer(place_id, photo_ref, 'full', content_type)
             try:
-                data = resp_json.json()
-                photo_uri = data.get('photoUri') or data.get('photo_uri')
-                if photo_uri:
-                    return HttpResponseRedirect(photo_uri)
-            except Exception:
-                pass
-        # Segundo modo: sem skipHttpRedirect para pegar Location
-        url_redirect = base + "?maxWidthPx=800&maxHeightPx=800"
-        resp = requests.get(url_redirect, headers=headers, timeout=20, allow_redirects=False)
-        if resp.status_code in (301, 302, 303, 307, 308):
-            loc = resp.headers.get('Location') or resp.headers.get('location')
-            if loc:
-                return HttpResponseRedirect(loc)
-        # Último fallback: baixar conteúdo direto (pode ser imagem ou erro)
-        resp_final = requests.get(url_redirect, headers=headers, timeout=20)
-        content_type = resp_final.headers.get('Content-Type', 'image/jpeg')
-        from django.http import HttpResponse
-        return HttpResponse(resp_final.content, content_type=content_type)
+                async for chunk in resp.aiter_bytes(PHOTO_CHUNK_SIZE):
+                    writer.write(chunk)
+                    yield chunk
+                writer.commit()
+            finally:
+                writer.discard()
+                await resp.aclose()
+
+        response = StreamingHttpResponse(_stream(), content_type=content_type)
+        if resp.headers.get('Content-Length'):
+            response['Content-Length'] = resp.headers['Content-Length']
+        response['Cache-Control'] = f'public, max-age={settings.PLACES_PHOTO_MAX_AGE}'
+        return response
+    except CircuitOpen as e:
+        response = JsonResponse({'error': f'foto_indisponivel: {e}'}, status=503)
+        response['Retry-After'] = str(int(e.retry_in) + 1)
+        return response
     except Exception as e:
         return JsonResponse({'error': f'foto_indisponivel: {e}'}, status=500)
 
@@ -249,117 +377,427 @@ def api_place_photo(request, place_id: str, photo_ref: str):
 def estimate_place_cost(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método inválido'}, status=405)
-    
-    # Dados básicos da API/formulário
-    name = request.POST.get('name')
-    address = request.POST.get('address')
-    lat = request.POST.get('lat')
-    lng = request.POST.get('lng')
-    rating = request.POST.get('rating') or '0'
-    reviews = request.POST.get('userRatingCount') or '0'
-    categoria_principal = request.POST.get('categoria_principal') or 'place'
-    
-    # Inputs do usuário para personalização
-    tipo_viajante = request.POST.get('tipo_viajante') or 'família'
-    duracao_dias = request.POST.get('duracao_dias') or '3'
-    nivel_orcamento = request.POST.get('nivel_orcamento') or 'medio'
-    precisa_transporte = request.POST.get('precisa_transporte') or 'sim'
-    precisa_hospedagem = request.POST.get('precisa_hospedagem') or 'sim'
-    
-    # Converter coordenadas
-    try:
-        lat_f = float(lat) if lat else 0.0
-        lng_f = float(lng) if lng else 0.0
-        rating_f = float(rating)
-        reviews_f = float(reviews)
-        duracao_f = float(duracao_dias)
-    except Exception:
-        lat_f = lng_f = rating_f = reviews_f = duracao_f = 0.0
-    
-    # Mapear categoria do Google Places para categoria do modelo
-    from .ml import map_google_type_to_category, get_smart_defaults
-    
-    # Se categoria_principal é um tipo do Google, mapear
-    if categoria_principal in ['tourist_attraction', 'natural_feature', 'park', 'beach', 'mountain', 'museum', 'church', 'restaurant', 'lodging', 'shopping_mall', 'locality']:
-        categoria_destino = map_google_type_to_category([categoria_principal])
-    else:
-        # Mapear valores do formulário para categorias do modelo
-        category_map = {
-            'place': 'cidade',
-            'restaurant': 'cidade', 
-            'hotel': 'cidade',
-            'attraction': 'cultural',
-            'shopping': 'cidade'
-        }
-        categoria_destino = category_map.get(categoria_principal, 'cidade')
-    
-    # Obter valores padrão inteligentes baseados no CSV
-    defaults = get_smart_defaults(categoria_destino, rating_f)
-    
-    # Ajustar valores baseados no nível de orçamento
-    multiplicador_orcamento = {
-        'economico': 0.7,
-        'medio': 1.0,
-        'luxo': 1.5
-    }.get(nivel_orcamento, 1.0)
-    
-    # Aplicar multiplicador aos preços
-    preco_transporte = defaults['preco_transporte_medio'] * multiplicador_orcamento
-    preco_hospedagem = defaults['preco_hospedagem_medio'] * multiplicador_orcamento
-    preco_alimentacao = defaults['preco_alimentacao_medio'] * multiplicador_orcamento
-    preco_lazer = defaults['preco_lazer_medio'] * multiplicador_orcamento
-    
-    # Zerar custos se usuário não precisa
-    if precisa_transporte == 'nao':
-        preco_transporte = 0.0
-    if precisa_hospedagem == 'nao':
-        preco_hospedagem = 0.0
-    
-    # Montar features para o novo modelo
-    features = {
-        'categoria_destino': categoria_destino,
-        'classificacao_media': rating_f,
-        'num_avaliacoes': int(reviews_f),
-        'sentimento_avaliacao': defaults['sentimento_avaliacao'],
-        'tipo_viajante': tipo_viajante,
-        'preco_transporte_medio': preco_transporte,
-        'preco_hospedagem_medio': preco_hospedagem,
-        'preco_alimentacao_medio': preco_alimentacao,
-        'preco_lazer_medio': preco_lazer,
-        'indice_sazonalidade': defaults['indice_sazonalidade'],
-        'pontuacao_popularidade': defaults['pontuacao_popularidade'],
-        'fator_sustentabilidade': defaults['fator_sustentabilidade'],
-        'latitude': lat_f,
-        'longitude': lng_f,
-    }
-    
-    cost = estimate_cost(features)
-    
+
+    # Lugar gravado na BD (pelo id) como base; os campos do formulário, se vierem, prevalecem
+    data = request.POST
+    stored = place_store.get(data.get('id'))
+    if stored is not None:
+        data = {**stored.to_item(), **{k: v for k, v in data.items() if v}}
+
+    inputs, ctx = place_inputs(data)
+    cost = estimate_place_costs([inputs])[0]
+
     # Multiplicar pelo número de dias
+    duracao_f = ctx['duracao_f']
     if cost and duracao_f > 0:
         cost = cost * duracao_f
-    
-    request.session['last_estimate'] = cost
-    
-    if cost is None:
-        request.session['last_estimate_error'] = 'Falha ao calcular estimativa com modelo Tella.'
-    else:
-        request.session.pop('last_estimate_error', None)
-    
-    # Salvar dados do lugar na sessão
-    request.session['last_place'] = {
-        'name': name,
-        'address': address,
-        'lat': lat,
-        'lng': lng,
-        'rating': rating,
-        'userRatingCount': reviews,
-        'categoria_destino': categoria_destino,
-        'tipo_viajante': tipo_viajante,
-        'duracao_dias': duracao_dias,
-        'nivel_orcamento': nivel_orcamento,
-        'precisa_transporte': precisa_transporte,
-        'precisa_hospedagem': precisa_hospedagem,
+
+    # Estado no cookie assinado (estimate_state): o redirect não grava nada na sessão
+    place = {
+        'id': data.get('id'),
+        'name': data.get('name'),
+        'address': data.get('address'),
+        'lat': ctx['lat'],
+        'lng': ctx['lng'],
+        'rating': ctx['rating'],
+        'userRatingCount': ctx['userRatingCount'],
+        'categoria_destino': ctx['categoria_destino'],
+        'tipo_viajante': ctx['tipo_viajante'],
+        'duracao_dias': ctx['duracao_dias'],
+        'nivel_orcamento': ctx['nivel_orcamento'],
+        'precisa_transporte': ctx['precisa_transporte'],
+        'precisa_hospedagem': ctx['precisa_hospedagem'],
     }
-    
-    return redirect('core:planejador')
+    return estimate_state.save(redirect('core:planejador'), request, cost, place)
+
+
+# Limite de lugares por pedido na estimativa em lote
+ESTIMATE_BATCH_MAX = 100
+
+
+# POST JSON: Estimar custos de vários lugares numa única chamada ao modelo
+@login_required(login_url='/login/')
+def api_places_estimate_batch(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método inválido'}, status=405)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido', 'results': []}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'JSON inválido', 'results': []}, status=400)
+    places = payload.get('places') or []
+    if not isinstance(places, list):
+        return JsonResponse({'error': '"places" deve ser uma lista', 'results': []}, status=400)
+    if len(places) > ESTIMATE_BATCH_MAX:
+        return JsonResponse({'error': f'Máximo de {ESTIMATE_BATCH_MAX} lugares por pedido', 'results': []}, status=400)
+
+    # Preferências comuns (topo do JSON) com override por lugar
+    prefs = {k: payload.get(k) for k in ('tipo_viajante', 'duracao_dias', 'nivel_orcamento', 'precisa_transporte', 'precisa_hospedagem') if payload.get(k)}
+    rows = []
+    for place in places:
+        if not isinstance(place, dict):
+            place = {}
+        rows.append(place_inputs({**prefs, **place}))
+
+    costs = estimate_place_costs([inputs for inputs, _ in rows])
+    results = []
+    for place, (inputs, ctx), daily in zip(places, rows, costs):
+        total = daily
+        if daily and ctx['duracao_f'] > 0:
+            total = daily * ctx['duracao_f']
+        results.append({
+            'id': place.get('id') if isinstance(place, dict) else None,
+            'categoria_destino': ctx['categoria_destino'],
+            'daily': daily,
+            'estimate': total,
+        })
+    return JsonResponse({'results': results})
+
+
+# Limite de paragens por plano de itinerário
+ITINERARY_MAX_STOPS = 200
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+# POST JSON: distribui os lugares escolhidos pelos dias da viagem (e grava-os numa Trip, se indicada)
+@login_required(login_url='/login/')
+def api_trip_plan(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método inválido'}, status=405)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+
+    trip = None
+    if payload.get('trip_id'):
+        trip = Trip.objects.filter(pk=payload['trip_id'], user=request.user).first()
+        if trip is None:
+            return JsonResponse({'error': 'Viagem não encontrada'}, status=404)
+    start = _parse_date(payload.get('start_date') or (trip and trip.start_date))
+    end = _parse_date(payload.get('end_date') or (trip and trip.end_date))
+    try:
+        trips.validate_dates(start, end)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    places = payload.get('places') or []
+    if not isinstance(places, list) or not all(isinstance(p, dict) for p in places):
+        return JsonResponse({'error': '"places" deve ser uma lista de lugares'}, status=400)
+    if len(places) > ITINERARY_MAX_STOPS:
+        return JsonResponse({'error': f'Máximo de {ITINERARY_MAX_STOPS} lugares por itinerário'}, status=400)
+    try:
+        places = [{**p, 'lat': float(p['lat']), 'lng': float(p['lng'])} for p in places]
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({'error': 'Todos os lugares precisam de lat e lng'}, status=400)
+
+    prefs = {k: payload.get(k) for k in ('tipo_viajante', 'nivel_orcamento', 'precisa_transporte', 'precisa_hospedagem') if payload.get(k)}
+    cost_inputs = [place_inputs({**prefs, **place})[0] for place in places]
+    plan = itinerary.plan_itinerary(places, start, end, cost_inputs)
+
+    trip_costs = None
+    if trip is not None:
+        error = _apply_trip_prefs(trip, payload)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        with transaction.atomic():
+            trip.save()
+            trips.apply_plan(trip, start, end, plan['days'])
+        trip_costs = trip_estimate.estimate_trip(trip)
+
+    days = [{
+        'order': day['order'],
+        'date': day['date'].isoformat(),
+        'stops': [{k: stop.get(k) for k in ('id', 'name', 'lat', 'lng')} for stop in day['stops']],
+        'distance_km': day['distance_km'],
+        'estimate': day['estimate'],
+    } for day in plan['days']]
+    return JsonResponse({
+        'trip_id': trip.pk if trip else None,
+        'days': days,
+        'distance_km': plan['distance_km'],
+        'estimate': plan['estimate'],
+        'trip_estimate': trip_costs,
+    })
+
+
+# Preferências da estimativa no JSON -> campos da Trip
+TRIP_PREF_FIELDS = {
+    'tipo_viajante': 'traveler_type',
+    'nivel_orcamento': 'budget_level',
+    'precisa_transporte': 'needs_transport',
+    'precisa_hospedagem': 'needs_lodging',
+}
+
+
+def _parse_travelers(value):
+    """Número de viajantes (mínimo 1); ValueError acima de TRIP_MAX_TRAVELERS."""
+    travelers = max(int(value), 1)
+    if travelers > TRIP_MAX_TRAVELERS:
+        raise ValueError(value)
+    return travelers
+
+
+def _apply_trip_prefs(trip, payload):
+    """Copia para a Trip as preferências presentes em `payload`; devolve uma mensagem de erro ou None."""
+    for key, field in TRIP_PREF_FIELDS.items():
+        value = payload.get(key)
+        if not value:
+            continue
+        if key == 'nivel_orcamento' and value not in BUDGET_MULTIPLIERS:
+            return f'nivel_orcamento inválido: {value}'
+        if field.startswith('needs_'):
+            value = value not in ('nao', False)
+        setattr(trip, field, value)
+    return None
+
+
+# POST JSON: (re)estima a viagem inteira; só os dias alterados voltam ao modelo
+@login_required(login_url='/login/')
+def api_trip_estimate(request, trip_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método inválido'}, status=405)
+    trip = Trip.objects.filter(pk=trip_id, user=request.user).first()
+    if trip is None:
+        return JsonResponse({'error': 'Viagem não encontrada'}, status=404)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+
+    error = _apply_trip_prefs(trip, payload)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    if payload.get('travelers'):
+        try:
+            trip.travelers = _parse_travelers(payload['travelers'])
+        except (TypeError, ValueError):
+            return JsonResponse({'error': f'travelers inválido (1 a {TRIP_MAX_TRAVELERS})'}, status=400)
+
+    # Alterações por dia: {"days": [{"order": 2, "nivel_orcamento": "luxo", "places": [...]}]}
+    days = {day.order: day for day in trip.days.all()}
+    edited = []
+    for change in payload.get('days') or []:
+        day = days.get(change.get('order')) if isinstance(change, dict) else None
+        if day is None:
+            return JsonResponse({'error': 'Dia inexistente em "days"'}, status=400)
+        if 'nivel_orcamento' in change:
+            level = change['nivel_orcamento'] or ''
+            if level and level not in BUDGET_MULTIPLIERS:
+                return JsonResponse({'error': f'nivel_orcamento inválido: {level}'}, status=400)
+            day.budget_level = level
+        if 'places' in change:
+            stops = change['places']
+            if not isinstance(stops, list) or not all(isinstance(p, dict) for p in stops):
+                return JsonResponse({'error': '"places" deve ser uma lista de lugares'}, status=400)
+            day.places = [trip_estimate.clean_place(p) for p in stops]
+        edited.append(day)
+
+    with transaction.atomic():
+        trip.save()
+        if edited:
+            TripDay.objects.bulk_update(edited, ['budget_level', 'places'])
+    return JsonResponse(trip_estimate.estimate_trip(trip, force=bool(payload.get('force'))))
+
+
+# GET: viagens do utilizador com os dias, paginadas por cursor (?cursor=&limit=)
+# POST JSON: cria uma viagem com um dia por data ({"name", "start_date", "end_date", "travelers", preferências})
+@login_required(login_url='/login/')
+def api_trips(request):
+    if request.method == 'POST':
+        return _create_trip(request)
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método inválido'}, status=405)
+    try:
+        limit = min(max(int(request.GET.get('limit', trips.PAGE_SIZE)), 1), trips.PAGE_MAX)
+    except ValueError:
+        return JsonResponse({'error': 'limit inválido'}, status=400)
+    try:
+        page, next_cursor = trips.page(request.user, request.GET.get('cursor'), limit)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'results': [trips.trip_summary(trip) for trip in page], 'next_cursor': next_cursor})
+
+
+def _trip_payload(request):
+    """JSON do pedido como dict, ou None se for inválido."""
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _apply_trip_fields(trip, payload):
+    """Nome, viajantes e preferências presentes em `payload`; devolve uma mensagem de erro ou None."""
+    if 'name' in payload:
+        name = str(payload['name'] or '').strip()
+        if not name:
+            return 'name obrigatório'
+        trip.name = name[:Trip._meta.get_field('name').max_length]
+    if payload.get('travelers'):
+        try:
+            travelers = _parse_travelers(payload['travelers'])
+        except (TypeError, ValueError):
+            return f'travelers inválido (1 a {TRIP_MAX_TRAVELERS})'
+        # budget_total = estimativa por pessoa × viajantes
+        if trip.budget_total is not None and trip.travelers:
+            trip.budget_total = (trip.budget_total / trip.travelers * travelers).quantize(Decimal('0.01'))
+        trip.travelers = travelers
+    return _apply_trip_prefs(trip, payload)
+
+
+def _create_trip(request):
+    payload = _trip_payload(request)
+    if payload is None:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    draft = Trip(user=request.user)
+    error = _apply_trip_fields(draft, {'name': payload.get('name'), **payload})
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    fields = {f: getattr(draft, f) for f in ('travelers', *TRIP_PREF_FIELDS.values())}
+    try:
+        trip = trips.create_trip(request.user, draft.name, _parse_date(payload.get('start_date')),
+                                 _parse_date(payload.get('end_date')), **fields)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(trips.trip_summary(trips.trips_for(request.user).get(pk=trip.pk)), status=201)
+
+
+# GET: uma viagem com os dias; POST JSON: edita nome, viajantes, preferências e datas
+# (os dias das datas que continuam são mantidos; só os que mudam são criados, apagados ou renumerados)
+@login_required(login_url='/login/')
+def api_trip_detail(request, trip_id):
+    if request.method not in ('GET', 'POST'):
+        return JsonResponse({'error': 'Método inválido'}, status=405)
+    if request.method == 'GET':
+        trip = trips.trips_for(request.user).filter(pk=trip_id).first()
+        if trip is None:
+            return JsonResponse({'error': 'Viagem não encontrada'}, status=404)
+        return JsonResponse(trips.trip_summary(trip))
+
+    trip = Trip.objects.filter(pk=trip_id, user=request.user).first()
+    if trip is None:
+        return JsonResponse({'error': 'Viagem não encontrada'}, status=404)
+    payload = _trip_payload(request)
+    if payload is None:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    error = _apply_trip_fields(trip, payload)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    dates = None
+    if payload.get('start_date') or payload.get('end_date'):
+        dates = (_parse_date(payload.get('start_date') or trip.start_date),
+                 _parse_date(payload.get('end_date') or trip.end_date))
+        try:
+            trips.validate_dates(*dates)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    changes = None
+    with transaction.atomic():
+        trip.save()
+        if dates:
+            changes = trips.update_dates(trip, *dates)
+    return JsonResponse({**trips.trip_summary(trips.trips_for(request.user).get(pk=trip.pk)), 'day_changes': changes})
+
+
+NEAREST_MAX_K = 50
+
+
+def _parse_origin(lat, lng):
+    """{'lat': .., 'lng': ..} em graus; ValueError com a mensagem para o cliente se forem inválidos."""
+    try:
+        origin = {'lat': float(lat), 'lng': float(lng)}
+    except (TypeError, ValueError):
+        raise ValueError('lat/lng inválidos')
+    if not (-90 <= origin['lat'] <= 90 and -180 <= origin['lng'] <= 180):
+        raise ValueError('lat/lng fora do intervalo')
+    return origin
+
+
+@login_required(login_url='/login/')
+def api_places_nearest(request):
+    """Os k destinos mais próximos de ?lat=&lng= ou, sem coordenadas, do lugar seleccionado."""
+    try:
+        k = min(max(int(request.GET.get('k', 5)), 1), NEAREST_MAX_K)
+    except ValueError:
+        return JsonResponse({'error': 'k inválido'}, status=400)
+    origin = None
+    try:
+        if request.GET.get('lat') and request.GET.get('lng'):
+            origin = _parse_origin(request.GET['lat'], request.GET['lng'])
+        else:
+            # O lugar guardado vem do formulário da estimativa: valida-se como a query string
+            _, place = estimate_state.load(request)
+            if place and place.get('lat') and place.get('lng'):
+                origin = {'name': place.get('name'), **_parse_origin(place['lat'], place['lng'])}
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if origin is None:
+        return JsonResponse({'error': 'Indique lat e lng ou seleccione um lugar.'}, status=400)
+
+    # Um a mais: o próprio lugar seleccionado pode estar no índice
+    found = geo.get_geo_index().nearest(origin['lat'], origin['lng'], k=k + 1,
+                                        exclude_id=request.GET.get('exclude'))
+    results = []
+    for item, distance in found:
+        if origin.get('name') and item.get('name') == origin['name'] and distance < 0.05:
+            continue
+        results.append({**item, 'distance_km': round(distance, 2)})
+    return JsonResponse({'origin': origin, 'results': results[:k]})
+
+
+PLACES_LOOKUP_MAX = 200
+
+
+def _lookup_limit(request, default):
+    try:
+        return min(max(int(request.GET.get('limit', default)), 1), PLACES_LOOKUP_MAX)
+    except ValueError:
+        return None
+
+
+@login_required(login_url='/login/')
+def api_place_detail(request, place_id):
+    """Lugar gravado na BD pelo id do Google."""
+    place = place_store.get(place_id)
+    if place is None:
+        return JsonResponse({'error': 'Lugar não encontrado'}, status=404)
+    return JsonResponse(place.to_item())
+
+
+@login_required(login_url='/login/')
+def api_places_prefix(request):
+    """Lugares da BD cujo nome começa por ?q= (sem acentos nem maiúsculas); ?category= opcional."""
+    limit = _lookup_limit(request, 6)
+    if limit is None:
+        return JsonResponse({'error': 'limit inválido'}, status=400)
+    found = place_store.by_prefix(request.GET.get('q', ''), limit, request.GET.get('category'))
+    return JsonResponse({'results': [p.to_item() for p in found]})
+
+
+@login_required(login_url='/login/')
+def api_places_bbox(request):
+    """Lugares da BD dentro de ?south=&west=&north=&east=; ?category= opcional."""
+    limit = _lookup_limit(request, 100)
+    if limit is None:
+        return JsonResponse({'error': 'limit inválido'}, status=400)
+    try:
+        south, west, north, east = (float(request.GET[k]) for k in ('south', 'west', 'north', 'east'))
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Indique south, west, north e east'}, status=400)
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        return JsonResponse({'error': 'Rectângulo fora do intervalo'}, status=400)
+    found = place_store.in_bbox(south, west, north, east, limit, request.GET.get('category'))
+    return JsonResponse({'results': [p.to_item() for p in found]})
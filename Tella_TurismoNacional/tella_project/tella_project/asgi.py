@@ -2,5 +2,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tella_project.settings')
+# Lido nas settings (DB_CONN_MAX_AGE por omissão 0 sob ASGI)
+os.environ.setdefault('DJANGO_SERVER', 'asgi')
 
 application = get_asgi_application()